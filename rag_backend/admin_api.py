@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+from . import profiling
+from .concurrency import run_in_executor
+from .config import settings
+from .security import get_current_admin_user
+
+# Routes réservées aux administrateurs (settings.ADMIN_USERNAMES)
+router = APIRouter(prefix="/admin", dependencies=[Depends(get_current_admin_user)])
+
+# Thread dédié à l'échantillonneur : il ne prend pas de place dans les pools des requêtes
+profile_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+
+
+def _check_duration(seconds: float):
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Durée maximale de profilage: {settings.PROFILE_MAX_SECONDS} s")
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_process(
+    seconds: float = Query(10.0, gt=0, description="Durée de l'échantillonnage"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Intervalle entre deux échantillons"),
+    idle: bool = Query(False, description="Inclure les threads en attente (pools inactifs, boucle d'événements)"),
+):
+    """
+    Profil par échantillonnage de tous les threads du processus, au format « collapsed »
+    (flamegraph.pl, speedscope). Les requêtes continuent d'être servies pendant la mesure.
+    """
+    _check_duration(seconds)
+    try:
+        stacks = await run_in_executor(profile_executor, profiling.sample_stacks, seconds, interval_ms / 1000, idle)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(profiling.format_collapsed(stacks))
+
+
+@router.get("/profile/lines")
+async def profile_lines(
+    targets: str = Query(..., description=f"Cibles séparées par des virgules: {', '.join(profiling.LINE_TARGETS)}"),
+    seconds: float = Query(30.0, gt=0, description="Durée de la fenêtre de mesure"),
+):
+    """
+    Temps par ligne des cibles demandées, mesuré sur les requêtes reçues pendant la fenêtre.
+    L'instrumentation est retirée à la fin de la mesure.
+    """
+    _check_duration(seconds)
+    try:
+        with profiling.instrument([target.strip() for target in targets.split(",") if target.strip()]) as timer:
+            await asyncio.sleep(seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"targets": targets, "seconds": seconds, "functions": timer.report()}
@@ -0,0 +1 @@
+# Scripts de benchmark du backend RAG (exécuter depuis la racine du projet : python -m rag_backend.benchmarks.<script>)
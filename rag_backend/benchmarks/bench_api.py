@@ -0,0 +1,308 @@
+"""
+Suite de benchmarks de l'API, exécutée en processus (httpx + ASGITransport, sans réseau).
+
+L'application est lancée contre un stockage jetable : index NumPy en mémoire (par défaut)
+ou ChromaDB (serveur des settings, collection dédiée), fichiers forces/faiblesses dans un
+répertoire temporaire, encodeur factice (hachage des mots, coût réglable) à la place du
+modèle, et API Groq simulée (latence réglable). Des corpus synthétiques EDLS et
+Forces/Faiblesses de taille configurable sont générés puis indexés via l'API.
+
+Scénarios mesurés (débit et latence p50/p95/p99) : /add-edls, /add-forces, /add-document,
+/search (dense, lexical, hybrid), /answer-question, CRUD forces/faiblesses, /api/rhdpchat,
+et une indexation en masse (débit en documents/s, comme indexer.py).
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_api --edls 500 --forces 1000 --json bench.json
+    python -m rag_backend.benchmarks.bench_api --concurrency 16 --compare bench.json --max-regression 0.2
+    python -m rag_backend.benchmarks.bench_api --embedder configured   # vrai modèle (settings.EMBEDDING_BACKEND)
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from ..forces_models import TypeElement
+from .load_test import run_level
+
+# Les résultats sont écrits sur la sortie d'origine : les logs de l'application peuvent être masqués
+report = partial(print, file=sys.__stdout__, flush=True)
+
+VOCABULARY = (
+    "parti militants élections mobilisation campagne région candidat programme sondage jeunesse "
+    "économie emploi santé éducation infrastructures sécurité réforme constitution assemblée vote "
+    "coalition opposition gouvernement président ministre budget dette agriculture cacao route "
+    "électricité eau corruption justice presse réseaux sociaux rassemblement meeting militantisme "
+    "alliance stratégie communication territoire commune village abidjan bouaké yamoussoukro"
+).split()
+
+ELEMENT_TYPES = [t.value for t in TypeElement]
+
+
+class HashingEmbedder:
+    """Encodeur factice : sac de mots haché en 384 dimensions, avec un coût CPU optionnel par texte."""
+
+    backend = "fake"
+
+    def __init__(self, dim: int = 384, cost_ms: float = 0.0):
+        self.dim = dim
+        self.cost_ms = cost_ms
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+        if self.cost_ms:
+            # Attente active : occupe le CPU comme une vraie inférence
+            deadline = time.perf_counter() + self.cost_ms * len(texts) / 1000.0
+            while time.perf_counter() < deadline:
+                pass
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n_words)).capitalize() + "."
+
+
+def make_edls_corpus(n_docs: int, words_per_doc: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n_docs):
+        content = " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(max(1, words_per_doc // 14)))
+        corpus.append({
+            "id": f"bench-{i:06d}",
+            "title": _sentence(rng, 6),
+            "content": content,
+            "aiAnalysis": {"summary": _sentence(rng, 25), "keyPoints": [_sentence(rng, 8) for _ in range(3)]},
+            "status": rng.choice(["new", "analyzed"]),
+            "classification": rng.choice(["public", "interne"]),
+            "createdAt": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        })
+    return corpus
+
+
+def make_forces_corpus(n_items: int, n_parties: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{
+        "id": f"bench-sw-{i:06d}",
+        "party_id": f"bench-party-{i % n_parties}",
+        "type": rng.choice(ELEMENT_TYPES),
+        "categorie": rng.choice(["politique", "économie", "social"]),
+        "contenu": " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(3)),
+        "resume": _sentence(rng, 12),
+        "source": "benchmark",
+        "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    } for i in range(n_items)]
+
+
+def _stub_groq(latency_ms: float):
+    """Remplace l'appel HTTP à Groq par une réponse simulée après `latency_ms`."""
+    from .. import rhdpchat_api
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_ms / 1000.0)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Réponse simulée."}}]})
+
+    rhdpchat_api.GROQ_API_KEY_RHDPCHAT = "benchmark"
+    rhdpchat_api.httpx = SimpleNamespace(AsyncClient=partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+
+
+def setup_app(workdir: str, store_backend: str, embedder: str, encode_cost_ms: float, llm_latency_ms: float):
+    """Configure l'application sur un stockage jetable et retourne (app, moteur RAG)."""
+    from .. import forces_store, main
+    from ..config import settings
+    from ..rag_engine import RAGEngine
+    from ..vector_store import ChromaVectorStore, NumpyVectorStore
+
+    settings.RAG_WARMUP = False
+    settings.EMBEDDING_CACHE = False
+    # Tous les clients du benchmark partagent la même IP : le limiteur de débit fausserait les mesures
+    settings.RATE_LIMIT_ENABLED = False
+    forces_store.DB_PARTIES_FILE = os.path.join(workdir, "parties.json")
+    forces_store.DB_SW_FILE = os.path.join(workdir, "strengths_weaknesses.json")
+    forces_store.DB_MEDIA_FILE = os.path.join(workdir, "media_files.json")
+    forces_store._loaded = False
+    forces_store.ensure_loaded()
+
+    if store_backend == "chroma":
+        store = ChromaVectorStore(f"bench_{int(time.time())}")
+    else:
+        store = NumpyVectorStore(persist_dir=os.path.join(workdir, "vector_store"), auto_persist=False)
+    rag = RAGEngine(store=store)
+    if embedder == "fake":
+        rag._model = HashingEmbedder(cost_ms=encode_cost_ms)
+    main._rag = rag
+    _stub_groq(llm_latency_ms)
+    return main.app, rag
+
+
+def bench_bulk_indexing(rag, edls: List[Dict[str, Any]], forces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Indexation en masse sans passer par HTTP, comme indexer.py (une seule sauvegarde à la fin)."""
+    results = {}
+    for name, items, index in (
+        ("edls", edls, rag.add_edls_document),
+        ("forces", forces, lambda item: rag.add_forces_faiblesses_document(item, "Parti benchmark")),
+    ):
+        start = time.perf_counter()
+        errors = sum(1 for item in items if index(item).get("status") != "success")
+        rag.store.persist()
+        elapsed = time.perf_counter() - start
+        results[name] = {"documents": len(items), "errors": errors, "elapsed_s": round(elapsed, 3),
+                         "docs_per_s": round(len(items) / elapsed, 1) if elapsed else 0.0}
+    return results
+
+
+async def run_scenarios(app, args, edls, forces) -> Dict[str, Any]:
+    rng = random.Random(0)
+    counter = itertools.count()
+    queries = [_sentence(rng, 5) for _ in range(64)]
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        async def measure(name: str, route: Dict[str, Any], n_requests: Optional[int] = None):
+            results[name] = await run_level(client, route, args.concurrency, n_requests or args.requests)
+            r = results[name]
+            report(f"{name:<24} {r['throughput_rps']:>9.1f} req/s  p50 {r.get('p50_ms', float('nan')):>8.2f} ms  "
+                  f"p99 {r.get('p99_ms', float('nan')):>8.2f} ms  {r['statuses']}")
+
+        # Écritures : chaque requête indexe un document différent du corpus
+        edls_iter, forces_iter = iter(edls), iter(forces)
+        await measure("add_edls", {"method": "POST", "path": "/add-edls",
+                                   "json": lambda: {"edls_data": next(edls_iter)}}, len(edls))
+        await measure("add_forces", {"method": "POST", "path": "/add-forces",
+                                     "json": lambda: {"force_data": next(forces_iter),
+                                                      "party_name": "Parti benchmark"}}, len(forces))
+        await measure("add_document", {"method": "POST", "path": "/add-document",
+                                       "json": lambda: {"doc_id": f"bench-doc-{next(counter)}",
+                                                        "text": _sentence(rng, 40)}})
+        # Lectures
+        for mode in ("dense", "lexical", "hybrid"):
+            await measure(f"search_{mode}", {"method": "POST", "path": "/search", "json": lambda mode=mode: {
+                "query": rng.choice(queries), "n_results": 5, "mode": mode}})
+        await measure("search_filtered", {"method": "POST", "path": "/search", "json": lambda: {
+            "query": rng.choice(queries), "n_results": 5, "filters": {"document_type": "edls"}}})
+        await measure("answer_question", {"method": "POST", "path": "/answer-question", "json": lambda: {
+            "question": rng.choice(queries), "n_results_for_context": 3}})
+        # CRUD forces/faiblesses
+        party_ids: List[str] = []
+        created_sw: List[str] = []
+        await measure("parties_create", {"method": "POST", "path": "/parties", "json": lambda: {
+            "nom": f"Parti {next(counter)}", "description": _sentence(rng, 10)}}, args.parties)
+        party_ids.extend(p["id"] for p in (await client.get("/parties")).json())
+        await measure("parties_list", {"method": "GET", "path": "/parties"})
+        sw_requests = args.requests
+        await measure("forces_create", {"method": "POST", "path": "/forces-faiblesses", "json": lambda: {
+            "party_id": rng.choice(party_ids), "type": rng.choice(ELEMENT_TYPES),
+            "contenu": _sentence(rng, 30), "date_": "2024-06-01"}}, sw_requests)
+        for party_id in party_ids:
+            created_sw.extend(sw["id"] for sw in (await client.get(f"/forces-faiblesses/{party_id}")).json())
+        await measure("forces_list", {"method": "GET",
+                                      "path": lambda: f"/forces-faiblesses/{rng.choice(party_ids)}"})
+        await measure("forces_delete", {"method": "DELETE",
+                                        "path": lambda: f"/forces-faiblesses/{created_sw.pop()}"},
+                      min(len(created_sw), args.requests))
+        await measure("dashboard_summary", {"method": "GET", "path": "/dashboard-summary"})
+        # LLM en amont simulé
+        await measure("rhdpchat", {"method": "POST", "path": "/api/rhdpchat",
+                                   "json": lambda: {"query": rng.choice(queries)}})
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: Optional[float]) -> List[str]:
+    """Affiche l'évolution du débit et du p99 par scénario ; retourne les régressions au-delà du seuil."""
+    regressions = []
+    report("\nComparaison avec la référence:")
+    for name, r in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("throughput_rps") or not r.get("throughput_rps"):
+            continue
+        ratio = r["throughput_rps"] / before["throughput_rps"]
+        p99_ratio = r["p99_ms"] / before["p99_ms"] if r.get("p99_ms") and before.get("p99_ms") else float("nan")
+        flag = ""
+        if max_regression is not None and (ratio < 1 - max_regression or p99_ratio > 1 + max_regression):
+            regressions.append(name)
+            flag = "  <-- RÉGRESSION"
+        report(f"  {name:<24} débit x{ratio:.2f}  p99 x{p99_ratio:.2f}{flag}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de l'API")
+    parser.add_argument("--edls", type=int, default=200, help="Taille du corpus EDLS synthétique")
+    parser.add_argument("--edls-words", type=int, default=400, help="Nombre de mots par document EDLS")
+    parser.add_argument("--forces", type=int, default=500, help="Taille du corpus Forces/Faiblesses synthétique")
+    parser.add_argument("--parties", type=int, default=10, help="Nombre de partis créés")
+    parser.add_argument("--requests", type=int, default=300, help="Requêtes par scénario de lecture")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("--store", choices=["numpy", "chroma"], default="numpy",
+                        help="numpy (en mémoire) ou chroma (serveur défini dans les settings)")
+    parser.add_argument("--embedder", choices=["fake", "configured"], default="fake",
+                        help="fake (hachage) ou configured (settings.EMBEDDING_BACKEND)")
+    parser.add_argument("--encode-cost-ms", type=float, default=0.0, help="Coût CPU simulé par texte encodé (fake)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Latence simulée de l'API Groq")
+    parser.add_argument("--compare", help="Fichier JSON d'un précédent lancement servant de référence")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Avec --compare : code de sortie 1 si débit ou p99 se dégradent de plus de cette fraction")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les logs de l'application")
+    args = parser.parse_args()
+
+    edls = make_edls_corpus(args.edls, args.edls_words)
+    forces = make_forces_corpus(args.forces, args.parties)
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with tempfile.TemporaryDirectory(prefix="rag_bench_") as workdir, quiet:
+        app, rag = setup_app(workdir, args.store, args.embedder, args.encode_cost_ms, args.llm_latency_ms)
+        report(f"{'scénario':<24} {'débit':>15}  latences")
+        scenarios = asyncio.run(run_scenarios(app, args, edls, forces))
+
+        # Indexation en masse dans un moteur neuf (même configuration de stockage)
+        bulk_dir = os.path.join(workdir, "bulk")
+        os.makedirs(bulk_dir)
+        _, bulk_rag = setup_app(bulk_dir, args.store, args.embedder, args.encode_cost_ms, args.llm_latency_ms)
+        indexing = bench_bulk_indexing(bulk_rag, edls, forces)
+        for name, r in indexing.items():
+            report(f"indexation_{name:<13} {r['docs_per_s']:>9.1f} docs/s ({r['documents']} docs, {r['errors']} erreurs)")
+
+    results = {
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "json_path", "max_regression")},
+        "scenarios": scenarios,
+        "indexing": indexing,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
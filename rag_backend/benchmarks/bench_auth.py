@@ -0,0 +1,120 @@
+"""
+Benchmark de l'authentification, exécuté en processus (httpx + ASGITransport, sans réseau).
+
+Scénarios mesurés (débit et latence p50/p95/p99) :
+- login : POST /token (vérification bcrypt du mot de passe) ;
+- me : GET /users/me/ avec un token valide, cache des tokens validés activé puis désactivé ;
+- réactivité : latence de GET /health pendant une rafale de connexions. Avec bcrypt exécuté
+  sur la boucle d'événements (--blocking-login, comportement d'origine), chaque connexion
+  gèle toutes les autres requêtes du worker.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_auth --logins 64 --concurrency 16 --json auth.json
+    python -m rag_backend.benchmarks.bench_auth --blocking-login   # référence : bcrypt sur la boucle
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from .bench_api import git_commit, report
+from .bench_vector_store import summarize
+from .load_test import run_level
+
+LOGIN_FORM = {"username": "johndoe", "password": "secretpassword"}
+
+
+def setup_app(blocking_login: bool):
+    from .. import main, security
+    from ..config import settings
+
+    settings.RAG_WARMUP = False
+    if blocking_login:
+        async def averify_password_inline(plain_password: str, hashed_password: str) -> bool:
+            return security.verify_password(plain_password, hashed_password)
+        main.averify_password = averify_password_inline
+    return main.app
+
+
+async def probe_latency(client: httpx.AsyncClient, path: str, stop: asyncio.Event, interval_s: float) -> List[float]:
+    """
+    Latences d'une route légère interrogée à intervalle régulier jusqu'à `stop`. Chaque latence
+    est comptée depuis l'instant prévu de la sonde : une boucle d'événements gelée retarde
+    aussi l'envoi, comme pour une requête arrivée pendant le gel.
+    """
+    latencies = []
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get(path)
+        latencies.append(time.perf_counter() - scheduled)
+        scheduled += interval_s
+    return latencies
+
+
+async def run(app, args) -> Dict[str, Any]:
+    from .. import security
+    from ..config import settings
+
+    login_route = {"method": "POST", "path": "/token", "data": LOGIN_FORM}
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        response = await client.post("/token", data=LOGIN_FORM)
+        response.raise_for_status()
+        me_route = {"method": "GET", "path": "/users/me/",
+                    "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
+
+        results["login"] = await run_level(client, login_route, args.concurrency, args.logins)
+
+        cache_size = settings.TOKEN_CACHE_SIZE
+        for name, size in (("me_cached", cache_size), ("me_uncached", 0)):
+            settings.TOKEN_CACHE_SIZE = size
+            security.clear_token_cache()
+            results[name] = await run_level(client, me_route, args.concurrency, args.requests)
+        settings.TOKEN_CACHE_SIZE = cache_size
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_latency(client, "/health", stop, args.probe_interval_ms / 1000))
+        await run_level(client, login_route, args.concurrency, args.logins)
+        stop.set()
+        results["health_during_logins"] = summarize(await probe)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'authentification")
+    parser.add_argument("--logins", type=int, default=32, help="Connexions par scénario de login")
+    parser.add_argument("--requests", type=int, default=2000, help="Requêtes authentifiées par scénario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients simultanés")
+    parser.add_argument("--probe-interval-ms", type=float, default=10.0, help="Intervalle entre deux sondes /health")
+    parser.add_argument("--blocking-login", action="store_true",
+                        help="Vérifier le mot de passe sur la boucle d'événements (comportement d'origine)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les logs de l'application")
+    args = parser.parse_args()
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        app = setup_app(args.blocking_login)
+        results = asyncio.run(run(app, args))
+
+    report(f"{'scénario':<22} {'débit':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        throughput = f"{r['throughput_rps']:>8.1f} r/s" if "throughput_rps" in r else f"{'-':>12}"
+        report(f"{name:<22} {throughput} {r.get('p50_ms', float('nan')):>9.1f} {r.get('p99_ms', float('nan')):>9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"commit": git_commit(), "config": {k: v for k, v in vars(args).items() if k != "json_path"},
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
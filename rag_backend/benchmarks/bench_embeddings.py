@@ -0,0 +1,165 @@
+"""
+Benchmark des backends d'embedding : PyTorch (sentence-transformers) vs ONNX Runtime (float32 et int8).
+
+Chaque backend est mesuré dans un processus séparé (RSS non pollué par les autres) :
+temps de chargement, débit d'encodage (textes/s), latence d'une requête unitaire
+et mémoire résidente. La parité numérique est vérifiée par rapport à PyTorch :
+cosinus entre les embeddings d'un même texte et recouvrement des k plus proches voisins.
+
+Prérequis pour ONNX : python -m rag_backend.export_onnx
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_embeddings --texts 512
+    python -m rag_backend.benchmarks.bench_embeddings --min-cosine 0.99 --json embeddings.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .bench_vector_store import summarize
+
+CONFIGS = {
+    "pytorch": {"backend": "sentence-transformers"},
+    "onnx-fp32": {"backend": "onnx", "quantized": False},
+    "onnx-int8": {"backend": "onnx", "quantized": True},
+}
+
+SAMPLE_SENTENCES = [
+    "Le RHDP renforce sa mobilisation dans les régions du nord.",
+    "Les militants du PDCI contestent la révision de la liste électorale.",
+    "Analyse des points forts de la campagne présidentielle et des réponses possibles.",
+    "La commission électorale indépendante publie le calendrier des scrutins.",
+    "Faiblesse identifiée : communication insuffisante auprès des jeunes électeurs.",
+    "Article 48 de la Constitution et pouvoirs exceptionnels du président.",
+    "Réunion des cadres du parti à Abidjan pour préparer les législatives.",
+    "Les réseaux sociaux amplifient les critiques sur le coût de la vie.",
+]
+
+
+def make_texts(n: int) -> List[str]:
+    """Textes de longueurs variées (phrases répétées) pour couvrir des séquences courtes et longues."""
+    texts = []
+    for i in range(n):
+        repeat = 1 + (i % 6) * 3
+        texts.append(" ".join(SAMPLE_SENTENCES[(i + j) % len(SAMPLE_SENTENCES)] for j in range(repeat)))
+    return texts
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_worker(config_name: str, n_texts: int, batch_size: int, output_path: str):
+    """Exécuté dans un sous-processus : mesure un backend et sauvegarde ses embeddings."""
+    from ..embeddings import OnnxEmbedder, SentenceTransformerEmbedder
+
+    config = CONFIGS[config_name]
+    texts = make_texts(n_texts)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if config["backend"] == "onnx":
+        embedder = OnnxEmbedder(quantized=config["quantized"])
+    else:
+        embedder = SentenceTransformerEmbedder()
+    load_s = time.perf_counter() - start
+
+    embedder.encode(texts[:batch_size], batch_size=batch_size)  # échauffement
+    start = time.perf_counter()
+    vectors = embedder.encode(texts, batch_size=batch_size)
+    batch_s = time.perf_counter() - start
+
+    single = []
+    for text in texts[:100]:
+        start = time.perf_counter()
+        embedder.encode([text])
+        single.append(time.perf_counter() - start)
+
+    np.save(output_path, vectors)
+    print(json.dumps({
+        "load_s": round(load_s, 3),
+        "throughput_texts_per_s": round(len(texts) / batch_s, 1),
+        "single_query": summarize(single),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_model_mb": round(rss_mb() - rss_before, 1),
+    }))
+
+
+def parity(reference: np.ndarray, candidate: np.ndarray, k: int = 10) -> Dict[str, float]:
+    cosines = np.sum(reference * candidate, axis=1)
+    ref_neighbours = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+    cand_neighbours = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1:k + 1]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(ref_neighbours, cand_neighbours)]
+    return {
+        "cosine_min": round(float(cosines.min()), 5),
+        "cosine_mean": round(float(cosines.mean()), 5),
+        f"neighbours_overlap_at_{k}": round(float(np.mean(overlap)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends d'embedding")
+    parser.add_argument("--texts", type=int, default=512, help="Nombre de textes encodés")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="Configurations à mesurer")
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="Cosinus minimal attendu avec PyTorch (code de sortie 1 sinon)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.texts, args.batch_size, args.output)
+        return
+
+    results: Dict[str, Any] = {"texts": args.texts, "batch_size": args.batch_size, "backends": {}}
+    vectors: Dict[str, np.ndarray] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.configs.split(","):
+            output = os.path.join(tmp, f"{name}.npy")
+            proc = subprocess.run(
+                [sys.executable, "-m", "rag_backend.benchmarks.bench_embeddings", "--worker", name,
+                 "--texts", str(args.texts), "--batch-size", str(args.batch_size), "--output", output],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"[{name}] échec: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+                continue
+            results["backends"][name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors[name] = np.load(output)
+
+    failed = False
+    if "pytorch" in vectors:
+        for name, candidate in vectors.items():
+            if name != "pytorch":
+                results["backends"][name]["parity"] = parity(vectors["pytorch"], candidate)
+                failed |= results["backends"][name]["parity"]["cosine_min"] < args.min_cosine
+
+    print(f"{'backend':<11} {'chargement':>10} {'textes/s':>9} {'p50 1 req.':>11} {'RSS (Mo)':>9} {'cos. min':>9}")
+    for name, data in results["backends"].items():
+        cosine = data.get("parity", {}).get("cosine_min", 1.0 if name == "pytorch" else float("nan"))
+        print(f"{name:<11} {data['load_s']:>9.2f}s {data['throughput_texts_per_s']:>9.1f} "
+              f"{data['single_query']['p50_ms']:>9.2f}ms {data['rss_mb']:>9.1f} {cosine:>9.4f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        print(f"Parité insuffisante: cosinus minimal < {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Microbenchmarks du store Forces/Faiblesses (forces_store.py) en fonction de la taille des données.
+
+Pour chaque taille (N partis x M éléments par parti x K fichiers média par élément), un jeu de
+données synthétique est écrit dans un répertoire temporaire puis on mesure :
+- add_strength_weakness, add_media_to_strength_weakness (réécriture des fichiers JSON) ;
+- list_strengths_weaknesses (parcours des dictionnaires) ;
+- delete_party (suppression en cascade des éléments) ;
+- le chargement des fichiers (ensure_loaded) et l'import du module dans un processus neuf.
+
+Les courbes d'échelle (p50 par taille) sont complétées par l'exposant de croissance estimé
+(pente log-log vs nombre total d'éléments : ~0 constant, ~1 linéaire).
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_forces_store --parties 10,50 --elements 10,100 --media 0,2
+    python -m rag_backend.benchmarks.bench_forces_store --repeat 50 --json forces_store.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from .. import forces_outbox, forces_store
+from ..forces_models import MediaFile, MediaType, PoliticalParty, StrengthWeakness, TypeElement
+from .bench_vector_store import summarize
+
+OPERATIONS = ("add_strength_weakness", "list_strengths_weaknesses", "add_media_to_strength_weakness",
+              "delete_party", "load", "import")
+
+
+def use_directory(workdir: str):
+    """Fait pointer forces_store vers des fichiers du répertoire donné (rechargés au prochain accès)."""
+    forces_store.DB_PARTIES_FILE = os.path.join(workdir, "parties.json")
+    forces_store.DB_SW_FILE = os.path.join(workdir, "strengths_weaknesses.json")
+    forces_store.DB_MEDIA_FILE = os.path.join(workdir, "media_files.json")
+    forces_store.MEDIA_UPLOAD_DIR = os.path.join(workdir, "uploads")
+    forces_store._loaded = False
+    # Les événements émis par les mutations ne doivent pas atteindre le journal réel
+    forces_outbox.OUTBOX_DIR = os.path.join(workdir, "outbox")
+
+
+def populate(n_parties: int, n_elements: int, n_media: int, seed: int = 0) -> List[str]:
+    """Remplit le store (N x M x K) et l'écrit une seule fois sur disque. Retourne les ids des partis."""
+    rng = random.Random(seed)
+    forces_store.ensure_loaded()
+    types = list(TypeElement)
+    for p in range(n_parties):
+        party_id = f"party-{p}"
+        forces_store.political_parties_db[party_id] = PoliticalParty(
+            id=party_id, nom=f"Parti {p}", description="Parti synthétique")
+        for e in range(n_elements):
+            sw_id = f"sw-{p}-{e}"
+            media = [MediaFile(id=f"media-{p}-{e}-{k}", element_id=sw_id, file_path=f"/inexistant/{p}-{e}-{k}.jpg",
+                               media_type=MediaType.IMAGE, importance=rng.randint(1, 5)) for k in range(n_media)]
+            forces_store.strengths_weaknesses_db[sw_id] = StrengthWeakness(
+                id=sw_id, party_id=party_id, type=rng.choice(types), categorie="politique",
+                contenu="Élément synthétique " * 20, date=date(2024, rng.randint(1, 12), 1), media_files=media)
+            for m in media:
+                forces_store.media_files_db[m.id] = m
+    forces_store._save_parties()
+    forces_store._save_sw()
+    forces_store._save_media_files()
+    return list(forces_store.political_parties_db)
+
+
+def time_calls(func: Callable[[int], Any], repeat: int) -> List[float]:
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_import(workdir: str, repeat: int) -> List[float]:
+    """Import du module puis premier chargement des fichiers, dans un processus Python neuf."""
+    script = (
+        "import time; start = time.perf_counter(); "
+        "from rag_backend.benchmarks.bench_forces_store import use_directory; "
+        "from rag_backend import forces_store; "
+        f"use_directory({workdir!r}); forces_store.ensure_loaded(); "
+        "print(time.perf_counter() - start)"
+    )
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    return [float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                                 env=env).stdout.strip().splitlines()[-1]) for _ in range(repeat)]
+
+
+def bench_size(n_parties: int, n_elements: int, n_media: int, repeat: int, import_runs: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="forces_bench_") as workdir:
+        use_directory(workdir)
+        os.makedirs(forces_store.MEDIA_UPLOAD_DIR, exist_ok=True)
+        party_ids = populate(n_parties, n_elements, n_media)
+        sizes = {name: os.path.getsize(path) for name, path in (
+            ("parties", forces_store.DB_PARTIES_FILE), ("strengths_weaknesses", forces_store.DB_SW_FILE),
+            ("media_files", forces_store.DB_MEDIA_FILE))}
+        rng = random.Random(1)
+        sw_ids = list(forces_store.strengths_weaknesses_db)
+        results: Dict[str, Any] = {}
+
+        results["list_strengths_weaknesses"] = time_calls(
+            lambda i: forces_store.list_strengths_weaknesses(rng.choice(party_ids)), repeat)
+        results["add_strength_weakness"] = time_calls(
+            lambda i: forces_store.add_strength_weakness(rng.choice(party_ids), "force", "Nouvel élément",
+                                                         date(2024, 6, 1)), repeat)
+        results["add_media_to_strength_weakness"] = time_calls(
+            lambda i: forces_store.add_media_to_strength_weakness(rng.choice(sw_ids), f"/inexistant/new-{i}.jpg",
+                                                                  "image"), repeat)
+        results["load"] = time_calls(lambda i: (setattr(forces_store, "_loaded", False),
+                                                forces_store.ensure_loaded()), repeat)
+        results["import"] = time_import(workdir, import_runs) if import_runs else []
+        # En dernier : chaque appel supprime un parti et ses éléments
+        deletable = party_ids[:min(repeat, len(party_ids))]
+        results["delete_party"] = time_calls(lambda i: forces_store.delete_party(deletable[i]), len(deletable))
+
+    return {
+        "parties": n_parties, "elements_per_party": n_elements, "media_per_element": n_media,
+        "total_elements": n_parties * n_elements, "file_bytes": sizes,
+        "operations": {op: summarize(samples) for op, samples in results.items() if samples},
+    }
+
+
+def scaling_exponents(runs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Pente log-log du p50 de chaque opération en fonction du nombre total d'éléments."""
+    exponents = {}
+    for op in OPERATIONS:
+        points = [(r["total_elements"], r["operations"][op]["p50_ms"]) for r in runs
+                  if op in r["operations"] and r["total_elements"] > 0 and r["operations"][op]["p50_ms"] > 0]
+        if len({n for n, _ in points}) >= 2:
+            x, y = np.log([n for n, _ in points]), np.log([ms for _, ms in points])
+            exponents[op] = round(float(np.polyfit(x, y, 1)[0]), 2)
+    return exponents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks du store Forces/Faiblesses")
+    parser.add_argument("--parties", default="5,20,80", help="Nombres de partis (N), séparés par des virgules")
+    parser.add_argument("--elements", default="10,50", help="Éléments par parti (M)")
+    parser.add_argument("--media", default="0,2", help="Fichiers média par élément (K)")
+    parser.add_argument("--repeat", type=int, default=20, help="Répétitions par opération")
+    parser.add_argument("--import-runs", type=int, default=3, help="Mesures d'import en processus neuf (0 = aucune)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    grid = itertools.product(*(sorted(int(v) for v in values.split(",") if v.strip())
+                               for values in (args.parties, args.elements, args.media)))
+    runs = []
+    print(f"{'N':>5} {'M':>5} {'K':>3} {'total':>7} " + " ".join(f"{op[:14]:>14}" for op in OPERATIONS) + "  (p50 ms)")
+    for n_parties, n_elements, n_media in grid:
+        run = bench_size(n_parties, n_elements, n_media, args.repeat, args.import_runs)
+        runs.append(run)
+        cells = [f"{run['operations'][op]['p50_ms']:>14.3f}" if op in run["operations"] else f"{'-':>14}"
+                 for op in OPERATIONS]
+        print(f"{n_parties:>5} {n_elements:>5} {n_media:>3} {run['total_elements']:>7} " + " ".join(cells))
+
+    exponents = scaling_exponents(runs)
+    print("\nExposant de croissance (p50 ~ total^k) : " + ", ".join(f"{op}={k}" for op, k in exponents.items()))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": runs, "scaling_exponents": exponents}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
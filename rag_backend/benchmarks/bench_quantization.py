@@ -0,0 +1,108 @@
+"""
+Benchmark de la quantification de l'index NumPy : mémoire, latence et recall@k
+par rapport à la recherche exacte en float32.
+
+Par défaut les vecteurs sont lus depuis l'index "numpy" persisté (nos données
+réelles) ; à défaut, un corpus synthétique groupé en thèmes est généré.
+Les requêtes sont des vecteurs du corpus légèrement bruités.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_quantization
+    python -m rag_backend.benchmarks.bench_quantization --store-dir rag_backend/vector_store/docs --k 10
+    python -m rag_backend.benchmarks.bench_quantization --docs 20000 --json quantization.json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from ..vector_store import BASE_DIR, NumpyVectorStore
+from .bench_vector_store import summarize
+
+
+def load_vectors(store_dir: str) -> np.ndarray:
+    store = NumpyVectorStore(persist_dir=store_dir, auto_persist=False)
+    return np.asarray(store._matrix[:store.count()], dtype=np.float32)
+
+
+def make_clustered_corpus(n_docs: int, dim: int, n_topics: int = 50, seed: int = 42) -> np.ndarray:
+    """Corpus synthétique : des thèmes (centres) et des documents bruités autour, comme des embeddings réels."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_topics, n_docs)] + 0.6 * rng.standard_normal((n_docs, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, n_queries: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), n_queries)]
+    noisy = picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(picked.shape[1])
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def run_config(vectors: np.ndarray, queries: np.ndarray, k: int, quantization: str,
+               rescore: int, exact_ids) -> Dict[str, Any]:
+    store = NumpyVectorStore(auto_persist=False, quantization=quantization, rescore_candidates=rescore)
+    ids = [str(i) for i in range(len(vectors))]
+    store.add(ids=ids, embeddings=vectors)
+    samples, recalls = [], []
+    for q, expected in zip(queries, exact_ids):
+        start = time.perf_counter()
+        found = store.query(query_embeddings=[q], n_results=k, include=[])["ids"][0]
+        samples.append(time.perf_counter() - start)
+        recalls.append(len(set(found) & expected) / k)
+    memory = store.memory_usage()
+    return {
+        "quantization": quantization,
+        "rescore_candidates": rescore,
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "scan_mb": round(memory["scan_bytes"] / 2**20, 2),
+        "search": summarize(samples),
+    }
+
+
+def main():
+    default_store = os.path.join(BASE_DIR, "vector_store", "docs")
+    parser = argparse.ArgumentParser(description="Recall@k et mémoire de l'index quantifié")
+    parser.add_argument("--store-dir", default=default_store, help="Index 'numpy' persisté à utiliser comme corpus")
+    parser.add_argument("--docs", type=int, default=10000, help="Taille du corpus synthétique (si pas d'index persisté)")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension du corpus synthétique")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--k", type=int, default=5, help="k du recall@k")
+    parser.add_argument("--rescore", type=int, default=50, help="Candidats rescorés en float32")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.store_dir) if os.path.isdir(args.store_dir) else np.zeros((0, args.dim))
+    source = args.store_dir
+    if len(vectors) < args.k:
+        vectors = make_clustered_corpus(args.docs, args.dim)
+        source = "synthétique"
+    queries = make_queries(vectors, args.queries)
+
+    # Vérité terrain : recherche exacte float32
+    exact = queries @ vectors.T
+    exact_ids = [set(str(i) for i in np.argsort(-row)[:args.k]) for row in exact]
+
+    configs = [("none", 0), ("float16", 0), ("float16", args.rescore), ("int8", 0), ("int8", args.rescore)]
+    results = {"source": source, "docs": len(vectors), "dim": int(vectors.shape[1]), "k": args.k, "configs": []}
+    for quantization, rescore in configs:
+        results["configs"].append(run_config(vectors, queries, args.k, quantization, rescore, exact_ids))
+
+    print(f"Corpus: {source} ({len(vectors)} vecteurs, dim {vectors.shape[1]}), k={args.k}")
+    print(f"{'mode':<10} {'rescore':>8} {'recall@k':>9} {'mémoire (Mo)':>13} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for r in results["configs"]:
+        print(f"{r['quantization']:<10} {r['rescore_candidates']:>8} {r['recall_at_k']:>9.4f} "
+              f"{r['scan_mb']:>13.2f} {r['search']['p50_ms']:>9.3f} {r['search']['p99_ms']:>9.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark de la sérialisation JSON et de la compression des réponses volumineuses.
+
+Charges utiles synthétiques de tailles typiques :
+- réponses de /search et /answer-question (n résultats avec le texte complet des passages) ;
+- GET /forces-faiblesses/{party_id} (M éléments avec K fichiers média imbriqués).
+
+Pour chacune, on compare le temps CPU de sérialisation du chemin FastAPI par défaut
+(jsonable_encoder ou validation/sérialisation du response_model, puis json.dumps) à celui de
+responses.py (orjson, pydantic-core), et les octets transmis : brut, gzip et brotli (si installé),
+avec le temps de compression.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_serialization
+    python -m rag_backend.benchmarks.bench_serialization --results 3,10,50 --elements 10,100,500 --json serialization.json
+"""
+
+import argparse
+import json
+import random
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from .. import compression, responses
+from ..forces_models import MediaFile, MediaType, StrengthWeakness, TypeElement
+from ..responses import FastJSONResponse, models_response
+from .bench_api import VOCABULARY
+from .bench_forces_store import time_calls
+from .bench_vector_store import summarize
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n_words))
+
+
+def make_search_payload(n_results: int, words_per_passage: int = 150, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    metadatas = [{
+        "doc_type": "edls", "source_type": "internal", "title": _text(rng, 6), "status": "new",
+        "created_at": "2024-05-01T10:00:00Z", "parent_id": f"edls_{i}", "chunk_index": 0, "chunk_count": 3,
+        "char_start": 0, "char_end": 900, "content_hash": f"{rng.getrandbits(160):040x}",
+    } for i in range(n_results)]
+    return {
+        "documents": [_text(rng, words_per_passage) for _ in range(n_results)],
+        "ids": [f"edls_{i}" for i in range(n_results)],
+        "distances": [rng.random() for _ in range(n_results)],
+        "metadatas": metadatas,
+        "timings": {"encode": 12.5, "vector_query": 3.2, "filter": 0.1, "format": 0.02},
+    }
+
+
+def make_forces_payload(n_elements: int, n_media: int, seed: int = 0) -> List[StrengthWeakness]:
+    rng = random.Random(seed)
+    types = list(TypeElement)
+    elements = []
+    for e in range(n_elements):
+        sw_id = f"sw-{e}"
+        elements.append(StrengthWeakness(
+            id=sw_id, party_id="party-0", type=rng.choice(types), categorie="politique",
+            contenu=_text(rng, 80), resume=_text(rng, 20), date=date(2024, rng.randint(1, 12), 1),
+            source="presse", auteur="analyste",
+            media_files=[MediaFile(id=f"media-{e}-{k}", element_id=sw_id, file_path=f"uploads/{e}-{k}.jpg",
+                                   media_type=MediaType.IMAGE, importance=rng.randint(1, 5)) for k in range(n_media)],
+        ))
+    return elements
+
+
+def _stdlib_json(content: Any) -> bytes:
+    # Rendu de fastapi.responses.JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def bench_payload(name: str, baseline: Callable[[], bytes], fast: Callable[[], bytes], repeat: int) -> Dict[str, Any]:
+    body = fast()
+    assert json.loads(body) == json.loads(baseline()), f"{name}: sérialisations différentes"
+    result: Dict[str, Any] = {
+        "payload": name,
+        "serialize_default": summarize(time_calls(lambda i: baseline(), repeat)),
+        "serialize_fast": summarize(time_calls(lambda i: fast(), repeat)),
+        "bytes": {"raw": len(body)},
+        "compress_ms": {},
+    }
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    for encoding in encodings:
+        result["bytes"][encoding] = len(compression.compress(body, encoding))
+        result["compress_ms"][encoding] = summarize(
+            time_calls(lambda i: compression.compress(body, encoding), repeat))["p50_ms"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la sérialisation et de la compression des réponses")
+    parser.add_argument("--results", default="3,10,50", help="Nombres de résultats de recherche")
+    parser.add_argument("--elements", default="10,100,500", help="Nombres d'éléments forces/faiblesses")
+    parser.add_argument("--media", type=int, default=2, help="Fichiers média par élément")
+    parser.add_argument("--repeat", type=int, default=200, help="Répétitions par mesure")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    runs = []
+    for n in (int(v) for v in args.results.split(",") if v.strip()):
+        payload = make_search_payload(n)
+        runs.append(bench_payload(
+            f"search_{n}", lambda: _stdlib_json(jsonable_encoder(payload)),
+            lambda: FastJSONResponse(payload).body, args.repeat))
+
+    adapter = TypeAdapter(List[StrengthWeakness])
+    for m in (int(v) for v in args.elements.split(",") if v.strip()):
+        elements = make_forces_payload(m, args.media)
+        # Chemin FastAPI avec response_model : validation de la valeur renvoyée, sérialisation, json.dumps
+        runs.append(bench_payload(
+            f"forces_{m}x{args.media}",
+            lambda: _stdlib_json(adapter.dump_python(adapter.validate_python(elements), mode="json")),
+            lambda: models_response(StrengthWeakness, elements).body, args.repeat))
+
+    print(f"{'charge':<16} {'défaut ms':>10} {'rapide ms':>10} {'gain':>6} {'brut o':>9} {'gzip o':>8} "
+          f"{'gzip ms':>8} {'br o':>8} {'br ms':>7}")
+    for r in runs:
+        default_ms, fast_ms = r["serialize_default"]["p50_ms"], r["serialize_fast"]["p50_ms"]
+        sizes, ms = r["bytes"], r["compress_ms"]
+        print(f"{r['payload']:<16} {default_ms:>10.3f} {fast_ms:>10.3f} {default_ms / fast_ms:>5.1f}x "
+              f"{sizes['raw']:>9} {sizes['gzip']:>8} {ms['gzip']:>8.3f} "
+              f"{sizes.get('br', '-'):>8} {ms.get('br', float('nan')):>7.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"orjson": responses.orjson is not None, "brotli": compression.brotli is not None,
+                       "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark du démarrage de l'API.
+
+Mesure, dans des processus Python neufs :
+- la durée d'import de `rag_backend.main` (et les modules les plus coûteux via -X importtime) ;
+- avec --serve, le délai avant que uvicorn réponde sur /health (liveness) puis sur /ready (modèle chargé).
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_startup --runs 5
+    python -m rag_backend.benchmarks.bench_startup --serve --port 8765 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+def time_import(module: str) -> Tuple[float, List[Tuple[int, str]]]:
+    """Durée totale d'import (s) et modules les plus coûteux (cumul en µs, nom)."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    costs = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        costs.append((int(parts[1]), parts[2].strip()))
+    costs.sort(reverse=True)
+    return elapsed, costs
+
+
+def wait_for(url: str, timeout_s: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout_s:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return float("nan")
+
+
+def time_serve(port: int, timeout_s: float) -> Dict[str, float]:
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "rag_backend.main:app", "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health_s = wait_for(f"http://127.0.0.1:{port}/health", timeout_s)
+        ready_s = health_s + wait_for(f"http://127.0.0.1:{port}/ready", timeout_s)
+        return {"health_s": round(health_s, 3), "ready_s": round(ready_s, 3)}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage de l'API")
+    parser.add_argument("--module", default="rag_backend.main", help="Module à importer")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de mesures d'import")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de modules les plus coûteux affichés")
+    parser.add_argument("--serve", action="store_true", help="Mesurer aussi le délai /health et /ready sous uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Délai maximal d'attente des sondes (s)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    durations, costs = [], []
+    for _ in range(args.runs):
+        elapsed, costs = time_import(args.module)
+        durations.append(elapsed)
+    results: Dict[str, Any] = {
+        "module": args.module,
+        "import_s": {"p50": round(float(np.median(durations)), 3), "max": round(max(durations), 3)},
+        "slowest_imports_ms": [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in costs[:args.top]],
+    }
+    if args.serve:
+        results["serve"] = time_serve(args.port, args.timeout)
+
+    print(f"Import de {args.module}: p50 {results['import_s']['p50']:.3f} s (max {results['import_s']['max']:.3f} s)")
+    for item in results["slowest_imports_ms"]:
+        print(f"  {item['cumulative_ms']:>9.1f} ms  {item['module']}")
+    if args.serve:
+        print(f"/health disponible après {results['serve']['health_s']} s, /ready après {results['serve']['ready_s']} s")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    # Exécuté depuis la racine du projet pour que rag_backend soit importable dans les sous-processus
+    os.environ.setdefault("PYTHONPATH", os.getcwd())
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark de latence de recherche : index NumPy en mémoire vs ChromaDB.
+
+Génère un corpus synthétique de vecteurs normalisés (dimension MiniLM : 384),
+l'insère dans chaque backend puis mesure la latence p50/p99 de `query()`
+avec et sans filtre de métadonnées.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.benchmarks.bench_vector_store --docs 5000 --queries 500
+    python -m rag_backend.benchmarks.bench_vector_store --chroma http   # serveur défini dans les settings
+    python -m rag_backend.benchmarks.bench_vector_store --chroma ephemeral --json results.json
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..vector_store import NumpyVectorStore, VectorStore
+
+DOC_TYPES = ["edls", "forces", "standard"]
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(samples) * 1000.0, q))
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile_ms(samples, 50), 3),
+        "p95_ms": round(percentile_ms(samples, 95), 3),
+        "p99_ms": round(percentile_ms(samples, 99), 3),
+        "mean_ms": round(float(np.mean(samples)) * 1000.0, 3),
+    }
+
+
+def make_corpus(n_docs: int, dim: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_docs, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"doc_{i}" for i in range(n_docs)]
+    documents = [f"document synthétique {i}" for i in range(n_docs)]
+    metadatas = [{"doc_type": DOC_TYPES[i % len(DOC_TYPES)], "source_type": "internal"} for i in range(n_docs)]
+    return ids, vectors, documents, metadatas
+
+
+def fill_store(store: VectorStore, ids, vectors, documents, metadatas, batch_size: int = 1000):
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        store.add(ids=ids[start:end], embeddings=vectors[start:end],
+                  documents=documents[start:end], metadatas=metadatas[start:end])
+
+
+def time_queries(store: VectorStore, queries: np.ndarray, n_results: int,
+                 where: Optional[Dict[str, Any]] = None) -> List[float]:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        store.query(query_embeddings=[q], n_results=n_results, where=where)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def make_chroma_store(mode: str, collection_name: str) -> VectorStore:
+    from ..vector_store import ChromaVectorStore
+    if mode == "http":
+        store = ChromaVectorStore(collection_name)
+        store.client.delete_collection(collection_name)
+        return ChromaVectorStore(collection_name)
+    # Client Chroma local (sans saut HTTP) : même interface, pour isoler le coût du transport
+    import chromadb
+    store = ChromaVectorStore.__new__(ChromaVectorStore)
+    store.client = chromadb.EphemeralClient()
+    store.collection = store.client.get_or_create_collection(name=collection_name, metadata={"hnsw:space": "cosine"})
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends de stockage vectoriel")
+    parser.add_argument("--docs", type=int, default=5000, help="Nombre de documents synthétiques")
+    parser.add_argument("--queries", type=int, default=500, help="Nombre de requêtes mesurées")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension des embeddings")
+    parser.add_argument("--k", type=int, default=5, help="Nombre de résultats par requête")
+    parser.add_argument("--chroma", choices=["none", "http", "ephemeral"], default="none",
+                        help="Inclure ChromaDB (serveur HTTP des settings ou client local éphémère)")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    ids, vectors, documents, metadatas = make_corpus(args.docs, args.dim)
+    queries = make_corpus(args.queries, args.dim, seed=7)[1]
+
+    stores = {"numpy": NumpyVectorStore(auto_persist=False)}
+    if args.chroma != "none":
+        stores[f"chroma-{args.chroma}"] = make_chroma_store(args.chroma, "bench_vector_store")
+
+    results: Dict[str, Any] = {"docs": args.docs, "queries": args.queries, "dim": args.dim, "k": args.k, "backends": {}}
+    for name, store in stores.items():
+        start = time.perf_counter()
+        fill_store(store, ids, vectors, documents, metadatas)
+        insert_s = time.perf_counter() - start
+        # Échauffement
+        time_queries(store, queries[:10], args.k)
+        results["backends"][name] = {
+            "insert_s": round(insert_s, 3),
+            "search": summarize(time_queries(store, queries, args.k)),
+            "search_filtered": summarize(time_queries(store, queries, args.k, where={"doc_type": "forces"})),
+        }
+
+    print(f"{args.docs} documents, {args.queries} requêtes, k={args.k}")
+    print(f"{'backend':<18} {'filtre':<8} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, data in results["backends"].items():
+        for label, key in (("non", "search"), ("oui", "search_filtered")):
+            print(f"{name:<18} {label:<8} {data[key]['p50_ms']:>10.3f} {data[key]['p99_ms']:>10.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
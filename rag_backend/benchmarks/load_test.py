@@ -0,0 +1,133 @@
+"""
+Test de charge de l'API (client httpx asynchrone, boucle fermée).
+
+Pour chaque niveau de concurrence, N clients envoient leurs requêtes en continu jusqu'à
+atteindre le nombre total demandé ; on mesure le débit (requêtes réussies par seconde),
+la latence p50/p95/p99 et la répartition des codes HTTP (dont les 503 des limites de
+concurrence). Lancer l'outil avant et après une modification, puis comparer avec --compare.
+
+Usage (depuis la racine du projet, API démarrée séparément):
+    python -m rag_backend.benchmarks.load_test --route search --concurrency 1,8,32,64 --json after.json
+    python -m rag_backend.benchmarks.load_test --route parties --requests 2000 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .bench_vector_store import summarize
+
+ROUTES: Dict[str, Dict[str, Any]] = {
+    "search": {"method": "POST", "path": "/search",
+               "json": {"query": "mobilisation des militants du parti", "n_results": 5}},
+    "answer": {"method": "POST", "path": "/answer-question",
+               "json": {"question": "Quelles sont les forces du parti ?", "n_results_for_context": 3}},
+    "parties": {"method": "GET", "path": "/parties"},
+    "health": {"method": "GET", "path": "/health"},
+}
+
+
+async def run_level(client: httpx.AsyncClient, route: Dict[str, Any], concurrency: int,
+                    n_requests: int) -> Dict[str, Any]:
+    """
+    Mesure une route à un niveau de concurrence. `path` et `json` peuvent être des fonctions
+    appelées à chaque requête (corps ou identifiants différents d'une requête à l'autre) ;
+    `data` (formulaire) et `headers` sont transmis tels quels.
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = n_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            path, payload = route["path"], route.get("json")
+            path = path() if callable(path) else path
+            payload = payload() if callable(payload) else payload
+            start = time.perf_counter()
+            try:
+                response = await client.request(route["method"], path, json=payload, data=route.get("data"),
+                                                headers=route.get("headers"))
+                statuses[str(response.status_code)] += 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result: Dict[str, Any] = {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "statuses": dict(statuses),
+    }
+    if latencies:
+        result.update(summarize(latencies))
+    return result
+
+
+async def run(url: str, route_name: str, levels: List[int], n_requests: int, warmup: int,
+              timeout_s: float) -> List[Dict[str, Any]]:
+    route = ROUTES[route_name]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout_s, limits=limits) as client:
+        if warmup:
+            await run_level(client, route, 1, warmup)
+        return [await run_level(client, route, level, n_requests) for level in levels]
+
+
+def print_results(results: List[Dict[str, Any]], baseline: Optional[List[Dict[str, Any]]] = None):
+    previous = {r["concurrency"]: r for r in baseline or []}
+    print(f"{'conc.':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  codes")
+    for r in results:
+        line = (f"{r['concurrency']:>6} {r['throughput_rps']:>9.1f} {r.get('p50_ms', float('nan')):>9.1f} "
+                f"{r.get('p95_ms', float('nan')):>9.1f} {r.get('p99_ms', float('nan')):>9.1f}  {r['statuses']}")
+        before = previous.get(r["concurrency"])
+        if before and before.get("throughput_rps") and before.get("p99_ms") and r.get("p99_ms"):
+            line += (f"  (débit x{r['throughput_rps'] / before['throughput_rps']:.2f}, "
+                     f"p99 x{r['p99_ms'] / before['p99_ms']:.2f} vs référence)")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL de base de l'API")
+    parser.add_argument("--route", choices=sorted(ROUTES), default="search")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="Niveaux de concurrence, séparés par des virgules")
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes par niveau de concurrence")
+    parser.add_argument("--warmup", type=int, default=20, help="Requêtes d'échauffement (non mesurées)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Délai maximal par requête (s)")
+    parser.add_argument("--compare", help="Fichier JSON d'un précédent lancement servant de référence")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats dans un fichier JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    results = asyncio.run(run(args.url, args.route, levels, args.requests, args.warmup, args.timeout))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            reference = json.load(f)
+        if reference.get("route") == args.route:
+            baseline = reference["results"]
+        else:
+            print(f"Référence ignorée : route {reference.get('route')} différente de {args.route}")
+    print(f"Route {args.route} ({args.url})")
+    print_results(results, baseline)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "route": args.route, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Découpage des documents longs en passages (chunks) avant l'encodage.
+
+MiniLM tronque ses entrées à 256 tokens : au-delà, le texte n'est jamais indexé.
+Les documents longs (EDLS) sont donc découpés en fenêtres de phrases qui se
+chevauchent ; chaque passage est stocké avec l'id de son document parent et
+ses positions (offsets en caractères) dans le texte complet.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+# Séparateur entre l'id du document parent et le numéro du passage
+CHUNK_ID_SEPARATOR = "#chunk-"
+
+# Fin de phrase (. ! ? …) suivie d'un espace, ou saut de paragraphe
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+_WORD_RE = re.compile(r"\S+")
+
+
+@dataclass
+class Chunk:
+    index: int
+    text: str
+    start: int
+    end: int
+
+
+def chunk_id(parent_id: str, index: int) -> str:
+    return f"{parent_id}{CHUNK_ID_SEPARATOR}{index}"
+
+
+def parent_id_of(doc_id: str) -> str:
+    """Id du document parent d'un passage (l'id lui-même pour un document non découpé)."""
+    return doc_id.split(CHUNK_ID_SEPARATOR, 1)[0]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """Positions (début, fin) des phrases du texte, espaces de séparation exclus."""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.start() > start:
+            spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text) and text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def _word_spans(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    return [(start + m.start(), start + m.end()) for m in _WORD_RE.finditer(text[start:end])]
+
+
+def chunk_text(text: str, max_words: int = 150, overlap_words: int = 30) -> List[Chunk]:
+    """
+    Découpe un texte en passages d'au plus `max_words` mots, alignés sur les fins de phrase.
+    Chaque passage reprend les dernières phrases du précédent (environ `overlap_words` mots).
+    Une phrase plus longue que `max_words` est coupée sur les limites de mots.
+    """
+    if not text or not text.strip():
+        return []
+    overlap_words = min(overlap_words, max_words // 2)
+
+    # Unités de découpage : phrases, ou morceaux de phrase si une phrase est trop longue
+    units: List[Tuple[int, int, int]] = []  # (début, fin, nombre de mots)
+    for start, end in split_sentences(text):
+        words = _word_spans(text, start, end)
+        for i in range(0, len(words), max_words):
+            piece = words[i:i + max_words]
+            units.append((piece[0][0], piece[-1][1], len(piece)))
+
+    chunks: List[Chunk] = []
+    first = 0
+    while first < len(units):
+        last = first
+        n_words = units[first][2]
+        while last + 1 < len(units) and n_words + units[last + 1][2] <= max_words:
+            last += 1
+            n_words += units[last][2]
+        start, end = units[first][0], units[last][1]
+        chunks.append(Chunk(index=len(chunks), text=text[start:end], start=start, end=end))
+        if last + 1 >= len(units):
+            break
+        # Recul sur les dernières phrases pour le chevauchement, sans jamais stagner
+        next_first = last + 1
+        overlap = 0
+        while next_first - 1 > first and overlap + units[next_first - 1][2] <= overlap_words:
+            next_first -= 1
+            overlap += units[next_first][2]
+        first = next_first
+    return chunks
@@ -0,0 +1,130 @@
+"""
+Compression négociée des réponses (Accept-Encoding) : brotli si le client l'accepte et que la
+dépendance optionnelle `brotli` est installée, sinon gzip.
+
+Seules les réponses d'au moins COMPRESSION_MIN_SIZE octets et d'un type textuel (JSON, texte,
+HTML, JS, CSS, SVG) sont compressées : en dessous, le gain ne compense pas le temps CPU.
+Les réponses en flux (plusieurs morceaux) sont compressées au fil de l'eau.
+"""
+
+import gzip
+import zlib
+from typing import Optional
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip seulement
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Encodage retenu parmi ceux acceptés par le client (q=0 exclu) : "br", "gzip" ou None."""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._compress, self._finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._finish = self._compressor.compress, self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI de compression des réponses (voir le module)."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                response_headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (b"content-encoding" in response_headers
+                               or not content_type.startswith(COMPRESSIBLE_TYPES))
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if compressor is None and start_message is not None:
+                # Premier morceau : réponse complète ou début d'un flux
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start_message)
+                    await send(message)
+                    start_message = None
+                    passthrough = True
+                    return
+                response_headers = [(k, v) for k, v in start_message.get("headers", [])
+                                    if k.lower() not in (b"content-length", b"content-encoding")]
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                response_headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    body = compress(body, encoding)
+                    response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    await send({**start_message, "headers": response_headers})
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    start_message = None
+                    passthrough = True
+                    return
+                compressor = _Compressor(encoding)
+                await send({**start_message, "headers": response_headers})
+                start_message = None
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
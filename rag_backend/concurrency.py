@@ -0,0 +1,102 @@
+"""
+Exécution des traitements bloquants depuis les handlers async, et limites de concurrence.
+
+- encode_executor : pool dédié à l'inférence du modèle (encodage, reclassement), dimensionné
+  pour ne pas dépasser le nombre de cœurs : les requêtes en attente restent dans la boucle
+  asyncio au lieu d'occuper des threads
+- store_executor : pool des accès au stockage (index vectoriel, fichiers JSON forces/faiblesses)
+- password_executor : pool du hachage des mots de passe (bcrypt), borné pour qu'une rafale de
+  connexions n'occupe pas tous les cœurs
+- concurrency_limit(route_class) : dépendance FastAPI qui borne le nombre de requêtes
+  simultanées par classe de routes ("search", "answer", "index", "forces", "auth", "llm"). Au-delà, les
+  requêtes attendent au plus CONCURRENCY_QUEUE_TIMEOUT secondes puis reçoivent un 503.
+"""
+
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict
+
+from fastapi import HTTPException
+
+from . import metrics
+from .config import settings
+
+# Les threads ne sont créés qu'à la première tâche : sans risque avec gunicorn --preload
+encode_executor = ThreadPoolExecutor(max_workers=settings.ENCODE_THREADS, thread_name_prefix="encode")
+store_executor = ThreadPoolExecutor(max_workers=settings.STORE_THREADS, thread_name_prefix="store")
+password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_THREADS, thread_name_prefix="password")
+
+ROUTE_CLASSES = ("search", "answer", "index", "forces", "auth", "llm")
+
+# Requêtes en cours et en attente par classe de routes (exposées pour le monitoring)
+in_flight: Dict[str, int] = {route_class: 0 for route_class in ROUTE_CLASSES}
+waiting: Dict[str, int] = {route_class: 0 for route_class in ROUTE_CLASSES}
+
+# Un sémaphore asyncio appartient à une boucle d'événements : un jeu par boucle
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+async def run_in_executor(executor: Executor, func, *args, **kwargs):
+    """
+    Exécute une fonction bloquante dans un pool de threads sans bloquer la boucle d'événements.
+    Le contexte (trace de la requête en cours) est copié dans le thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+
+def route_limit(route_class: str) -> int:
+    """Nombre maximal de requêtes simultanées de la classe (0 = illimité)."""
+    return {
+        "search": settings.SEARCH_CONCURRENCY,
+        "answer": settings.ANSWER_CONCURRENCY,
+        "index": settings.INDEX_CONCURRENCY,
+        "forces": settings.FORCES_CONCURRENCY,
+        "auth": settings.AUTH_CONCURRENCY,
+        "llm": settings.LLM_CONCURRENCY,
+    }[route_class]
+
+
+def _semaphore(route_class: str, limit: int) -> asyncio.Semaphore:
+    per_loop = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if route_class not in per_loop:
+        per_loop[route_class] = asyncio.Semaphore(limit)
+    return per_loop[route_class]
+
+
+def concurrency_limit(route_class: str):
+    """Dépendance FastAPI limitant la concurrence d'une classe de routes."""
+    if route_class not in ROUTE_CLASSES:
+        raise ValueError(f"Classe de routes inconnue: {route_class} (attendu: {', '.join(ROUTE_CLASSES)})")
+
+    async def dependency():
+        limit = route_limit(route_class)
+        if limit <= 0:
+            yield
+            return
+        semaphore = _semaphore(route_class, limit)
+        waiting[route_class] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=settings.CONCURRENCY_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            metrics.concurrency_rejections.inc(route_class=route_class)
+            raise HTTPException(
+                status_code=503,
+                detail=f"Serveur saturé ({route_class}), réessayez plus tard",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            waiting[route_class] -= 1
+        in_flight[route_class] += 1
+        try:
+            yield
+        finally:
+            in_flight[route_class] -= 1
+            semaphore.release()
+
+    return dependency
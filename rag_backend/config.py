@@ -1,11 +1,17 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 
 class Settings(BaseSettings):
     # Configuration pour l'authentification JWT (security.py)
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Threads dédiés au hachage bcrypt (volontairement lent) : hors de la boucle d'événements
+    PASSWORD_HASH_THREADS: int = 2
+    # Cache des tokens validés (clé: empreinte SHA-256 du token) : nombre d'entrées (0 = désactivé)
+    # et durée de vie maximale en secondes (jamais au-delà de l'expiration du token)
+    TOKEN_CACHE_SIZE: int = 1024
+    TOKEN_CACHE_TTL: float = 60.0
 
     # Configuration CORS (main.py)
     # Doit être une chaîne séparée par des virgules dans .env, ex: "http://localhost:3000,http://localhost:5173"
@@ -24,12 +30,193 @@ class Settings(BaseSettings):
             "https://www.demoiassistant.online",
         ]
 
+    # Utilisateurs autorisés sur les routes /admin (profilage), séparés par des virgules ; aucun par défaut
+    ADMIN_USERNAMES_STR: Optional[str] = None
+
+    @property
+    def ADMIN_USERNAMES(self) -> List[str]:
+        if isinstance(self.ADMIN_USERNAMES_STR, str):
+            return [username.strip() for username in self.ADMIN_USERNAMES_STR.split(',') if username.strip()]
+        return []
+
     # Configuration pour ChromaDB HttpClient (rag_engine.py)
     CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8000
     CHROMA_SSL_ENABLED: bool = False
     # CHROMA_SSL_VERIFY peut être un booléen ou le chemin vers un fichier de certificat CA
-    CHROMA_SSL_VERIFY: Union[bool, str] = True 
+    CHROMA_SSL_VERIFY: Union[bool, str] = True
+
+    # Chargement du modèle et connexion au stockage vectoriel en tâche de fond dès le démarrage (main.py).
+    # Si désactivé, ils sont initialisés à la première requête qui en a besoin.
+    RAG_WARMUP: bool = True
+    # Préchargement du modèle et de l'index à l'import de l'application, dans le processus maître
+    # (gunicorn --preload, voir gunicorn_conf.py) : les workers les partagent en copy-on-write
+    RAG_PRELOAD: bool = False
+    # Threads dédiés à l'inférence du modèle (encodage, reclassement) et aux accès au stockage (concurrency.py)
+    ENCODE_THREADS: int = 2
+    STORE_THREADS: int = 8
+    # Requêtes simultanées maximales par classe de routes (0 = illimité) ; au-delà, attente puis 503
+    SEARCH_CONCURRENCY: int = 16
+    ANSWER_CONCURRENCY: int = 8
+    INDEX_CONCURRENCY: int = 2
+    FORCES_CONCURRENCY: int = 32
+    AUTH_CONCURRENCY: int = 16
+    LLM_CONCURRENCY: int = 8
+    # Attente maximale (s) d'une place avant de répondre 503
+    CONCURRENCY_QUEUE_TIMEOUT: float = 10.0
+    # Limitation du débit par client (rate_limit.py) : seau de RATE_LIMIT_CAPACITY jetons rechargé de
+    # RATE_LIMIT_REFILL_PER_S jetons/s, chaque requête consommant le coût de sa route
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CAPACITY: float = 60.0
+    RATE_LIMIT_REFILL_PER_S: float = 1.0
+    # Coûts par route surchargeant rate_limit.ROUTE_COSTS, ex: "answer=3,rhdpchat=10"
+    RATE_LIMIT_COSTS_STR: Optional[str] = None
+    # "memory" (seaux propres à chaque worker) ou "redis" (partagés, RATE_LIMIT_REDIS_URL requis)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    # Nombre maximal de clients suivis en mémoire
+    RATE_LIMIT_MAX_KEYS: int = 10000
+    # En-tête portant l'IP du client, posé par le reverse proxy (nginx.conf, ex: "X-Real-IP") ; vide = IP de la connexion.
+    # Il n'est lu que pour les connexions venant de RATE_LIMIT_TRUSTED_PROXIES (sinon un client pourrait le falsifier)
+    RATE_LIMIT_CLIENT_IP_HEADER: Optional[str] = None
+    # Adresses ou réseaux des reverse proxies de confiance, séparés par des virgules, ex: "127.0.0.1,::1"
+    RATE_LIMIT_TRUSTED_PROXIES_STR: Optional[str] = None
+
+    @property
+    def RATE_LIMIT_TRUSTED_PROXIES(self) -> List[str]:
+        if isinstance(self.RATE_LIMIT_TRUSTED_PROXIES_STR, str):
+            return [proxy.strip() for proxy in self.RATE_LIMIT_TRUSTED_PROXIES_STR.split(',') if proxy.strip()]
+        return []
+
+    @property
+    def RATE_LIMIT_COSTS(self) -> Dict[str, float]:
+        costs = {}
+        for item in (self.RATE_LIMIT_COSTS_STR or "").split(','):
+            if '=' in item:
+                route, cost = item.split('=', 1)
+                costs[route.strip()] = float(cost)
+        return costs
+
+    # Compression des réponses (compression.py) : brotli (si installé) ou gzip selon Accept-Encoding,
+    # à partir de COMPRESSION_MIN_SIZE octets ; niveaux choisis pour des réponses générées à chaque requête
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Exposition des métriques Prometheus sur GET /metrics (metrics.py)
+    METRICS_ENABLED: bool = True
+    # Niveau des logs JSON des modules rag_backend.* (tracing.py)
+    LOG_LEVEL: str = "INFO"
+    # Export des traces de requêtes : "none", "json" (une ligne de log par requête) ou "otlp" (OpenTelemetry)
+    TRACE_EXPORTER: str = "none"
+    # Part des requêtes exportées (les réponses 5xx le sont toujours)
+    TRACE_SAMPLE_RATE: float = 1.0
+    # Collecteur OpenTelemetry local (OTLP/HTTP) et nom du service dans les traces
+    OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    OTLP_SERVICE_NAME: str = "rag-backend"
+    # En-tête Server-Timing (durée de chaque étape) sur les réponses ; expose la structure interne, désactivé par défaut
+    SERVER_TIMING: bool = False
+    # Journalisation des corps de requête/réponse des LLM : part des appels journalisés et taille maximale
+    PAYLOAD_LOG_SAMPLE_RATE: float = 0.01
+    PAYLOAD_LOG_MAX_CHARS: int = 512
+    # Durée maximale (s) d'un profilage déclenché par /admin/profile (admin_api.py)
+    PROFILE_MAX_SECONDS: float = 60.0
+
+    # Encodage des textes (embeddings.py) : "sentence-transformers" (PyTorch) ou "onnx" (ONNX Runtime)
+    EMBEDDING_BACKEND: str = "sentence-transformers"
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_MAX_LENGTH: int = 256
+    # Répertoire du modèle exporté par export_onnx.py (par défaut: rag_backend/models/<modèle>-onnx)
+    ONNX_MODEL_DIR: Optional[str] = None
+    # Utiliser la version quantifiée int8 (dynamique) du modèle ONNX
+    ONNX_QUANTIZED: bool = True
+    # Threads ONNX Runtime par session (0 = valeur par défaut d'ONNX Runtime)
+    ONNX_NUM_THREADS: int = 0
+    # Cache persistant des embeddings calculés (embedding_cache.py), réutilisé lors des ré-indexations
+    EMBEDDING_CACHE: bool = True
+    # Répertoire du cache (par défaut: rag_backend/embedding_cache)
+    EMBEDDING_CACHE_DIR: Optional[str] = None
+    # Proportion d'entrées supprimées au-delà de laquelle le cache est compacté
+    EMBEDDING_CACHE_COMPACT_RATIO: float = 0.3
+
+    # Backend de stockage vectoriel (vector_store.py) : "chroma" (HttpClient) ou "numpy" (en mémoire, persisté sur disque)
+    VECTOR_BACKEND: str = "chroma"
+    # Répertoire de persistance du backend "numpy" (par défaut: rag_backend/vector_store)
+    VECTOR_STORE_DIR: Optional[str] = None
+    # Quantification de l'index "numpy" (quantization.py) : "none", "float16" ou "int8"
+    VECTOR_QUANTIZATION: str = "none"
+    # Nombre de candidats rescorés en float32 après un scan quantifié (0 = pas de rescoring)
+    VECTOR_RESCORE_CANDIDATES: int = 50
+    # Ouverture de la matrice de l'index "numpy" en mémoire mappée (pages partagées entre workers)
+    VECTOR_MMAP: bool = False
+    # Intervalle (s) de vérification des réécritures de l'index "numpy" par un autre processus (0 = jamais)
+    VECTOR_RELOAD_INTERVAL: float = 2.0
+    # Répartition des documents en collections (vector_store.py) : "none" (collection unique),
+    # "doc_type" (une par type) ou "doc_type_party" (et une par parti pour les forces/faiblesses).
+    # Migration depuis la collection unique: python -m rag_backend.migrate_partitions
+    VECTOR_PARTITIONING: str = "none"
+
+    # Propagation des modifications des forces/faiblesses vers l'index (forces_outbox.py)
+    FORCES_OUTBOX_ENABLED: bool = True
+    # Répertoire du journal (par défaut: rag_backend/forces_outbox)
+    FORCES_OUTBOX_DIR: Optional[str] = None
+    # Nombre maximal d'événements appliqués par lot et intervalle (s) entre deux lectures du journal
+    FORCES_OUTBOX_BATCH_SIZE: int = 32
+    FORCES_OUTBOX_POLL_INTERVAL: float = 1.0
+    # Synchronisation sur disque (fsync) de chaque ajout au journal
+    FORCES_OUTBOX_FSYNC: bool = True
+    # Taille (octets) au-delà de laquelle le journal entièrement consommé est vidé
+    FORCES_OUTBOX_COMPACT_BYTES: int = 1_000_000
+
+    # Thèmes des forces/faiblesses par parti (themes.py, nécessite scikit-learn ; désactivés
+    # sinon) : calcul complet: python -m rag_backend.themes
+    THEMES_ENABLED: bool = True
+    # Fichier des thèmes précalculés (par défaut: rag_backend/themes.json)
+    THEMES_FILE: Optional[str] = None
+    # Nombre maximal de thèmes par parti et nombre minimal d'éléments pour en calculer
+    THEMES_MAX_CLUSTERS: int = 8
+    THEMES_MIN_ITEMS: int = 4
+    # Part d'éléments ajoutés depuis le dernier calcul au-delà de laquelle le parti est recalculé
+    THEMES_REFIT_RATIO: float = 0.2
+    # Nombre de termes du libellé d'un thème et taille des lots de MiniBatchKMeans
+    THEMES_LABEL_TERMS: int = 3
+    THEMES_BATCH_SIZE: int = 1024
+
+    # Recherche hybride BM25 + embeddings (rag_engine.py / lexical_index.py)
+    # Nombre de candidats pris dans chaque classement avant la fusion RRF
+    HYBRID_CANDIDATES: int = 20
+    # Constante k de la Reciprocal Rank Fusion : score = somme de 1 / (k + rang)
+    RRF_K: int = 60
+    # Intervalle minimal (secondes) entre deux synchronisations de l'index BM25 avec le stockage vectoriel
+    LEXICAL_SYNC_INTERVAL: float = 30.0
+
+    # Découpage des documents longs (chunking.py) : MiniLM tronque au-delà de 256 tokens (~150 mots)
+    CHUNK_SIZE_WORDS: int = 150
+    CHUNK_OVERLAP_WORDS: int = 30
+    # Facteur de sur-échantillonnage des passages avant regroupement par document parent
+    CHUNK_OVERFETCH: int = 3
+
+    # Reclassement par cross-encoder (reranker.py) : modèle multilingue, exécuté sur CPU
+    RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    # Nombre de candidats reclassés, taille des lots et budget de temps par requête (ms)
+    RERANK_CANDIDATES: int = 20
+    # Plafond du nombre de candidats reclassés demandé par une requête (rerank_candidates)
+    RERANK_MAX_CANDIDATES: int = 100
+    RERANK_BATCH_SIZE: int = 8
+    RERANK_BUDGET_MS: float = 300.0
+
+    # Réponse de /search (snippets.py) : longueur maximale des extraits (caractères) et champs
+    # renvoyés par défaut parmi ids, distances, metadatas, snippets, documents (texte complet)
+    SNIPPET_LENGTH: int = 300
+    # Nombre maximal de recherches par appel de /search/batch
+    SEARCH_BATCH_MAX_QUERIES: int = 20
+    SEARCH_DEFAULT_FIELDS_STR: Optional[str] = None
+
+    @property
+    def SEARCH_DEFAULT_FIELDS(self) -> List[str]:
+        if isinstance(self.SEARCH_DEFAULT_FIELDS_STR, str):
+            return [field.strip() for field in self.SEARCH_DEFAULT_FIELDS_STR.split(',') if field.strip()]
+        return ["ids", "distances", "metadatas", "snippets"]
 
     # Spécifie que les variables doivent être chargées depuis un fichier .env
     model_config = SettingsConfigDict(
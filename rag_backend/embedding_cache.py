@@ -0,0 +1,290 @@
+"""
+Cache persistant des embeddings calculés, indexé par empreinte du texte encodé.
+
+Les vecteurs sont ajoutés à la fin d'un fichier binaire float32 (une ligne par vecteur),
+relu en mémoire mappée : une lecture renvoie une vue sur les pages du fichier, sans copie
+ni ré-encodage. Une table annexe (JSON Lines, en ajout seul) associe chaque empreinte à
+sa ligne, avec l'id du document qui l'a produite ; une suppression y ajoute une pierre
+tombale. Quand les lignes mortes dépassent `compact_ratio`, le cache est compacté dans
+une nouvelle génération de fichiers, publiée atomiquement via manifest.json.
+
+Un répertoire par modèle (voir `cache_namespace`) : les vecteurs de deux modèles ne sont
+jamais mélangés. Les écritures sont protégées par un verrou de fichier, ce qui permet à
+l'indexeur et aux workers de l'API de partager le même cache.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.embedding_cache --stats
+    python -m rag_backend.embedding_cache --compact
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+from .config import settings
+
+BASE_DIR = Path(__file__).parent.absolute()
+
+
+def cache_namespace() -> str:
+    """Nom de sous-répertoire propre au backend et au modèle d'embedding configurés."""
+    backend = settings.EMBEDDING_BACKEND.lower()
+    name = f"{backend}-{settings.EMBEDDING_MODEL}"
+    if backend == "onnx" and settings.ONNX_QUANTIZED:
+        name += "-int8"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name)
+
+
+class EmbeddingCache:
+    """Table empreinte -> vecteur, persistée dans `cache_dir` et lue en mémoire mappée."""
+
+    MANIFEST_FILE = "manifest.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, cache_dir: str, compact_ratio: float = 0.3, min_compact_rows: int = 1000):
+        self.cache_dir = cache_dir
+        self.compact_ratio = compact_ratio
+        self.min_compact_rows = min_compact_rows
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._n_rows = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._entries_offset = 0
+        self._manifest_stamp = None
+        os.makedirs(cache_dir, exist_ok=True)
+        self._refresh()
+
+    # --- Fichiers --- #
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _vectors_path(self, generation: int) -> str:
+        return self._path(f"vectors-{generation}.f32")
+
+    def _entries_path(self, generation: int) -> str:
+        return self._path(f"entries-{generation}.jsonl")
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        with self._lock:
+            with open(self._path(self.LOCK_FILE), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, generation: int, dim: int):
+        manifest_path = self._path(self.MANIFEST_FILE)
+        temp_file = f"{manifest_path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "dim": dim}, f)
+        os.replace(temp_file, manifest_path)
+
+    # --- Synchronisation avec le disque --- #
+
+    def _refresh(self):
+        """Prend en compte les écritures (d'un autre processus) depuis la dernière lecture."""
+        with self._lock:
+            try:
+                stat = os.stat(self._path(self.MANIFEST_FILE))
+            except OSError:
+                return
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if stamp != self._manifest_stamp:
+                with open(self._path(self.MANIFEST_FILE), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self._manifest_stamp = stamp
+                if manifest["generation"] != self._generation or self._dim is None:
+                    # Nouvelle génération (compaction) : tout est relu
+                    self._generation = manifest["generation"]
+                    self._dim = manifest["dim"]
+                    self._rows = {}
+                    self._n_rows = 0
+                    self._vectors = None
+                    self._entries_offset = 0
+            self._read_entries()
+
+    def _read_entries(self):
+        try:
+            with open(self._entries_path(self._generation), "rb") as f:
+                f.seek(self._entries_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Une ligne en cours d'écriture par un autre processus sera lue au prochain appel
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("deleted"):
+                self._rows.pop(entry["key"], None)
+            else:
+                self._rows[entry["key"]] = entry["row"]
+                self._n_rows = max(self._n_rows, entry["row"] + 1)
+        self._entries_offset += end
+
+    def _matrix(self) -> np.ndarray:
+        """Vue mappée du fichier de vecteurs, ré-ouverte quand il a grandi."""
+        if self._vectors is None or self._vectors.shape[0] < self._n_rows:
+            self._vectors = np.memmap(self._vectors_path(self._generation), dtype=np.float32, mode="r",
+                                      shape=(self._n_rows, self._dim))
+        return self._vectors
+
+    # --- Lecture --- #
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Vecteurs (vues en lecture seule sur le fichier) des empreintes, None si absentes."""
+        with self._lock:
+            self._refresh()
+            if not self._rows:
+                return [None] * len(keys)
+            matrix = self._matrix()
+            return [matrix[self._rows[key]] if key in self._rows else None for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._refresh()
+            return {
+                "generation": self._generation,
+                "live": len(self._rows),
+                "dead": self._n_rows - len(self._rows),
+                "bytes": self._n_rows * (self._dim or 0) * 4,
+            }
+
+    # --- Écriture --- #
+
+    def put_many(self, keys: Sequence[str], vectors, ids: Optional[Sequence[Optional[str]]] = None):
+        """Ajoute les vecteurs des empreintes absentes du cache (les autres sont ignorés)."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        with self._write_lock():
+            self._refresh()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._write_manifest(self._generation, self._dim)
+                self._refresh()
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Dimension d'embedding {vectors.shape[1]} incompatible avec le cache ({self._dim})")
+            new, seen = [], set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    new.append(i)
+            if not new:
+                return
+            # Les lignes complètes écrites par un processus interrompu avant la table annexe restent
+            # mortes ; une ligne incomplète est écrasée
+            vectors_path = self._vectors_path(self._generation)
+            row_bytes = self._dim * 4
+            first_row = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+            with open(vectors_path, "r+b" if os.path.exists(vectors_path) else "wb") as f:
+                f.seek(first_row * row_bytes)
+                f.write(np.ascontiguousarray(vectors[new]).tobytes())
+                f.truncate()
+            with open(self._entries_path(self._generation), "a", encoding="utf-8") as f:
+                for offset, i in enumerate(new):
+                    entry = {"key": keys[i], "row": first_row + offset}
+                    if ids is not None and ids[i] is not None:
+                        entry["id"] = ids[i]
+                    f.write(json.dumps(entry) + "\n")
+            self._read_entries()
+
+    def delete(self, keys: Sequence[str]):
+        """Supprime des empreintes (pierres tombales), puis compacte si nécessaire."""
+        with self._write_lock():
+            self._refresh()
+            present = [key for key in dict.fromkeys(keys) if key in self._rows]
+            if not present:
+                return
+            with open(self._entries_path(self._generation), "a", encoding="utf-8") as f:
+                for key in present:
+                    f.write(json.dumps({"key": key, "deleted": True}) + "\n")
+            self._read_entries()
+        self.maybe_compact()
+
+    def maybe_compact(self) -> bool:
+        stats = self.stats()
+        total = stats["live"] + stats["dead"]
+        if total < self.min_compact_rows or stats["dead"] <= self.compact_ratio * total:
+            return False
+        self.compact()
+        return True
+
+    def compact(self) -> int:
+        """Réécrit les seules lignes vivantes dans une nouvelle génération. Retourne le nombre de lignes retirées."""
+        with self._write_lock():
+            self._refresh()
+            if self._dim is None:
+                return 0
+            removed = self._n_rows - len(self._rows)
+            generation = self._generation + 1
+            live = sorted(self._rows.items(), key=lambda item: item[1])
+            matrix = self._matrix() if self._n_rows else None
+            with open(self._vectors_path(generation), "wb") as f:
+                # Copie par blocs, dans l'ordre du fichier, pour ne pas charger tout le cache en RAM
+                for start in range(0, len(live), 4096):
+                    rows = [row for _, row in live[start:start + 4096]]
+                    f.write(np.ascontiguousarray(matrix[rows]).tobytes())
+            with open(self._entries_path(generation), "w", encoding="utf-8") as f:
+                for new_row, (key, _) in enumerate(live):
+                    f.write(json.dumps({"key": key, "row": new_row}) + "\n")
+            old_generation = self._generation
+            self._write_manifest(generation, self._dim)
+            self._refresh()
+            # Les processus qui ont encore l'ancien fichier mappé gardent leur vue jusqu'au rechargement
+            for path in (self._vectors_path(old_generation), self._entries_path(old_generation)):
+                if os.path.exists(path):
+                    os.remove(path)
+            print(f"[EmbeddingCache] Compaction: {removed} lignes retirées, {len(live)} conservées")
+            return removed
+
+
+def create_embedding_cache() -> Optional[EmbeddingCache]:
+    """Cache du modèle configuré dans les settings, ou None s'il est désactivé."""
+    if not settings.EMBEDDING_CACHE:
+        return None
+    base_dir = settings.EMBEDDING_CACHE_DIR or os.path.join(BASE_DIR, "embedding_cache")
+    return EmbeddingCache(os.path.join(base_dir, cache_namespace()),
+                          compact_ratio=settings.EMBEDDING_CACHE_COMPACT_RATIO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance du cache d'embeddings")
+    parser.add_argument("--stats", action="store_true", help="Affiche le nombre d'entrées vivantes et mortes")
+    parser.add_argument("--compact", action="store_true", help="Compacte le cache (retire les entrées supprimées)")
+    args = parser.parse_args()
+    cache = create_embedding_cache()
+    if cache is None:
+        print("Cache d'embeddings désactivé (EMBEDDING_CACHE=false)")
+        return
+    if args.compact:
+        cache.compact()
+    print(json.dumps({"cache_dir": cache.cache_dir, **cache.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Backends d'encodage des textes en embeddings pour le moteur RAG.
+
+- SentenceTransformerEmbedder : modèle all-MiniLM-L6-v2 exécuté par PyTorch (comportement historique)
+- OnnxEmbedder : le même modèle exporté en ONNX (voir export_onnx.py), quantifié en int8
+  dynamique et exécuté par ONNX Runtime sur CPU, sans dépendance à PyTorch
+
+Les deux exposent `encode(texts) -> np.ndarray` (float32, vecteurs normalisés) :
+le backend est choisi via `settings.EMBEDDING_BACKEND`.
+"""
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from .config import settings
+
+BASE_DIR = Path(__file__).parent.absolute()
+
+EMBEDDING_BACKENDS = ("sentence-transformers", "onnx")
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def default_onnx_dir() -> str:
+    return settings.ONNX_MODEL_DIR or os.path.join(BASE_DIR, "models", f"{settings.EMBEDDING_MODEL}-onnx")
+
+
+class SentenceTransformerEmbedder:
+    """Encodage via sentence-transformers / PyTorch."""
+
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: Optional[str] = None):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name or settings.EMBEDDING_MODEL, device="cpu")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+
+
+class OnnxEmbedder:
+    """
+    Encodage via ONNX Runtime : tokenisation (tokenizers), passage du modèle,
+    mean pooling sur le masque d'attention puis normalisation L2, comme le
+    pipeline sentence-transformers de all-MiniLM-L6-v2.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_dir: Optional[str] = None, quantized: Optional[bool] = None,
+                 max_length: Optional[int] = None, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = model_dir or default_onnx_dir()
+        quantized = settings.ONNX_QUANTIZED if quantized is None else quantized
+        model_path = os.path.join(model_dir, ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Modèle ONNX introuvable: {model_path}. Exportez-le avec: python -m rag_backend.export_onnx"
+            )
+
+        max_length = max_length or settings.EMBEDDING_MAX_LENGTH
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        num_threads = settings.ONNX_NUM_THREADS if num_threads is None else num_threads
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.model_path = model_path
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feed["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+            token_embeddings = self.session.run(None, feed)[0]
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            outputs.append(pooled / np.clip(norms, 1e-12, None))
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32)
+
+
+def create_embedder(backend: Optional[str] = None):
+    """Instancie le backend d'encodage configuré dans les settings."""
+    backend = (backend or settings.EMBEDDING_BACKEND).lower()
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    if backend == "onnx":
+        return OnnxEmbedder()
+    raise ValueError(f"Backend d'embedding inconnu: {backend} (attendu: {', '.join(EMBEDDING_BACKENDS)})")
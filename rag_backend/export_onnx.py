@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Export du modèle d'embedding en ONNX pour le backend ONNX Runtime (embeddings.py).
+
+Produit dans le répertoire cible :
+- model.onnx       : le transformeur exporté (sorties: embeddings de tokens)
+- model.int8.onnx  : la même chose avec quantification dynamique int8 des poids
+- tokenizer.json   : le tokenizer rapide associé
+
+Nécessite torch et sentence-transformers (uniquement pour l'export) ainsi que onnxruntime.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.export_onnx
+    python -m rag_backend.export_onnx --output-dir /chemin/vers/modele-onnx
+"""
+
+import argparse
+import os
+
+from .config import settings
+from .embeddings import ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, default_onnx_dir
+
+
+def export(model_name: str, output_dir: str, opset: int = 14):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["exemple de phrase pour l'export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Modèle ONNX exporté: {model_path}")
+
+    quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    print(f"Modèle ONNX quantifié (int8 dynamique): {quantized_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export du modèle d'embedding en ONNX")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Modèle sentence-transformers à exporter")
+    parser.add_argument("--output-dir", default=None, help="Répertoire cible (par défaut: settings.ONNX_MODEL_DIR)")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.model, args.output_dir or default_onnx_dir(), args.opset)
+
+
+if __name__ == "__main__":
+    main()
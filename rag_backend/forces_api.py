@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Optional
 from datetime import date
 import os
 import uuid
@@ -8,10 +8,14 @@ from .forces_store import (
     create_party, get_party, list_parties, update_party, delete_party,
     add_strength_weakness, list_strengths_weaknesses, delete_strength_weakness,
     list_all_strengths_weaknesses, add_media_to_strength_weakness, get_media_files_for_element,
-    delete_media_file, strengths_weaknesses_db, MEDIA_UPLOAD_DIR
+    delete_media_file, get_strength_weakness, MEDIA_UPLOAD_DIR
 )
+from .concurrency import concurrency_limit, run_in_executor, store_executor
+from .responses import models_response
+from .themes import get_party_themes
 
-router = APIRouter()
+# Handlers async : les accès au store (lecture/écriture des fichiers JSON) passent par l'exécuteur du stockage
+router = APIRouter(dependencies=[Depends(concurrency_limit("forces"))])
 
 # --- Endpoints pour le Tableau de Bord --- #
 
@@ -20,10 +24,10 @@ class DashboardSummary(BaseModel):
     recent_sw: List[StrengthWeakness]
 
 @router.get("/dashboard-summary", response_model=DashboardSummary)
-def get_dashboard_summary_api():
+async def get_dashboard_summary_api():
     try:
-        all_parties = list_parties() or []
-        all_sw = list_all_strengths_weaknesses() or []
+        all_parties = await run_in_executor(store_executor, list_parties) or []
+        all_sw = await run_in_executor(store_executor, list_all_strengths_weaknesses) or []
         sorted_sw = sorted(all_sw, key=lambda x: getattr(x, 'date', None) or '', reverse=True)
         return DashboardSummary(
             total_parties=len(all_parties),
@@ -42,9 +46,9 @@ class PartyCreate(BaseModel):
     logo_url: str = None
 
 @router.post("/parties", response_model=PoliticalParty)
-def create_party_api(party: PartyCreate):
+async def create_party_api(party: PartyCreate):
     try:
-        return create_party(party.nom, party.description, party.logo_url)
+        return await run_in_executor(store_executor, create_party, party.nom, party.description, party.logo_url)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -52,26 +56,48 @@ def create_party_api(party: PartyCreate):
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création du parti: {e}")
 
 @router.get("/parties", response_model=List[PoliticalParty])
-def list_parties_api():
-    return list_parties()
+async def list_parties_api():
+    return await run_in_executor(store_executor, list_parties)
 
 @router.get("/parties/{party_id}", response_model=PoliticalParty)
-def get_party_api(party_id: str):
-    party = get_party(party_id)
+async def get_party_api(party_id: str):
+    party = await run_in_executor(store_executor, get_party, party_id)
     if not party:
         raise HTTPException(status_code=404, detail="Parti non trouvé")
     return party
 
 @router.put("/parties/{party_id}", response_model=PoliticalParty)
-def update_party_api(party_id: str, nom: str = None, description: str = None, logo_url: str = None):
-    party = update_party(party_id, nom=nom, description=description, logo_url=logo_url)
+async def update_party_api(party_id: str, nom: str = None, description: str = None, logo_url: str = None):
+    party = await run_in_executor(store_executor, update_party, party_id, nom=nom, description=description,
+                                  logo_url=logo_url)
     if not party:
         raise HTTPException(status_code=404, detail="Parti non trouvé")
     return party
 
+class PartyTheme(BaseModel):
+    id: int
+    label: str
+    terms: List[str]
+    size: int
+    item_ids: List[str]
+    types: Dict[str, int]  # Nombre d'éléments par type (force, faiblesse, ...)
+
+class PartyThemes(BaseModel):
+    party_id: str
+    computed_at: Optional[str] = None  # None tant que le parti n'a pas assez d'éléments indexés
+    pending_items: int = 0             # Éléments rattachés depuis le dernier calcul complet
+    themes: List[PartyTheme]
+
+@router.get("/parties/{party_id}/themes", response_model=PartyThemes)
+async def get_party_themes_api(party_id: str):
+    """Thèmes précalculés des forces/faiblesses du parti (themes.py), du plus grand au plus petit."""
+    if not await run_in_executor(store_executor, get_party, party_id):
+        raise HTTPException(status_code=404, detail="Parti non trouvé")
+    return await run_in_executor(store_executor, get_party_themes, party_id)
+
 @router.delete("/parties/{party_id}")
-def delete_party_api(party_id: str):
-    if not delete_party(party_id):
+async def delete_party_api(party_id: str):
+    if not await run_in_executor(store_executor, delete_party, party_id):
         raise HTTPException(status_code=404, detail="Parti non trouvé")
     return {"status": "deleted"}
 
@@ -86,8 +112,10 @@ class StrengthWeaknessCreate(BaseModel):
     auteur: str = None
 
 @router.post("/forces-faiblesses", response_model=StrengthWeakness)
-def add_strength_weakness_api(sw: StrengthWeaknessCreate):
-    return add_strength_weakness(
+async def add_strength_weakness_api(sw: StrengthWeaknessCreate):
+    return await run_in_executor(
+        store_executor,
+        add_strength_weakness,
         party_id=sw.party_id, 
         type=sw.type, 
         contenu=sw.contenu, 
@@ -99,8 +127,8 @@ def add_strength_weakness_api(sw: StrengthWeaknessCreate):
     )
 
 @router.get("/forces-faiblesses/{party_id}", response_model=List[StrengthWeakness])
-def list_strengths_weaknesses_api(party_id: str, type: str = None):
-    elements = list_strengths_weaknesses(party_id)
+async def list_strengths_weaknesses_api(party_id: str, type: str = None):
+    elements = await run_in_executor(store_executor, list_strengths_weaknesses, party_id)
     if type:
         try:
             type_element = TypeElement(type)
@@ -108,15 +136,16 @@ def list_strengths_weaknesses_api(party_id: str, type: str = None):
         except ValueError:
             # Si le type n'est pas valide, on ignore le filtre
             pass
-    return elements
+    # Sérialisation directe par pydantic-core (éléments et media_files imbriqués)
+    return models_response(StrengthWeakness, elements)
 
 @router.get("/elements-types", response_model=List[str])
-def get_element_types_api():
+async def get_element_types_api():
     return [t.value for t in TypeElement]
 
 @router.delete("/forces-faiblesses/{sw_id}")
-def delete_strength_weakness_api(sw_id: str):
-    if not delete_strength_weakness(sw_id):
+async def delete_strength_weakness_api(sw_id: str):
+    if not await run_in_executor(store_executor, delete_strength_weakness, sw_id):
         raise HTTPException(status_code=404, detail="Élément non trouvé")
     return {"status": "deleted"}
 
@@ -130,13 +159,17 @@ class MediaFileCreate(BaseModel):
     media_type: str
     importance: int = 1
 
+def _copy_upload(source, file_path: str):
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer)
+
 @router.post("/media-files", response_model=MediaFile)
 async def add_media_file_api(element_id: str = Form(...), 
                            media_type: str = Form(...), 
                            importance: int = Form(1),
                            file: UploadFile = File(...)):
     # Vérifier que l'élément existe
-    if element_id not in strengths_weaknesses_db:
+    if await run_in_executor(store_executor, get_strength_weakness, element_id) is None:
         raise HTTPException(status_code=404, detail="Élément non trouvé")
     
     # Créer un nom de fichier unique
@@ -146,13 +179,13 @@ async def add_media_file_api(element_id: str = Form(...),
     
     # Sauvegarder le fichier
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_executor(store_executor, _copy_upload, file.file, file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload du fichier: {e}")
     
     # Ajouter le fichier média à l'élément
-    media_file = add_media_to_strength_weakness(element_id, file_path, media_type, importance)
+    media_file = await run_in_executor(store_executor, add_media_to_strength_weakness,
+                                       element_id, file_path, media_type, importance)
     if not media_file:
         # Supprimer le fichier si l'ajout a échoué
         if os.path.exists(file_path):
@@ -162,11 +195,11 @@ async def add_media_file_api(element_id: str = Form(...),
     return media_file
 
 @router.get("/media-files/{element_id}", response_model=List[MediaFile])
-def get_media_files_api(element_id: str):
-    return get_media_files_for_element(element_id)
+async def get_media_files_api(element_id: str):
+    return await run_in_executor(store_executor, get_media_files_for_element, element_id)
 
 @router.delete("/media-files/{media_id}")
-def delete_media_file_api(media_id: str):
-    if not delete_media_file(media_id):
+async def delete_media_file_api(media_id: str):
+    if not await run_in_executor(store_executor, delete_media_file, media_id):
         raise HTTPException(status_code=404, detail="Fichier média non trouvé")
     return {"status": "deleted"}
@@ -0,0 +1,271 @@
+"""
+Propagation des modifications des forces/faiblesses vers l'index vectoriel (outbox).
+
+Chaque mutation de forces_store qui change le contenu indexé ajoute, après la sauvegarde
+JSON, un événement à un journal durable (JSON Lines, en ajout seul) :
+    {"op": "upsert" | "delete", "id": <id de l'élément>, "ts": <horodatage>}
+    {"op": "rename_party", "id": <id du parti>, "ts": <horodatage>}
+
+Un consommateur unique (verrou de fichier : un seul worker de l'API le fait tourner) lit
+le journal par petits lots à partir de son offset, fusionne les événements d'un même
+élément (le dernier l'emporte) et applique le lot au moteur RAG : ré-indexation, à partir
+de l'état courant du store, des éléments modifiés et suppression des vecteurs
+`forces_{id}` des éléments supprimés. Un renommage de parti réécrit le nom dans le texte
+et les métadonnées de ses éléments indexés, puis ré-encode ces textes par lots. Les thèmes
+des partis (themes.py) sont mis à jour avec chaque lot.
+
+L'offset n'est enregistré qu'une fois le lot appliqué : après un arrêt brutal, les
+derniers événements sont rejoués (application idempotente). Le journal est vidé quand
+tout a été consommé et qu'il dépasse FORCES_OUTBOX_COMPACT_BYTES.
+
+L'indexation complète (indexer.py --forces, /index-all-forces) reste le moyen de
+reconstruire l'index, ex: pour des modifications antérieures à l'outbox.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrous limités au processus
+    fcntl = None
+
+from . import metrics, themes
+from .config import settings
+
+BASE_DIR = Path(__file__).parent.absolute()
+OUTBOX_DIR = settings.FORCES_OUTBOX_DIR or os.path.join(BASE_DIR, "forces_outbox")
+EVENTS_FILE = "events.jsonl"
+OFFSET_FILE = "offset.json"
+APPEND_LOCK_FILE = ".append.lock"
+CONSUMER_LOCK_FILE = ".consumer.lock"
+
+EVENT_OPS = ("upsert", "delete", "rename_party")
+
+outbox_events = metrics.Counter(
+    "forces_outbox_events_total", "Événements de l'outbox des forces/faiblesses", ("op", "stage"))
+
+_append_lock = threading.Lock()
+
+
+def _path(name: str) -> str:
+    return os.path.join(OUTBOX_DIR, name)
+
+
+class _FileLock:
+    """Verrou exclusif sur un fichier (entre processus avec fcntl, sinon entre threads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def emit(op: str, ids: Iterable[str]):
+    """Ajoute un événement par id (élément, ou parti pour rename_party) au journal (une seule écriture, synchronisée sur disque si FORCES_OUTBOX_FSYNC)."""
+    if not settings.FORCES_OUTBOX_ENABLED:
+        return
+    if op not in EVENT_OPS:
+        raise ValueError(f"Opération d'outbox inconnue: {op} (attendu: {', '.join(EVENT_OPS)})")
+    ts = time.time()
+    lines = "".join(json.dumps({"op": op, "id": item_id, "ts": ts}) + "\n" for item_id in ids)
+    if not lines:
+        return
+    with _append_lock, _FileLock(_path(APPEND_LOCK_FILE)):
+        with open(_path(EVENTS_FILE), "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            if settings.FORCES_OUTBOX_FSYNC:
+                os.fsync(f.fileno())
+    outbox_events.inc(lines.count("\n"), op=op, stage="emitted")
+
+
+def read_offset() -> int:
+    try:
+        with open(_path(OFFSET_FILE), "r", encoding="utf-8") as f:
+            return int(json.load(f).get("offset", 0))
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return 0
+
+
+def _write_offset(offset: int):
+    temp_file = f"{_path(OFFSET_FILE)}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset, "updated_at": time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, _path(OFFSET_FILE))
+
+
+def read_events(offset: int, max_events: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Au plus `max_events` événements complets à partir de `offset` ; retourne (événements, offset suivant)."""
+    events: List[Dict[str, Any]] = []
+    try:
+        f = open(_path(EVENTS_FILE), "rb")
+    except FileNotFoundError:
+        return events, 0
+    with f:
+        if offset > os.fstat(f.fileno()).st_size:
+            # Journal vidé par une compaction qui n'a pas pu enregistrer l'offset
+            offset = 0
+        f.seek(offset)
+        while len(events) < max_events:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break  # ligne en cours d'écriture : relue au prochain passage
+            offset += len(line)
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[RAGEngine][ERROR] Événement d'outbox illisible ignoré: {line[:200]!r}")
+                continue
+            if event.get("op") in EVENT_OPS and event.get("id"):
+                events.append(event)
+    return events, offset
+
+
+def coalesce(events: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Dernière opération de chaque élément, dans l'ordre de première apparition."""
+    latest: Dict[str, str] = {}
+    for event in events:
+        latest.pop(event["id"], None)
+        latest[event["id"]] = event["op"]
+    return latest
+
+
+def apply_changes(rag, changes: Dict[str, str]) -> Dict[str, int]:
+    """
+    Applique les changements au moteur RAG à partir de l'état courant du store : un élément
+    à ré-indexer qui n'existe plus est supprimé de l'index.
+    """
+    from . import forces_store
+
+    forces_store.ensure_loaded(force=True)
+    documents, deleted, renamed = [], [], 0
+    for item_id, op in changes.items():
+        if op == "rename_party":
+            party = forces_store.get_party(item_id)
+            if party is not None:
+                renamed += rag.rename_party_documents(item_id, party.nom)
+            continue
+        item = forces_store.get_strength_weakness(item_id) if op == "upsert" else None
+        if item is None:
+            deleted.append(f"forces_{item_id}")
+            continue
+        party = forces_store.get_party(item.party_id)
+        documents.append(rag.forces_document(item.model_dump(), party.nom if party else ""))
+    if documents:
+        rag.upsert_documents(*map(list, zip(*documents)))
+    if deleted:
+        rag.delete_documents(deleted)
+    if (documents or deleted) and themes.enabled():
+        try:
+            themes.update_items(rag.store, [doc_id[len("forces_"):] for doc_id, _, _ in documents],
+                                [doc_id[len("forces_"):] for doc_id in deleted])
+        except Exception as e:
+            # Les thèmes sont dérivés de l'index : une erreur ne bloque pas le journal (recalcul: python -m rag_backend.themes)
+            print(f"[RAGEngine][ERROR] Mise à jour des thèmes: {e}")
+    return {"upsert": len(documents), "delete": len(deleted), "rename_party": renamed}
+
+
+class OutboxConsumer:
+    """Consommateur du journal : lots de FORCES_OUTBOX_BATCH_SIZE événements appliqués via `get_rag()`."""
+
+    def __init__(self, get_rag: Callable[[], Any], batch_size: Optional[int] = None):
+        self.get_rag = get_rag
+        self.batch_size = batch_size or settings.FORCES_OUTBOX_BATCH_SIZE
+        self._consumer_lock = _FileLock(_path(CONSUMER_LOCK_FILE))
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        """Devient le consommateur si aucun autre processus ne l'est (verrou non bloquant)."""
+        if not self.is_leader:
+            self.is_leader = self._consumer_lock.acquire(blocking=False)
+        return self.is_leader
+
+    def release(self):
+        if self.is_leader:
+            self._consumer_lock.release()
+            self.is_leader = False
+
+    def run_once(self) -> int:
+        """Applique un lot ; retourne le nombre d'événements consommés (0 si le journal est à jour)."""
+        offset = read_offset()
+        events, next_offset = read_events(offset, self.batch_size)
+        if events:
+            applied = apply_changes(self.get_rag(), coalesce(events))
+            for op, count in applied.items():
+                outbox_events.inc(count, op=op, stage="applied")
+        if next_offset != offset:
+            _write_offset(next_offset)
+        if not events:
+            self._maybe_compact(next_offset)
+        return len(events)
+
+    def _maybe_compact(self, offset: int):
+        try:
+            size = os.path.getsize(_path(EVENTS_FILE))
+        except OSError:
+            return
+        if size < settings.FORCES_OUTBOX_COMPACT_BYTES or offset < size:
+            return
+        with _append_lock, _FileLock(_path(APPEND_LOCK_FILE)):
+            # Sous le verrou d'écriture : aucun événement ne peut être ajouté entre la vérification et la remise à zéro
+            if os.path.getsize(_path(EVENTS_FILE)) == offset:
+                open(_path(EVENTS_FILE), "w").close()
+                _write_offset(0)
+
+    async def run(self, stop: asyncio.Event, run_blocking: Callable):
+        """
+        Boucle du consommateur : tente de prendre le verrou, puis applique les lots dès qu'il y
+        en a, sinon attend FORCES_OUTBOX_POLL_INTERVAL secondes. `run_blocking(func)` exécute
+        un lot hors de la boucle d'événements.
+        """
+        try:
+            while not stop.is_set():
+                consumed = 0
+                if self.try_acquire():
+                    try:
+                        consumed = await run_blocking(self.run_once)
+                    except Exception as e:
+                        # Le lot sera rejoué au prochain passage (offset inchangé)
+                        print(f"[RAGEngine][ERROR] Outbox forces/faiblesses: {e}")
+                if consumed < self.batch_size:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=settings.FORCES_OUTBOX_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self.release()
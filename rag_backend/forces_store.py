@@ -1,12 +1,16 @@
 import uuid
+import functools
 import json
 import os
 import re
+import threading
+import time
 from datetime import date
 from typing import Dict, List, Optional, Union
 from pathlib import Path
 
 # Utilisation de chemins absolus pour éviter les attaques par traversement de répertoire
+from . import forces_outbox
 from .forces_models import PoliticalParty, StrengthWeakness, MediaFile, TypeElement, MediaType
 
 BASE_DIR = Path(__file__).parent.absolute()
@@ -23,22 +27,35 @@ def sanitize_input(text: str) -> str:
     return re.sub(r'[<>"\\]', '', text)
 
 # Initialisation des "bases de données" en mémoire (seront chargées depuis les fichiers)
+# Un rechargement construit de nouveaux dictionnaires puis remplace les références du module :
+# les lectures sans verrou voient l'ancien ou le nouveau contenu, jamais un dictionnaire vidé.
+# Y accéder via le module (forces_store.strengths_weaknesses_db), pas par import direct.
 political_parties_db: Dict[str, PoliticalParty] = {}
 strengths_weaknesses_db: Dict[str, StrengthWeakness] = {}
 media_files_db: Dict[str, MediaFile] = {}
+_loaded = False
+# Protège chargements et mutations : les handlers async appellent le store depuis plusieurs threads
+_lock = threading.RLock()
+# Dates de modification des fichiers au dernier chargement/sauvegarde : quand plusieurs workers
+# servent l'API, chacun recharge les fichiers réécrits par un autre
+_file_mtimes: Dict[str, Optional[int]] = {}
+_last_reload_check = 0.0
+RELOAD_CHECK_INTERVAL = 1.0  # secondes
 
 # --- Fonctions de chargement et sauvegarde --- #
 
 def _load_parties():
     global political_parties_db
+    parties: Dict[str, PoliticalParty] = {}
     try:
         with open(DB_PARTIES_FILE, 'r') as f:
             parties_data = json.load(f)
-            political_parties_db = {pid: PoliticalParty(**data) for pid, data in parties_data.items()}
+            parties = {pid: PoliticalParty(**data) for pid, data in parties_data.items()}
     except FileNotFoundError:
-        political_parties_db = {}
+        pass
     except json.JSONDecodeError:
-        political_parties_db = {} # Fichier corrompu ou vide
+        pass # Fichier corrompu ou vide
+    political_parties_db = parties
 
 def _save_parties():
     # Créer un fichier temporaire pour éviter la corruption en cas d'erreur
@@ -48,6 +65,7 @@ def _save_parties():
             json.dump({pid: party.model_dump(mode='json') for pid, party in political_parties_db.items()}, f, indent=2)
         # Remplacer le fichier original seulement si l'écriture a réussi
         os.replace(temp_file, DB_PARTIES_FILE)
+        _file_mtimes[DB_PARTIES_FILE] = _mtime(DB_PARTIES_FILE)
     except Exception as e:
         # Nettoyer en cas d'erreur
         if os.path.exists(temp_file):
@@ -57,29 +75,33 @@ def _save_parties():
 
 def _load_sw():
     global strengths_weaknesses_db
+    items: Dict[str, StrengthWeakness] = {}
     try:
         with open(DB_SW_FILE, 'r') as f:
             sw_data = json.load(f)
-            strengths_weaknesses_db = {sw_id: StrengthWeakness(**data) for sw_id, data in sw_data.items()}
+            items = {sw_id: StrengthWeakness(**data) for sw_id, data in sw_data.items()}
             # Conversion des dates string en objets date
-            for sw_id, sw_item in strengths_weaknesses_db.items():
+            for sw_item in items.values():
                 if isinstance(sw_item.date, str):
-                    strengths_weaknesses_db[sw_id].date = date.fromisoformat(sw_item.date)
+                    sw_item.date = date.fromisoformat(sw_item.date)
     except FileNotFoundError:
-        strengths_weaknesses_db = {}
+        pass
     except json.JSONDecodeError:
-        strengths_weaknesses_db = {} # Fichier corrompu ou vide
+        pass # Fichier corrompu ou vide
+    strengths_weaknesses_db = items
 
 def _load_media_files():
     global media_files_db
+    media_files: Dict[str, MediaFile] = {}
     try:
         with open(DB_MEDIA_FILE, 'r') as f:
             media_data = json.load(f)
-            media_files_db = {media_id: MediaFile(**data) for media_id, data in media_data.items()}
+            media_files = {media_id: MediaFile(**data) for media_id, data in media_data.items()}
     except FileNotFoundError:
-        media_files_db = {}
+        pass
     except json.JSONDecodeError:
-        media_files_db = {} # Fichier corrompu ou vide
+        pass # Fichier corrompu ou vide
+    media_files_db = media_files
 
 def _save_sw():
     # Créer un fichier temporaire pour éviter la corruption en cas d'erreur
@@ -89,6 +111,7 @@ def _save_sw():
             json.dump({sw_id: sw.model_dump(mode='json') for sw_id, sw in strengths_weaknesses_db.items()}, f, indent=2)
         # Remplacer le fichier original seulement si l'écriture a réussi
         os.replace(temp_file, DB_SW_FILE)
+        _file_mtimes[DB_SW_FILE] = _mtime(DB_SW_FILE)
     except Exception as e:
         # Nettoyer en cas d'erreur
         if os.path.exists(temp_file):
@@ -104,6 +127,7 @@ def _save_media_files():
             json.dump({media_id: media.model_dump(mode='json') for media_id, media in media_files_db.items()}, f, indent=2)
         # Remplacer le fichier original seulement si l'écriture a réussi
         os.replace(temp_file, DB_MEDIA_FILE)
+        _file_mtimes[DB_MEDIA_FILE] = _mtime(DB_MEDIA_FILE)
     except Exception as e:
         # Nettoyer en cas d'erreur
         if os.path.exists(temp_file):
@@ -111,16 +135,52 @@ def _save_media_files():
         print(f"Erreur lors de la sauvegarde des fichiers média: {e}")
         raise
 
-# Charger les données au démarrage du module
-_load_parties()
-_load_sw()
-_load_media_files()
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def ensure_loaded(force: bool = False):
+    """
+    Charge les fichiers JSON au premier accès (et non à l'import du module), puis recharge
+    (au plus une fois par RELOAD_CHECK_INTERVAL, ou immédiatement avec `force`) ceux qui ont
+    été réécrits par un autre processus.
+    """
+    global _loaded, _last_reload_check
+    now = time.monotonic()
+    if not force and _loaded and now - _last_reload_check < RELOAD_CHECK_INTERVAL:
+        return
+    with _lock:
+        _last_reload_check = now
+        for path, loader in ((DB_PARTIES_FILE, _load_parties), (DB_SW_FILE, _load_sw),
+                             (DB_MEDIA_FILE, _load_media_files)):
+            mtime = _mtime(path)
+            if not _loaded or mtime != _file_mtimes.get(path):
+                # Date relevée avant la lecture : une réécriture concurrente sera vue au prochain contrôle
+                _file_mtimes[path] = mtime
+                loader()
+        _loaded = True
+
+def _synchronized(func):
+    """
+    Exécute une mutation sous le verrou du store (modification des dictionnaires + sauvegarde JSON),
+    après avoir rechargé sans délai les fichiers réécrits par un autre worker : la sauvegarde
+    n'écrase pas ses modifications avec une copie périmée.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _lock:
+            ensure_loaded(force=True)
+            return func(*args, **kwargs)
+    return wrapper
 
 # Créer le répertoire d'upload s'il n'existe pas
 os.makedirs(MEDIA_UPLOAD_DIR, exist_ok=True)
 
 # --- CRUD pour PoliticalParty --- #
 
+@_synchronized
 def create_party(nom: str, description: str, logo_url: Optional[str] = None) -> PoliticalParty:
     # Validation et nettoyage des entrées
     nom_clean = sanitize_input(nom)
@@ -143,21 +203,29 @@ def create_party(nom: str, description: str, logo_url: Optional[str] = None) ->
     return party
 
 def get_party(party_id: str) -> Optional[PoliticalParty]:
+    ensure_loaded()
     return political_parties_db.get(party_id)
 
 def list_parties() -> List[PoliticalParty]:
+    ensure_loaded()
     return list(political_parties_db.values())
 
+@_synchronized
 def update_party(party_id: str, nom: Optional[str] = None, description: Optional[str] = None, logo_url: Optional[str] = None) -> Optional[PoliticalParty]:
     party = political_parties_db.get(party_id)
     if party:
+        renamed = nom is not None and nom != party.nom
         if nom is not None: party.nom = nom
         if description is not None: party.description = description
         if logo_url is not None: party.logo_url = logo_url
         _save_parties()
+        if renamed:
+            # Le nom du parti fait partie du texte et des métadonnées indexés de ses éléments
+            forces_outbox.emit("rename_party", [party_id])
         return party
     return None
 
+@_synchronized
 def delete_party(party_id: str) -> bool:
     if party_id in political_parties_db:
         del political_parties_db[party_id]
@@ -167,11 +235,13 @@ def delete_party(party_id: str) -> bool:
             del strengths_weaknesses_db[sw_id]
         _save_parties()
         _save_sw()
+        forces_outbox.emit("delete", related_sw_ids)
         return True
     return False
 
 # --- CRUD pour StrengthWeakness --- #
 
+@_synchronized
 def add_strength_weakness(party_id: str, type: Union[str, TypeElement], contenu: str, date_input: date, 
                        categorie: Optional[str] = None, resume: Optional[str] = None,
                        source: Optional[str] = None, auteur: Optional[str] = None) -> Optional[StrengthWeakness]:
@@ -202,18 +272,24 @@ def add_strength_weakness(party_id: str, type: Union[str, TypeElement], contenu:
     )
     strengths_weaknesses_db[sw_id] = item
     _save_sw()
+    forces_outbox.emit("upsert", [sw_id])
     return item
 
 def list_strengths_weaknesses(party_id: str) -> List[StrengthWeakness]:
-    return [sw for sw in strengths_weaknesses_db.values() if sw.party_id == party_id]
+    ensure_loaded()
+    # Copie des valeurs en un seul appel : une mutation concurrente ne peut pas interrompre l'itération
+    return [sw for sw in list(strengths_weaknesses_db.values()) if sw.party_id == party_id]
 
 def get_strength_weakness(sw_id: str) -> Optional[StrengthWeakness]:
+    ensure_loaded()
     return strengths_weaknesses_db.get(sw_id)
 
 def list_all_strengths_weaknesses() -> List[StrengthWeakness]:
     """Retourne toutes les forces et faiblesses, tous partis confondus."""
+    ensure_loaded()
     return list(strengths_weaknesses_db.values())
 
+@_synchronized
 def add_media_to_strength_weakness(sw_id: str, file_path: str, media_type: Union[str, MediaType], importance: int = 1) -> Optional[MediaFile]:
     if sw_id not in strengths_weaknesses_db:
         return None  # L'élément doit exister
@@ -250,8 +326,10 @@ def add_media_to_strength_weakness(sw_id: str, file_path: str, media_type: Union
     return media_file
 
 def get_media_files_for_element(element_id: str) -> List[MediaFile]:
-    return [media for media in media_files_db.values() if media.element_id == element_id]
+    ensure_loaded()
+    return [media for media in list(media_files_db.values()) if media.element_id == element_id]
 
+@_synchronized
 def delete_media_file(media_id: str) -> bool:
     if media_id not in media_files_db:
         return False
@@ -280,6 +358,7 @@ def delete_media_file(media_id: str) -> bool:
     
     return True
 
+@_synchronized
 def delete_strength_weakness(sw_id: str) -> bool:
     if sw_id in strengths_weaknesses_db:
         # Supprimer tous les fichiers média associés
@@ -290,5 +369,6 @@ def delete_strength_weakness(sw_id: str) -> bool:
         # Supprimer l'élément
         del strengths_weaknesses_db[sw_id]
         _save_sw()
+        forces_outbox.emit("delete", [sw_id])
         return True
     return False
@@ -0,0 +1,44 @@
+"""
+Configuration gunicorn pour servir l'API avec plusieurs workers uvicorn.
+
+Le modèle d'embedding, l'index vectoriel NumPy et les données forces/faiblesses sont
+chargés une seule fois dans le processus maître (preload_app + RAG_PRELOAD), puis
+partagés par les workers forkés en copy-on-write. L'index NumPy est ouvert en mémoire
+mappée (VECTOR_MMAP) : ses pages restent dans le cache disque, communes à tous les
+workers, même après un redémarrage de l'un d'eux.
+
+Usage (depuis la racine du projet):
+    gunicorn -c rag_backend/gunicorn_conf.py rag_backend.main:app
+    GUNICORN_WORKERS=4 GUNICORN_BIND=0.0.0.0:8000 gunicorn -c rag_backend/gunicorn_conf.py rag_backend.main:app
+"""
+
+import gc
+import os
+import sys
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# L'application (et donc le modèle) est importée dans le maître avant le fork
+preload_app = True
+
+# Ce fichier est lu avant l'import de l'application : les settings (config.py) verront ces valeurs
+os.environ.setdefault("RAG_PRELOAD", "true")
+os.environ.setdefault("VECTOR_MMAP", "true")
+# Les cœurs sont répartis entre les workers plutôt que chacun en réclame la totalité
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // workers)
+os.environ.setdefault("ONNX_NUM_THREADS", str(THREADS_PER_WORKER))
+
+
+def when_ready(server):
+    # Les objets chargés par le maître sont exclus du ramasse-miettes : sans cela, ses passages
+    # dans les workers écrivent dans les en-têtes des objets et dupliquent les pages partagées
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(THREADS_PER_WORKER)
@@ -200,6 +200,8 @@ def main():
     
     # Initialiser le moteur RAG
     rag_engine = RAGEngine()
+    # Écritures groupées : l'index local (backend "numpy") n'est sauvegardé qu'une fois, en fin d'indexation
+    rag_engine.store.auto_persist = False
     
     total_indexed = 0
     
@@ -215,7 +217,11 @@ def main():
         forces_count = index_forces_faiblesses_data(rag_engine, tracker)
         total_indexed += forces_count
     
-    # Sauvegarder le fichier de suivi
+    # Sauvegarder l'index vectoriel et le fichier de suivi
+    rag_engine.store.persist()
+    # Compaction périodique du cache d'embeddings (les vecteurs en cache évitent le ré-encodage après --reset)
+    if rag_engine.embedding_cache is not None:
+        rag_engine.embedding_cache.maybe_compact()
     save_tracker(tracker)
     
     logger.info(f"Indexation terminée. {total_indexed} documents indexés au total.")
@@ -0,0 +1,133 @@
+"""
+Index lexical BM25 pour la recherche hybride du moteur RAG.
+
+L'index inversé est construit à partir du même texte que les embeddings
+(`RAGEngine.add_document`) et tenu à jour de façon incrémentale. Il retrouve
+les correspondances exactes (sigles de partis, noms propres, références légales)
+que la similarité sémantique de MiniLM a tendance à manquer.
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vector_store import match_where
+
+# Mots vides français les plus fréquents (et les libellés ajoutés par add_*_document)
+STOPWORDS = frozenset("""
+a au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me meme mes moi mon
+ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+est sont ete etre avoir a ont plus cette cet comme tout tous
+titre contenu resume points cles parti type categorie source
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Minuscules, suppression des accents, découpage en mots et filtrage des mots vides."""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(folded) if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+class BM25Index:
+    """Index inversé BM25 en mémoire, mis à jour document par document."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        # terme -> {doc_id: fréquence du terme dans le document}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._metadatas: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def ids(self) -> List[str]:
+        return list(self._doc_lengths)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Ajoute ou remplace un document."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            self._metadatas[doc_id] = dict(metadata or {})
+
+    def add_many(self, ids: List[str], texts: List[Optional[str]], metadatas: Optional[List[Dict[str, Any]]] = None):
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            self.add(doc_id, text or "", metadata)
+
+    def update_metadata(self, doc_id: str, metadata: Dict[str, Any]):
+        with self._lock:
+            if doc_id in self._metadatas:
+                self._metadatas[doc_id] = {**self._metadatas[doc_id], **metadata}
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        self._metadatas.pop(doc_id, None)
+
+    def search(self, query: str, n_results: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Retourne les (doc_id, score BM25) les mieux classés, filtrés par métadonnées."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not terms or not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+            if where:
+                scores = {doc_id: score for doc_id, score in scores.items()
+                          if match_where(self._metadatas.get(doc_id), where)}
+            return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fusionne plusieurs classements d'ids par Reciprocal Rank Fusion : score = somme de 1 / (k + rang)."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -1,30 +1,96 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import timedelta
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import threading
 
 from .rag_engine import RAGEngine
+from .concurrency import concurrency_limit, encode_executor, run_in_executor
+from .rate_limit import charge, rate_limit
+from .compression import CompressionMiddleware
+from .responses import FastJSONResponse
+from . import metrics
+from .tracing import TracingMiddleware, configure_logging
 from .forces_api import router as forces_router
+from .forces_outbox import OutboxConsumer
 from .rhdpchat_api import router as rhdpchat_router
-from .forces_store import list_parties, list_strengths_weaknesses
+from .admin_api import router as admin_router
+from .forces_store import list_parties, list_strengths_weaknesses, ensure_loaded as ensure_forces_store_loaded
 from .forces_models import PoliticalParty, StrengthWeakness
-from .security import User, create_access_token, get_current_active_user, verify_password, get_user, oauth2_scheme, fake_users_db, status # Ajout des imports de sécurité
+from .security import User, create_access_token, get_current_active_user, averify_password, get_user, oauth2_scheme, fake_users_db, status # Ajout des imports de sécurité
 from .config import settings # Importation des settings centralisés
 import os
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
-app = FastAPI(title="RAG API", description="API pour le moteur de recherche RAG")
+configure_logging()
+logger = logging.getLogger("rag_backend.api")
+
+# Moteur RAG initialisé paresseusement : l'API accepte des requêtes dès le démarrage,
+# et les endpoints qui n'utilisent pas le modèle (partis, forces/faiblesses...) répondent immédiatement
+_rag: Optional[RAGEngine] = None
+_rag_lock = threading.Lock()
+rag_status: Dict[str, Any] = {"state": "cold", "error": None}
+
+def get_rag() -> RAGEngine:
+    """Dépendance FastAPI : instance unique du moteur RAG (le modèle est chargé au premier usage)."""
+    global _rag
+    if _rag is None:
+        with _rag_lock:
+            if _rag is None:
+                _rag = RAGEngine()
+    return _rag
+
+def warm_up_rag():
+    """Charge le modèle et ouvre le stockage vectoriel en tâche de fond."""
+    rag_status["state"] = "warming"
+    try:
+        get_rag().warm_up()
+        rag_status.update(state="ready", error=None)
+    except Exception as e:
+        rag_status.update(state="error", error=str(e))
+        print(f"[RAG WARMUP ERROR] {e}")
+
+def warm_up():
+    ensure_forces_store_loaded()
+    warm_up_rag()
+
+# Préchargement dans le processus maître (gunicorn --preload) : les workers forkés partagent
+# ces pages mémoire au lieu de charger chacun leur copie du modèle et des données
+if settings.RAG_PRELOAD:
+    ensure_forces_store_loaded()
+    get_rag().preload()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.RAG_WARMUP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    # Application des modifications des forces/faiblesses à l'index (un seul worker consomme le journal)
+    stop_outbox = asyncio.Event()
+    outbox_task = None
+    if settings.FORCES_OUTBOX_ENABLED:
+        consumer = OutboxConsumer(get_rag)
+        outbox_task = asyncio.create_task(
+            consumer.run(stop_outbox, lambda func: run_in_executor(encode_executor, func)))
+    yield
+    if outbox_task is not None:
+        stop_outbox.set()
+        await outbox_task
+
+app = FastAPI(title="RAG API", description="API pour le moteur de recherche RAG", lifespan=lifespan)
 
 # Gestionnaires d'exceptions personnalisés
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    # Ici, vous pourriez ajouter du logging
-    # import logging
-    # logging.error(f"HTTPException: {exc.status_code} {exc.detail} for {request.url}")
+    # Les erreurs serveur sont journalisées (avec l'identifiant de requête), les erreurs client seulement en debug
+    logger.log(logging.ERROR if exc.status_code >= 500 else logging.DEBUG,
+               f"HTTPException {exc.status_code} {exc.detail} pour {request.method} {request.url.path}")
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
@@ -33,12 +99,12 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
-    # Loggez l'exception ici pour le débogage
-    # import logging
-    # logging.exception(f"Unhandled exception for {request.url}: {exc}")
+    logger.error(f"Exception non gérée pour {request.method} {request.url.path}: {exc}",
+                 exc_info=(type(exc), exc, exc.__traceback__), extra={"request_id": request.scope.get("request_id")})
     return JSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred on the server."},
+        headers={"X-Request-ID": request.scope["request_id"]} if "request_id" in request.scope else None,
     )
 
 # Configuration CORS via settings
@@ -52,6 +118,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses volumineuses (résultats de recherche, listes de forces/faiblesses)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Latence par route pour /metrics (ajouté en dernier : englobe aussi le traitement CORS)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+# Identifiant de requête, Server-Timing et export des traces (le plus externe : couvre toute la requête)
+app.add_middleware(TracingMiddleware)
+
 # Determine the path to the 'port' directory (parent of 'rag_backend')
 # This directory contains index.html and potentially other static assets
 # Define the path to the 'dist' directory created by 'npm run build'
@@ -70,7 +146,32 @@ async def serve_index_html():
 
 app.include_router(forces_router)
 app.include_router(rhdpchat_router)
-rag = RAGEngine()
+app.include_router(admin_router)
+
+# Sondes pour systemd / le reverse proxy
+@app.get("/health")
+def health():
+    """
+    Liveness : le processus répond (n'attend pas le chargement du modèle)
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness : le modèle est chargé et le stockage vectoriel est joignable
+    """
+    if _rag is not None and _rag.is_ready:
+        return {"status": "ready"}
+    return JSONResponse(status_code=503, content={"status": rag_status["state"], "error": rag_status["error"]})
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        """
+        Métriques au format texte Prometheus : latences par route, étapes RAG, indexation, caches, LLM
+        """
+        return PlainTextResponse(metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
 
 # Mount the 'dist/assets' directory to serve CSS, JS, etc.
 assets_path = os.path.join(dist_directory, "assets")
@@ -93,10 +194,11 @@ class Token(BaseModel):
     token_type: str
 
 # Endpoint pour l'authentification et l'obtention du token
-@app.post("/token", response_model=Token)
+# bcrypt sur le pool dédié (security.averify_password) : une rafale de connexions ne bloque pas les autres requêtes
+@app.post("/token", response_model=Token, dependencies=[Depends(concurrency_limit("auth"))])
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = get_user(fake_users_db, form_data.username) # Utilise fake_users_db de security.py
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await averify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -114,11 +216,19 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 
+# Une seule ré-indexation complète à la fois par worker : chacune ré-encode tout le corpus
+_indexer_lock = threading.Lock()
+
 # Fonction pour exécuter le script d'indexation
 def run_indexer(args: str):
     """
-    Exécute le script d'indexation avec les arguments spécifiés
+    Exécute le script d'indexation avec les arguments spécifiés, sous le verrou _indexer_lock
+    (pris ici et non par la route : une tâche jamais exécutée, ex: client déconnecté avant
+    l'envoi de la réponse, ne peut pas le garder)
     """
+    if not _indexer_lock.acquire(blocking=False):
+        print(f"Indexation {args} ignorée : une indexation complète est déjà en cours")
+        return
     import subprocess
     import sys
     import os
@@ -131,6 +241,14 @@ def run_indexer(args: str):
         subprocess.run([sys.executable, indexer_path, args], check=True)
     except subprocess.CalledProcessError as e:
         print(f"Erreur lors de l'exécution du script d'indexation: {e}")
+    finally:
+        _indexer_lock.release()
+
+def _check_indexer_idle():
+    """503 si une indexation complète est déjà en cours (deux demandes simultanées : run_indexer ignore la seconde)."""
+    if _indexer_lock.locked():
+        raise HTTPException(status_code=503, detail="Une indexation complète est déjà en cours",
+                            headers={"Retry-After": "30"})
 
 # Endpoints pour obtenir des informations sur les documents indexés
 @app.get("/document-types")
@@ -171,15 +289,32 @@ class SearchFilter(BaseModel):
     date_from: Optional[str] = None      # Format ISO: YYYY-MM-DD
     date_to: Optional[str] = None        # Format ISO: YYYY-MM-DD
 
+# "dense" (embeddings), "lexical" (BM25) ou "hybrid" (fusion RRF des deux)
+SearchMode = Literal["dense", "lexical", "hybrid"]
+SearchField = Literal["ids", "distances", "metadatas", "snippets", "documents"]
+
 class SearchRequest(BaseModel):
     query: str
-    n_results: int = 5
+    n_results: int = Field(default=5, ge=1, le=50)
     filters: Optional[SearchFilter] = None
+    mode: SearchMode = "dense"
+    rerank: bool = False                     # Reclassement par cross-encoder (sous budget de temps)
+    # Par défaut: settings.RERANK_CANDIDATES
+    rerank_candidates: Optional[int] = Field(default=None, ge=1, le=settings.RERANK_MAX_CANDIDATES)
+    # Champs renvoyés (par défaut: settings.SEARCH_DEFAULT_FIELDS, sans le texte complet "documents")
+    fields: Optional[List[SearchField]] = None
+    snippet_length: Optional[int] = Field(default=None, ge=50, le=5000)  # Par défaut: settings.SNIPPET_LENGTH
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(min_length=1)  # Au plus settings.SEARCH_BATCH_MAX_QUERIES
 
 class QuestionRequest(BaseModel):
     question: str
-    n_results_for_context: int = 3
+    n_results_for_context: int = Field(default=3, ge=1, le=50)
     filters: Optional[SearchFilter] = None
+    mode: SearchMode = "dense"
+    rerank: bool = False
+    rerank_candidates: Optional[int] = Field(default=None, ge=1, le=settings.RERANK_MAX_CANDIDATES)
 
 class IndexEDLSRequest(BaseModel):
     edls_data: Dict[str, Any]
@@ -188,65 +323,65 @@ class IndexForcesRequest(BaseModel):
     force_data: Dict[str, Any]
     party_name: str
 
-@app.post("/add-document")
-def add_document(req: AddDocRequest):
+# Les endpoints du moteur RAG sont async : l'encodage et les accès au stockage s'exécutent sur des
+# pools de threads dédiés (concurrency.py), avec une limite de requêtes simultanées par classe de routes
+
+@app.post("/add-document", dependencies=[Depends(rate_limit("index")), Depends(concurrency_limit("index"))])
+async def add_document(req: AddDocRequest, rag: RAGEngine = Depends(get_rag)):
     """
     Ajoute un document au moteur RAG avec des métadonnées optionnelles
     """
     try:
-        rag.add_document(req.doc_id, req.text, req.metadata)
+        await run_in_executor(encode_executor, rag.add_document, req.doc_id, req.text, req.metadata)
         return {"status": "ok"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'indexation: {e}")
 
-@app.post("/add-edls")
-def add_edls_document(req: IndexEDLSRequest):
+@app.post("/add-edls", dependencies=[Depends(rate_limit("index")), Depends(concurrency_limit("index"))])
+async def add_edls_document(req: IndexEDLSRequest, rag: RAGEngine = Depends(get_rag)):
     """
     Indexe un document EDLS dans le moteur RAG
     """
     try:
-        result = rag.add_edls_document(req.edls_data)
+        result = await run_in_executor(encode_executor, rag.add_edls_document, req.edls_data)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'indexation de l'EDLS: {e}")
 
-@app.post("/add-forces")
-def add_forces_document(req: IndexForcesRequest):
+@app.post("/add-forces", dependencies=[Depends(rate_limit("index")), Depends(concurrency_limit("index"))])
+async def add_forces_document(req: IndexForcesRequest, rag: RAGEngine = Depends(get_rag)):
     """
     Indexe un document Forces/Faiblesses dans le moteur RAG
     """
     try:
-        result = rag.add_forces_faiblesses_document(req.force_data, req.party_name)
+        result = await run_in_executor(encode_executor, rag.add_forces_faiblesses_document,
+                                       req.force_data, req.party_name)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'indexation du document Forces/Faiblesses: {e}")
 
-@app.post("/index-all-edls")
+@app.post("/index-all-edls", dependencies=[Depends(rate_limit("reindex"))])
 def index_all_edls(background_tasks: BackgroundTasks):
     """
     Lance l'indexation de tous les documents EDLS en tâche de fond
     """
-    try:
-        # Lancer le script d'indexation en tâche de fond
-        background_tasks.add_task(run_indexer, "--edls")
-        return {"status": "ok", "message": "Indexation des EDLS lancée en tâche de fond"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors du lancement de l'indexation: {e}")
+    _check_indexer_idle()
+    # Lancer le script d'indexation en tâche de fond
+    background_tasks.add_task(run_indexer, "--edls")
+    return {"status": "ok", "message": "Indexation des EDLS lancée en tâche de fond"}
 
-@app.post("/index-all-forces")
+@app.post("/index-all-forces", dependencies=[Depends(rate_limit("reindex"))])
 def index_all_forces(background_tasks: BackgroundTasks):
     """
     Lance l'indexation de tous les documents Forces/Faiblesses en tâche de fond
     """
-    try:
-        # Lancer le script d'indexation en tâche de fond
-        background_tasks.add_task(run_indexer, "--forces")
-        return {"status": "ok", "message": "Indexation des Forces/Faiblesses lancée en tâche de fond"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors du lancement de l'indexation: {e}")
+    _check_indexer_idle()
+    # Lancer le script d'indexation en tâche de fond
+    background_tasks.add_task(run_indexer, "--forces")
+    return {"status": "ok", "message": "Indexation des Forces/Faiblesses lancée en tâche de fond"}
 
-@app.post("/search")
-def search(req: SearchRequest):
+@app.post("/search", response_class=FastJSONResponse, dependencies=[Depends(rate_limit("search")), Depends(concurrency_limit("search"))])
+async def search(req: SearchRequest, rag: RAGEngine = Depends(get_rag)):
     """
     Recherche des documents pertinents en fonction d'une requête et de filtres optionnels
     """
@@ -254,15 +389,72 @@ def search(req: SearchRequest):
     filters = req.filters.dict() if req.filters else None
     
     # Effectuer la recherche avec les filtres
-    results = rag.search(req.query, req.n_results, filters)
+    results = await rag.asearch(req.query, req.n_results, filters, req.mode, req.rerank, req.rerank_candidates,
+                                req.fields, req.snippet_length)
     
     if 'error' in results:
         raise HTTPException(status_code=500, detail=results['error'])
     
-    return results
+    # Réponse sérialisée directement (orjson), sans repasser par jsonable_encoder
+    return FastJSONResponse(results)
+
+@app.post("/search/batch", response_class=FastJSONResponse, dependencies=[Depends(concurrency_limit("search"))])
+async def search_batch(req: BatchSearchRequest, request: Request, rag: RAGEngine = Depends(get_rag)):
+    """
+    Plusieurs recherches en un appel (ex: une par parti ou par type de document) : requêtes
+    encodées en un seul lot, recherches exécutées en parallèle. Les résultats sont renvoyés dans
+    l'ordre des recherches ; une recherche en échec porte sa clé "error" sans faire échouer les autres.
+    """
+    if len(req.searches) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400,
+                            detail=f"Au plus {settings.SEARCH_BATCH_MAX_QUERIES} recherches par appel")
+    # Chaque recherche du lot compte comme un appel de /search pour la limitation du débit
+    await charge(request, "search", len(req.searches))
+    results = await rag.asearch_batch([
+        {"query": s.query, "n_results": s.n_results, "filters": s.filters.dict() if s.filters else None,
+         "mode": s.mode, "rerank": s.rerank, "rerank_candidates": s.rerank_candidates,
+         "fields": s.fields, "snippet_length": s.snippet_length}
+        for s in req.searches
+    ])
+    return FastJSONResponse({"results": results})
+
+async def _similar(rag: RAGEngine, doc_id: str, n_results: int, filters: SearchFilter,
+                   fields: Optional[List[str]], snippet_length: Optional[int]):
+    filters = filters.model_dump(exclude_none=True) or None
+    results = await rag.asimilar(doc_id, n_results, filters, fields, snippet_length)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Document non indexé: {doc_id}")
+    if 'error' in results:
+        raise HTTPException(status_code=500, detail=results['error'])
+    return FastJSONResponse(results)
+
+# Éléments similaires à partir du vecteur déjà indexé : aucun appel au modèle, pas de limitation du débit
+@app.get("/forces-faiblesses/{sw_id}/similar", response_class=FastJSONResponse,
+         dependencies=[Depends(concurrency_limit("search"))])
+async def similar_forces_faiblesses(sw_id: str, n_results: int = Query(5, ge=1, le=50),
+                                    filters: SearchFilter = Depends(),
+                                    fields: Optional[List[SearchField]] = Query(None),
+                                    snippet_length: Optional[int] = Query(None, ge=50, le=5000),
+                                    rag: RAGEngine = Depends(get_rag)):
+    """
+    Forces/faiblesses (ou autres documents selon les filtres) proches d'un élément indexé
+    """
+    return await _similar(rag, f"forces_{sw_id}", n_results, filters, fields, snippet_length)
+
+@app.get("/edls/{edls_id}/similar", response_class=FastJSONResponse,
+         dependencies=[Depends(concurrency_limit("search"))])
+async def similar_edls(edls_id: str, n_results: int = Query(5, ge=1, le=50),
+                       filters: SearchFilter = Depends(),
+                       fields: Optional[List[SearchField]] = Query(None),
+                       snippet_length: Optional[int] = Query(None, ge=50, le=5000),
+                       rag: RAGEngine = Depends(get_rag)):
+    """
+    Documents proches d'un EDLS indexé (vecteur moyen de ses passages)
+    """
+    return await _similar(rag, f"edls_{edls_id}", n_results, filters, fields, snippet_length)
 
-@app.post("/answer-question")
-def answer_question_endpoint(req: QuestionRequest):
+@app.post("/answer-question", response_class=FastJSONResponse, dependencies=[Depends(rate_limit("answer")), Depends(concurrency_limit("answer"))])
+async def answer_question_endpoint(req: QuestionRequest, rag: RAGEngine = Depends(get_rag)):
     """
     Répond à une question en utilisant les documents pertinents comme contexte
     """
@@ -270,9 +462,10 @@ def answer_question_endpoint(req: QuestionRequest):
     filters = req.filters.dict() if req.filters else None
     
     # Effectuer la recherche avec les filtres
-    results = rag.answer_question(req.question, req.n_results_for_context, filters)
+    results = await rag.aanswer_question(req.question, req.n_results_for_context, filters, req.mode,
+                                         req.rerank, req.rerank_candidates)
     
     if 'error' in results:
         raise HTTPException(status_code=500, detail=results['error'])
     
-    return results
+    return FastJSONResponse(results)
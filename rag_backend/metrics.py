@@ -0,0 +1,295 @@
+"""
+Métriques au format texte Prometheus, exposées par GET /metrics.
+
+Implémentation minimale sans dépendance : compteurs, jauges et histogrammes à buckets
+fixes, indexés par valeurs de labels. Une observation coûte une recherche dichotomique
+dans les buckets et une incrémentation sous verrou : négligeable devant une requête.
+
+- http_request_duration_seconds : latence par route (gabarit de chemin) et code HTTP
+- rag_stage_duration_seconds : durée de chaque étape de recherche (encode, vector_query, filter...)
+- rag_indexed_documents_total / rag_indexing_duration_seconds : débit d'indexation
+- embedding_cache_lookups_total, vector_filter_cache_lookups_total : taux de succès des caches
+- llm_request_duration_seconds / llm_requests_total : latence et erreurs des LLM en amont
+
+Avec plusieurs workers, chaque processus expose ses propres valeurs.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+# Buckets (secondes) adaptés aux requêtes HTTP et appels LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets (secondes) des étapes internes du moteur RAG, plus fines
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), register: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if register:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Jauge dont les valeurs sont lues au moment de l'export via `callback` (-> {valeurs de labels: valeur})."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None, register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self._callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, register: bool = True):
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+        # Par jeu de labels : [compte par bucket (non cumulé, +Inf en dernier), somme]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager mesurant la durée du bloc."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def _samples(self):
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def render_latest() -> str:
+    """Export de toutes les métriques au format texte Prometheus (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Métriques de l'application --- #
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP par route", ("method", "route", "status"))
+
+rag_stage_duration = Histogram(
+    "rag_stage_duration_seconds", "Durée des étapes de recherche du moteur RAG", ("stage", "mode"),
+    buckets=STAGE_BUCKETS)
+rag_indexed_documents = Counter(
+    "rag_indexed_documents_total", "Documents indexés par type et résultat", ("doc_type", "status"))
+rag_indexed_passages = Counter(
+    "rag_indexed_passages_total", "Passages indexés, encodés ou réutilisés (embedding existant)", ("outcome",))
+rag_indexing_duration = Histogram(
+    "rag_indexing_duration_seconds", "Durée d'indexation d'un document", ("doc_type",))
+rag_errors = Counter(
+    "rag_errors_total", "Recherches en échec (réponse renvoyée avec un champ error)", ("operation",))
+rag_rerank_budget_exceeded = Counter(
+    "rag_rerank_budget_exceeded_total", "Reclassements abandonnés faute de budget de temps")
+
+embedding_cache_lookups = Counter(
+    "embedding_cache_lookups_total", "Recherches dans le cache d'embeddings", ("result",))
+vector_filter_cache_lookups = Counter(
+    "vector_filter_cache_lookups_total", "Recherches dans le cache des filtres where de l'index NumPy", ("result",))
+
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "Latence des appels aux LLM en amont", ("provider",))
+llm_requests = Counter(
+    "llm_requests_total", "Appels aux LLM en amont par résultat", ("provider", "outcome"))
+
+
+
+def _concurrency_gauge(attribute: str):
+    def collect():
+        from . import concurrency
+        return {(route_class,): value for route_class, value in getattr(concurrency, attribute).items()}
+    return collect
+
+
+concurrency_in_flight = Gauge(
+    "rag_concurrency_in_flight", "Requêtes en cours par classe de routes", ("route_class",),
+    callback=_concurrency_gauge("in_flight"))
+concurrency_rejections = Counter(
+    "rag_concurrency_rejections_total", "Requêtes refusées (503) faute de place dans leur classe de routes",
+    ("route_class",))
+concurrency_waiting = Gauge(
+    "rag_concurrency_waiting", "Requêtes en attente d'une place par classe de routes", ("route_class",),
+    callback=_concurrency_gauge("waiting"))
+
+
+def observe_stages(timings_ms: Dict[str, float], mode: str):
+    """Enregistre la durée de chaque étape de recherche (timings en millisecondes, comme dans les réponses)."""
+    for stage, ms in timings_ms.items():
+        rag_stage_duration.observe(ms / 1000, stage=stage, mode=mode)
+
+
+def observe_indexing(doc_type: str, start: float, status: str = "success", encoded: int = 0, reused: int = 0):
+    """Enregistre l'indexation d'un document commencée à `start` (time.perf_counter())."""
+    rag_indexed_documents.inc(doc_type=doc_type, status=status)
+    if status == "success":
+        rag_indexing_duration.observe(time.perf_counter() - start, doc_type=doc_type)
+        rag_indexed_passages.inc(encoded, outcome="encoded")
+        rag_indexed_passages.inc(reused, outcome="reused")
+
+
+def llm_outcome(error: Optional[BaseException]) -> str:
+    """Catégorie d'un appel LLM pour llm_requests_total : ok, timeout, http_4xx, http_5xx ou error."""
+    if error is None:
+        return "ok"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code // 100}xx"
+    return "error"
+
+
+def observe_llm_call(provider: str, start: float, error: Optional[BaseException] = None):
+    """Enregistre un appel au LLM `provider` commencé à `start` (time.perf_counter())."""
+    llm_request_duration.observe(time.perf_counter() - start, provider=provider)
+    llm_requests.inc(provider=provider, outcome=llm_outcome(error))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI mesurant la latence de chaque requête HTTP. Le label `route` est le
+    gabarit de chemin (ex: /parties/{party_id}) pour borner le nombre de séries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.observe(time.perf_counter() - start, method=scope["method"],
+                                          route=route_label(scope), status=status["code"])
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None) is not None:
+        return route.path or "/"
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "endpoint")
+    return "unmatched"
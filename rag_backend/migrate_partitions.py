@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration de la collection unique vers les collections par partition (VECTOR_PARTITIONING).
+
+Les enregistrements (ids, textes, métadonnées et embeddings) sont copiés par lots dans la
+partition de leur doc_type (et de leur parti pour les forces/faiblesses en mode
+"doc_type_party") : aucun document n'est ré-encodé. La collection source est conservée ;
+une fois le nombre d'enregistrements vérifié, définir VECTOR_PARTITIONING puis la supprimer
+avec --drop-source.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.migrate_partitions --partitioning doc_type
+    python -m rag_backend.migrate_partitions --partitioning doc_type_party --batch-size 1000
+    python -m rag_backend.migrate_partitions --partitioning doc_type --drop-source
+"""
+
+import argparse
+import os
+import shutil
+import time
+from collections import Counter
+from typing import Optional
+
+from .config import settings
+from .vector_store import BASE_DIR, PARTITIONING_MODES, _chroma_client, create_vector_store, partition_key
+
+
+def migrate(collection_name: str, partitioning: str, batch_size: int = 500,
+            backend: Optional[str] = None) -> Counter:
+    """Copie la collection `collection_name` dans ses partitions ; retourne le nombre d'enregistrements par partition."""
+    source = create_vector_store(collection_name, backend, partitioning="none")
+    target = create_vector_store(collection_name, backend, partitioning=partitioning)
+    target.auto_persist = False
+
+    ids = source.get(include=[])["ids"]
+    print(f"[RAGEngine] Migration de {len(ids)} enregistrements de '{collection_name}' ({partitioning})")
+    copied = Counter()
+    start = time.perf_counter()
+    for offset in range(0, len(ids), batch_size):
+        batch = source.get(ids=ids[offset:offset + batch_size], include=["documents", "metadatas", "embeddings"])
+        target.upsert(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"],
+                      metadatas=batch["metadatas"])
+        copied.update(partition_key(metadata, target.by_party) for metadata in batch["metadatas"])
+        print(f"[RAGEngine] {min(offset + batch_size, len(ids))}/{len(ids)} enregistrements copiés")
+    target.persist()
+
+    if target.count() != len(ids):
+        raise RuntimeError(f"Nombre d'enregistrements différent après migration: {target.count()} != {len(ids)}")
+    print(f"[RAGEngine] Migration terminée en {time.perf_counter() - start:.1f} s")
+    return copied
+
+
+def drop_collection(collection_name: str, backend: Optional[str] = None):
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+    if backend == "chroma":
+        _chroma_client().delete_collection(collection_name)
+    else:
+        base_dir = settings.VECTOR_STORE_DIR or os.path.join(BASE_DIR, "vector_store")
+        shutil.rmtree(os.path.join(base_dir, collection_name), ignore_errors=True)
+    print(f"[RAGEngine] Collection source '{collection_name}' supprimée")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration vers les collections par partition")
+    parser.add_argument("--collection", default="docs", help="Collection source (et préfixe des partitions)")
+    parser.add_argument("--partitioning", choices=[m for m in PARTITIONING_MODES if m != "none"], default="doc_type")
+    parser.add_argument("--batch-size", type=int, default=500, help="Enregistrements copiés par lot")
+    parser.add_argument("--drop-source", action="store_true",
+                        help="Supprimer la collection source après une migration vérifiée")
+    args = parser.parse_args()
+
+    copied = migrate(args.collection, args.partitioning, args.batch_size)
+    for key, count in sorted(copied.items()):
+        print(f"  {args.collection}__{key:<40} {count:>8}")
+    if args.drop_source:
+        drop_collection(args.collection)
+    print(f"[RAGEngine] Définir VECTOR_PARTITIONING={args.partitioning} pour utiliser les partitions")
+
+
+if __name__ == "__main__":
+    main()
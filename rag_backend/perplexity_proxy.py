@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 import httpx
 import os
 import logging
+import time
+
+from . import metrics
+from .concurrency import concurrency_limit
+from .rate_limit import rate_limit
+from .tracing import log_payload, span
 
 router = APIRouter()
 
@@ -11,9 +17,9 @@ PERPLEXITY_COMPLETIONS_URL = "https://api.perplexity.ai/completions"
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
 
 # Logger pour le débogage
-logger = logging.getLogger("perplexity_proxy")
+logger = logging.getLogger("rag_backend.perplexity_proxy")
 
-@router.post("/api/perplexity")
+@router.post("/api/perplexity", dependencies=[Depends(rate_limit("perplexity")), Depends(concurrency_limit("llm"))])
 async def proxy_perplexity(request: Request):
     """Proxy générique pour les requêtes Perplexity"""
     if not PERPLEXITY_API_KEY:
@@ -22,7 +28,7 @@ async def proxy_perplexity(request: Request):
     # Récupérer le corps de la requête
     try:
         body = await request.json()
-        logger.info(f"Requête reçue: {body}")
+        log_payload(logger, "Requête reçue", body)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Format de requête invalide: {e}")
     
@@ -49,15 +55,19 @@ async def proxy_perplexity(request: Request):
         "Content-Type": "application/json"
     }
     
+    start = time.perf_counter()
     try:
         logger.info(f"Envoi à Perplexity API: {api_url}")
         async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, json=body, headers=headers, timeout=60.0)
+            with span("llm.perplexity"):
+                response = await client.post(api_url, json=body, headers=headers, timeout=60.0)
             response.raise_for_status()
             result = response.json()
-            logger.info(f"Réponse de Perplexity reçue: {result}")
+            log_payload(logger, "Réponse de Perplexity reçue", result)
+            metrics.observe_llm_call("perplexity", start)
             return result
     except httpx.HTTPStatusError as e:
+        metrics.observe_llm_call("perplexity", start, e)
         error_detail = f"Erreur Perplexity {e.response.status_code}"
         try:
             error_json = e.response.json()
@@ -68,5 +78,6 @@ async def proxy_perplexity(request: Request):
         logger.error(error_detail)
         raise HTTPException(status_code=e.response.status_code, detail=error_detail)
     except Exception as e:
+        metrics.observe_llm_call("perplexity", start, e)
         logger.error(f"Erreur proxy Perplexity: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur proxy Perplexity: {e}")
@@ -0,0 +1,196 @@
+"""
+Profilage du processus en production, déclenché à la demande (routes /admin/profile, admin_api.py).
+
+- sample_stacks() : profil par échantillonnage. Un thread relève périodiquement la pile de tous
+  les threads (sys._current_frames) pendant une durée bornée ; le résultat est au format « collapsed »
+  (une ligne `thread;module:fonction;... nombre` par pile), lisible par flamegraph.pl ou speedscope.
+- instrument() : temps par ligne des fonctions d'une cible (LINE_TARGETS : "search",
+  "answer_question", "forces_store_save"). Les points d'entrée ne sont remplacés par une version
+  instrumentée (sys.settrace limité aux fonctions de la cible) que pendant la fenêtre de mesure.
+
+Hors profilage, rien n'est installé : aucun surcoût sur les requêtes.
+"""
+
+import linecache
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from . import forces_store
+from .rag_engine import RAGEngine
+
+# Fonctions en feuille de pile d'un thread inactif (attente d'une tâche, d'un verrou ou d'E/S)
+_IDLE_LEAVES = {
+    ("threading", "wait"), ("threading", "_wait_for_tstate_lock"), ("queue", "get"),
+    ("selectors", "select"), ("concurrent.futures.thread", "_worker"),
+}
+
+# Un seul profil à la fois : ils se perturberaient (sys.settrace, échantillonneur)
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+@contextmanager
+def exclusive():
+    """Réserve le profileur le temps du bloc ; ProfilerBusy si un profil est déjà en cours."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("Un profilage est déjà en cours")
+    try:
+        yield
+    finally:
+        _busy.release()
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _is_idle(frame) -> bool:
+    return (frame.f_globals.get("__name__"), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def sample_stacks(duration_s: float, interval_s: float = 0.005, include_idle: bool = False) -> Counter:
+    """
+    Échantillonne les piles de tous les threads (sauf celui de l'échantillonneur) pendant
+    `duration_s` secondes. Retourne {pile « collapsed »: nombre d'échantillons}.
+    """
+    with exclusive():
+        stacks: Counter = Counter()
+        own = threading.get_ident()
+        deadline = time.perf_counter() + duration_s
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not include_idle and _is_idle(frame)):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(interval_s)
+        return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# --- Temps par ligne --- #
+
+def _line_targets() -> Dict[str, Tuple[List[Tuple[Any, str]], List[Callable]]]:
+    """Cible -> (points d'entrée (objet, attribut) remplacés pendant la mesure, fonctions chronométrées)."""
+    return {
+        "search": ([(RAGEngine, "search")], [RAGEngine.search, RAGEngine._retrieve, RAGEngine._retrieve_candidates,
+                                            RAGEngine._search_response]),
+        "answer_question": ([(RAGEngine, "answer_question")], [RAGEngine.answer_question, RAGEngine._retrieve,
+                                                              RAGEngine._retrieve_candidates]),
+        "forces_store_save": (
+            [(forces_store, "_save_parties"), (forces_store, "_save_sw"), (forces_store, "_save_media_files")],
+            [forces_store._save_parties, forces_store._save_sw, forces_store._save_media_files],
+        ),
+    }
+
+
+LINE_TARGETS = ("search", "answer_question", "forces_store_save")
+
+
+class LineTimer:
+    """
+    Temps passé sur chaque ligne des fonctions chronométrées (temps des appels imbriqués
+    compris, comme line_profiler). La trace n'est active que dans les threads exécutant
+    un point d'entrée instrumenté, et ne descend pas dans les autres fonctions.
+    """
+
+    def __init__(self, functions: Iterable[Callable]):
+        self.codes = {getattr(func, "__wrapped__", func).__code__ for func in functions}
+        self.lock = threading.Lock()
+        # (code, ligne) -> [passages, secondes]
+        self.stats: Dict[Tuple[Any, int], List[float]] = defaultdict(lambda: [0, 0.0])
+
+    def _record(self, code, line: int, elapsed: float):
+        with self.lock:
+            entry = self.stats[(code, line)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def _trace_calls(self, frame, event, arg):
+        if event != "call" or frame.f_code not in self.codes:
+            return None
+        state = [frame.f_lineno, time.perf_counter()]
+
+        def trace_lines(frame, event, arg):
+            now = time.perf_counter()
+            if event in ("line", "return"):
+                self._record(frame.f_code, state[0], now - state[1])
+                state[0], state[1] = frame.f_lineno, now
+            return trace_lines
+        return trace_lines
+
+    def wrap(self, func: Callable) -> Callable:
+        def instrumented(*args, **kwargs):
+            previous = sys.gettrace()
+            sys.settrace(self._trace_calls)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                sys.settrace(previous)
+        instrumented.__wrapped__ = func
+        return instrumented
+
+    def report(self) -> List[Dict[str, Any]]:
+        by_code: Dict[Any, List[Tuple[int, List[float]]]] = defaultdict(list)
+        with self.lock:
+            for (code, line), (hits, seconds) in self.stats.items():
+                by_code[code].append((line, [hits, seconds]))
+        functions = []
+        for code, lines in by_code.items():
+            total = sum(seconds for _, (_, seconds) in lines) or 1.0
+            functions.append({
+                "function": code.co_qualname if hasattr(code, "co_qualname") else code.co_name,
+                "file": code.co_filename,
+                "lines": [{
+                    "line": line, "hits": int(hits), "total_ms": round(seconds * 1000, 3),
+                    "per_hit_us": round(seconds / hits * 1e6, 1) if hits else 0.0,
+                    "percent": round(100 * seconds / total, 1),
+                    "source": linecache.getline(code.co_filename, line).rstrip(),
+                } for line, (hits, seconds) in sorted(lines)],
+            })
+        return functions
+
+
+@contextmanager
+def instrument(targets: Iterable[str]):
+    """
+    Active le chronométrage par ligne des cibles (voir LINE_TARGETS) le temps du bloc `with`,
+    en remplaçant leurs points d'entrée par une version instrumentée. Fournit le LineTimer.
+    """
+    known = _line_targets()
+    unknown = [target for target in targets if target not in known]
+    if unknown:
+        raise ValueError(f"Cible de profilage inconnue: {', '.join(unknown)} (attendu: {', '.join(LINE_TARGETS)})")
+    entry_points, functions = [], []
+    for target in dict.fromkeys(targets):
+        target_entry_points, target_functions = known[target]
+        entry_points.extend(target_entry_points)
+        functions.extend(target_functions)
+    timer = LineTimer(functions)
+    with exclusive():
+        originals = []
+        try:
+            for owner, name in dict.fromkeys(entry_points):
+                # Fonction brute pour une classe (pas de méthode liée), attribut pour un module
+                original = owner.__dict__[name]
+                originals.append((owner, name, original))
+                setattr(owner, name, timer.wrap(original))
+            yield timer
+        finally:
+            for owner, name, original in reversed(originals):
+                setattr(owner, name, original)
@@ -0,0 +1,74 @@
+"""
+Quantification scalaire des embeddings pour l'index vectoriel en mémoire.
+
+Modes supportés :
+- "none"    : float32 (4 octets par dimension)
+- "float16" : demi-précision (2 octets par dimension)
+- "int8"    : quantification scalaire symétrique par vecteur (1 octet par dimension
+              + un facteur d'échelle float32 par vecteur)
+
+Les vecteurs sont supposés normalisés : le produit scalaire avec une requête
+normalisée donne directement la similarité cosinus (approchée).
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+# Nombre de lignes converties en float32 à la fois lors d'un scan :
+# borne la mémoire temporaire tout en gardant des produits matriciels BLAS
+SCAN_BLOCK_ROWS = 4096
+
+
+def check_mode(mode: str) -> str:
+    mode = (mode or "none").lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Mode de quantification inconnu: {mode} (attendu: {', '.join(QUANTIZATION_MODES)})")
+    return mode
+
+
+def code_dtype(mode: str):
+    return {"none": np.float32, "float16": np.float16, "int8": np.int8}[mode]
+
+
+def quantize_rows(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantifie une matrice (n, d) de vecteurs float32.
+    Retourne (codes, scales) ; `scales` vaut None sauf en mode int8.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors, None
+
+
+def approximate_scores(codes: np.ndarray, scales: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+    """
+    Similarités approchées (n, n_queries) entre des vecteurs quantifiés et des requêtes float32.
+    Le scan se fait par blocs pour ne jamais matérialiser toute la matrice en float32.
+    """
+    n = codes.shape[0]
+    if codes.dtype == np.float32:
+        return codes @ queries.T
+    scores = np.empty((n, queries.shape[0]), dtype=np.float32)
+    for start in range(0, n, SCAN_BLOCK_ROWS):
+        end = min(start + SCAN_BLOCK_ROWS, n)
+        block = codes[start:end].astype(np.float32) @ queries.T
+        if scales is not None:
+            block *= scales[start:end, None]
+        scores[start:end] = block
+    return scores
+
+
+def bytes_per_vector(mode: str, dim: int) -> int:
+    """Coût mémoire d'un vecteur de dimension `dim` dans le mode donné."""
+    if mode == "int8":
+        return dim + 4
+    return dim * np.dtype(code_dtype(mode)).itemsize
@@ -1,35 +1,170 @@
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings as ChromaClientSettings # Renommé pour éviter conflit avec nos Settings
+import asyncio
 from datetime import datetime
 import json
+import re
+import threading
+import time
 from typing import Dict, List, Optional, Union, Any
 
+import numpy as np
+
+from .chunking import chunk_id, chunk_text, content_hash, parent_id_of
+from .concurrency import encode_executor, run_in_executor, store_executor
 from .config import settings # Importation des settings centralisés
+from .embedding_cache import EmbeddingCache, create_embedding_cache
+from .embeddings import create_embedder
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from . import metrics
+from .tracing import span
+from .reranker import CrossEncoderReranker
+from .snippets import make_snippet
+from .vector_store import VectorStore, create_vector_store
+
+# Première ligne du texte indexé d'une force/faiblesse (voir forces_document)
+_PARTY_LINE_RE = re.compile(r"^PARTI: [^\n]*")
+
+# Modes de recherche : embeddings seuls, BM25 seul, ou fusion RRF des deux classements
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+# Champs sélectionnables de la réponse de search (timings et reranked sont toujours renvoyés)
+SEARCH_FIELDS = ("ids", "distances", "metadatas", "snippets", "documents")
 
 class RAGEngine:
-    def __init__(self, collection_name="docs"):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, collection_name="docs", store: Optional[VectorStore] = None):
+        # Le modèle (PyTorch) et la connexion au stockage vectoriel sont initialisés à la
+        # première utilisation : construire un RAGEngine est instantané
+        self.collection_name = collection_name
+        self._model = None
+        self._store = store
+        self._init_lock = threading.Lock()
+        # Cache disque des embeddings de documents (None tant qu'il n'est pas ouvert, False si désactivé)
+        self._embedding_cache: Union[EmbeddingCache, None, bool] = None
         
-        # Configuration du client ChromaDB via l'objet settings
-        client_settings_chroma = ChromaClientSettings(anonymized_telemetry=False)
-        if settings.CHROMA_SSL_ENABLED:
-            client_settings_chroma.chroma_server_ssl_verify = settings.CHROMA_SSL_VERIFY
-            # Note: Le port par défaut pour HTTPS est souvent différent (ex: 443), 
-            # assurez-vous que CHROMA_PORT est correct pour votre configuration SSL.
-
-        # Utilisation de HttpClient pour se préparer à un serveur ChromaDB distant
-        self.client = chromadb.HttpClient(
-            host=settings.CHROMA_HOST,
-            port=settings.CHROMA_PORT,
-            ssl=settings.CHROMA_SSL_ENABLED,
-            settings=client_settings_chroma
-        )
+        # Index lexical BM25 construit à partir du même texte que les embeddings
+        self.lexical = BM25Index()
+        self._lexical_synced_at: Optional[float] = None
+        self._lexical_sync_lock = threading.Lock()
         
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Cross-encoder de reclassement, chargé à la première recherche avec rerank=True
+        self.reranker = CrossEncoderReranker()
+
+    @property
+    def model(self):
+        """Encodeur d'embeddings (PyTorch ou ONNX Runtime selon settings.EMBEDDING_BACKEND), chargé au premier accès."""
+        if self._model is None:
+            with self._init_lock:
+                if self._model is None:
+                    self._model = create_embedder()
+        return self._model
+
+    @property
+    def store(self) -> VectorStore:
+        """Stockage vectoriel (ChromaDB ou index NumPy selon settings.VECTOR_BACKEND), ouvert au premier accès."""
+        if self._store is None:
+            with self._init_lock:
+                if self._store is None:
+                    self._store = create_vector_store(self.collection_name)
+        return self._store
+
+    @property
+    def embedding_cache(self) -> Optional[EmbeddingCache]:
+        """Cache persistant des embeddings (None si désactivé ou inutilisable), ouvert au premier accès."""
+        if self._embedding_cache is None:
+            with self._init_lock:
+                if self._embedding_cache is None:
+                    try:
+                        cache = create_embedding_cache()
+                    except (OSError, ValueError) as e:
+                        print(f"[RAGEngine][ERROR] Cache d'embeddings indisponible: {e}")
+                        cache = None
+                    self._embedding_cache = False if cache is None else cache
+        return None if self._embedding_cache is False else self._embedding_cache
+
+    def _encode_documents(self, texts: List[str], ids: Optional[List[str]] = None):
+        """
+        Encode des textes à indexer en réutilisant les vecteurs du cache d'embeddings.
+        Retourne (vecteurs, nombre de textes réellement encodés).
+        """
+        cache = self.embedding_cache
+        if cache is None:
+            return list(self.model.encode(texts)), len(texts)
+        keys = [content_hash(text) for text in texts]
+        try:
+            vectors = cache.get_many(keys)
+        except (OSError, ValueError) as e:
+            print(f"[RAGEngine][ERROR] Lecture du cache d'embeddings: {e}")
+            vectors = [None] * len(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        metrics.embedding_cache_lookups.inc(len(texts) - len(missing), result="hit")
+        metrics.embedding_cache_lookups.inc(len(missing), result="miss")
+        if missing:
+            with span("embed_documents", count=len(missing)):
+                encoded = self.model.encode([texts[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+            try:
+                cache.put_many([keys[i] for i in missing], encoded, [ids[i] for i in missing] if ids else None)
+            except (OSError, ValueError) as e:
+                print(f"[RAGEngine][ERROR] Écriture du cache d'embeddings: {e}")
+        return vectors, len(missing)
+
+    def _forget_embeddings(self, hashes: List[str]):
+        """Marque comme supprimés dans le cache les embeddings de contenus retirés de l'index."""
+        cache = self.embedding_cache
+        if cache is None or not hashes:
+            return
+        try:
+            cache.delete(hashes)
+        except (OSError, ValueError) as e:
+            print(f"[RAGEngine][ERROR] Suppression dans le cache d'embeddings: {e}")
+
+    @property
+    def is_ready(self) -> bool:
+        return self._model is not None and self._store is not None
+
+    def warm_up(self):
+        """Charge le modèle, ouvre le stockage vectoriel et exécute un premier encodage."""
+        start = time.perf_counter()
+        self.model.encode(["warm-up"])
+        self.store.count()
+        print(f"[RAGEngine] Prêt en {time.perf_counter() - start:.1f} s")
+
+    def preload(self):
+        """
+        Chargement dans le processus maître avant le fork des workers (gunicorn --preload).
+
+        Seul ce qui peut être partagé sans risque après un fork est chargé : les poids
+        PyTorch (aucune inférence n'est lancée, le pool de threads n'est donc pas encore
+        créé) et l'index NumPy, ouvert en mémoire mappée, avec son index lexical. Les
+        workers héritent de ces pages en copy-on-write. Les sessions ONNX Runtime et les
+        clients HTTP ChromaDB ne survivent pas à un fork : ils sont créés dans chaque worker.
+        """
+        start = time.perf_counter()
+        if settings.EMBEDDING_BACKEND.lower() == "sentence-transformers":
+            self.model
+        if settings.VECTOR_BACKEND.lower() == "numpy":
+            self.store
+            self._sync_lexical_index(force=True)
+        print(f"[RAGEngine] Préchargement terminé en {time.perf_counter() - start:.1f} s")
+
+    @staticmethod
+    def _build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Construit la clause `where` (syntaxe ChromaDB) à partir des filtres de recherche.
+        Les filtres de date sont appliqués en post-filtrage.
+        """
+        if not filters:
+            return None
+        conditions = []
+        # Filtre par type de document
+        if filters.get('document_type'):
+            conditions.append({"doc_type": filters['document_type']})
+        # Filtre par source
+        if filters.get('source_type'):
+            conditions.append({"source_type": filters['source_type']})
+        if not conditions:
+            return None
+        # ChromaDB exige un opérateur $and dès qu'il y a plusieurs conditions
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
 
     def add_document(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
         """
@@ -40,6 +175,8 @@ class RAGEngine:
             text: Contenu textuel du document
             metadata: Métadonnées optionnelles (type de document, date, etc.)
         """
+        start = time.perf_counter()
+        doc_type = (metadata or {}).get("doc_type", "standard")
         try:
             # Métadonnées par défaut
             default_metadata = {
@@ -51,18 +188,209 @@ class RAGEngine:
             # Fusionner les métadonnées par défaut avec celles fournies
             final_metadata = {**default_metadata, **(metadata or {})}
             
-            embedding = self.model.encode([text])[0]
-            self.collection.add(
+            # Comme store.add, un id déjà indexé est ignoré : ni encodage, ni texte différent
+            # dans l'index lexical (upsert_documents remplace un document existant)
+            if self.store.get(ids=[doc_id], include=[])["ids"]:
+                print(f"[RAGEngine] Document déjà indexé, ignoré: {doc_id}")
+                return
+            
+            embeddings, encoded = self._encode_documents([text], [doc_id])
+            embedding = embeddings[0]
+            self.store.add(
                 documents=[text], 
                 embeddings=[embedding], 
                 ids=[doc_id],
                 metadatas=[final_metadata]
             )
+            self.lexical.add(doc_id, text, final_metadata)
+            metrics.observe_indexing(doc_type, start, encoded=encoded, reused=1 - encoded)
             print(f"[RAGEngine] Document ajouté: {doc_id} (type: {final_metadata.get('doc_type')})")
         except Exception as e:
+            metrics.observe_indexing(doc_type, start, status="error")
             print(f"[RAGEngine][ERROR] add_document: {e}")
             raise
             
+    def upsert_documents(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Ajoute ou remplace des documents non découpés, encodés en un seul lot
+        (contrairement à add_document, un id existant est ré-indexé). Un document dont le
+        texte stocké est inchangé n'est pas ré-encodé : seules ses métadonnées sont mises à jour.
+        """
+        start = time.perf_counter()
+        indexed_at = datetime.now().isoformat()
+        final_metadatas = [{"doc_type": "standard", "source_type": "internal", "indexed_at": indexed_at, **metadata}
+                           for metadata in metadatas]
+        doc_type = final_metadatas[0]["doc_type"] if final_metadatas else "standard"
+        try:
+            existing = self.store.get(ids=list(ids), include=["documents"])
+            stored_texts = dict(zip(existing["ids"], existing.get("documents") or []))
+            unchanged = [i for i, doc_id in enumerate(ids) if stored_texts.get(doc_id) == texts[i]]
+            if unchanged:
+                self.update_metadata([ids[i] for i in unchanged], [final_metadatas[i] for i in unchanged])
+            changed = sorted(set(range(len(ids))) - set(unchanged))
+            encoded = 0
+            if changed:
+                changed_ids, changed_texts = [ids[i] for i in changed], [texts[i] for i in changed]
+                changed_metadatas = [final_metadatas[i] for i in changed]
+                embeddings, encoded = self._encode_documents(changed_texts, changed_ids)
+                self.store.upsert(ids=changed_ids, embeddings=embeddings, documents=changed_texts,
+                                  metadatas=changed_metadatas)
+                self.lexical.add_many(changed_ids, changed_texts, changed_metadatas)
+            metrics.observe_indexing(doc_type, start, encoded=encoded, reused=len(ids) - encoded)
+            print(f"[RAGEngine] {len(changed)} documents ré-indexés ({encoded} encodés), "
+                  f"{len(unchanged)} mis à jour sans ré-encodage")
+        except Exception as e:
+            metrics.observe_indexing(doc_type, start, status="error")
+            print(f"[RAGEngine][ERROR] upsert_documents: {e}")
+            raise
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Met à jour les métadonnées de documents existants (fusionnées avec les existantes), sans ré-encodage."""
+        if not ids:
+            return
+        self.store.update(ids=list(ids), metadatas=metadatas)
+        for doc_id, metadata in zip(ids, metadatas):
+            self.lexical.update_metadata(doc_id, metadata)
+
+    def rename_party_documents(self, party_id: str, party_name: str, batch_size: int = 500) -> int:
+        """
+        Répercute le renommage d'un parti sur ses forces/faiblesses indexées : la ligne
+        "PARTI:" du texte et la métadonnée party_name sont réécrites, et les textes renommés
+        ré-encodés par lots (le cache d'embeddings évite de ré-encoder un nom déjà vu, ex:
+        après un retour à l'ancien nom). Retourne le nombre de documents modifiés.
+        """
+        start = time.perf_counter()
+        records = self.store.get(where={"$and": [{"doc_type": "forces"}, {"party_id": party_id}]},
+                                 include=["documents", "metadatas"])
+        # Les documents déjà à jour (événement rejoué) sont ignorés
+        rows = [i for i, metadata in enumerate(records["metadatas"]) if (metadata or {}).get("party_name") != party_name]
+        encoded = 0
+        for offset in range(0, len(rows), batch_size):
+            batch = rows[offset:offset + batch_size]
+            ids = [records["ids"][i] for i in batch]
+            texts = [_PARTY_LINE_RE.sub(lambda _: f"PARTI: {party_name}", records["documents"][i] or "", count=1)
+                     for i in batch]
+            metadatas = [{**(records["metadatas"][i] or {}), "party_name": party_name} for i in batch]
+            embeddings, batch_encoded = self._encode_documents(texts, ids)
+            encoded += batch_encoded
+            self.store.update(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+            self.lexical.add_many(ids, texts, metadatas)
+        print(f"[RAGEngine] Parti {party_id} renommé en '{party_name}' : {len(rows)} documents mis à jour "
+              f"({encoded} encodés) en {(time.perf_counter() - start) * 1000:.0f} ms")
+        return len(rows)
+
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """Supprime des documents de l'index, avec leurs éventuels passages ; retourne le nombre d'entrées supprimées."""
+        if not doc_ids:
+            return 0
+        passages = self.store.get(where={"parent_id": {"$in": list(doc_ids)}}, include=[])["ids"]
+        existing = self.store.get(ids=list(doc_ids), include=[])["ids"]
+        to_delete = existing + passages
+        if to_delete:
+            self.store.delete(ids=to_delete)
+        for doc_id in to_delete:
+            self.lexical.remove(doc_id)
+        print(f"[RAGEngine] {len(to_delete)} entrées supprimées de l'index")
+        return len(to_delete)
+
+    def add_chunked_document(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None,
+                             context_prefix: str = ""):
+        """
+        Indexe un document long sous forme de passages qui se chevauchent
+        
+        Chaque passage est stocké sous l'id `{doc_id}#chunk-{n}` avec l'id du parent et ses
+        positions dans le texte. Lors d'une ré-indexation, les passages dont le contenu
+        n'a pas changé réutilisent leur embedding existant au lieu d'être ré-encodés.
+        
+        Args:
+            doc_id: Identifiant unique du document parent
+            text: Contenu textuel complet du document
+            metadata: Métadonnées optionnelles, recopiées sur chaque passage
+            context_prefix: Texte ajouté devant chaque passage (sauf le premier) à l'encodage et au stockage, ex: le titre
+        """
+        start = time.perf_counter()
+        doc_type = (metadata or {}).get("doc_type", "standard")
+        try:
+            default_metadata = {
+                "doc_type": "standard",
+                "source_type": "internal",
+                "indexed_at": datetime.now().isoformat(),
+            }
+            base_metadata = {**default_metadata, **(metadata or {})}
+            chunks = chunk_text(text, settings.CHUNK_SIZE_WORDS, settings.CHUNK_OVERLAP_WORDS)
+            
+            # Embeddings déjà calculés pour ce document, indexés par empreinte du contenu
+            existing = self.store.get(where={"parent_id": doc_id}, include=["metadatas", "embeddings"])
+            reusable = {}
+            for existing_metadata, embedding in zip(existing.get("metadatas") or [], existing.get("embeddings") or []):
+                if existing_metadata and existing_metadata.get("content_hash"):
+                    reusable[existing_metadata["content_hash"]] = embedding
+            
+            ids, inputs, metadatas, embeddings = [], [], [], []
+            to_encode = []
+            encoded = 0
+            for chunk in chunks:
+                embed_input = f"{context_prefix}{chunk.text}" if chunk.index > 0 else chunk.text
+                digest = content_hash(embed_input)
+                ids.append(chunk_id(doc_id, chunk.index))
+                inputs.append(embed_input)
+                metadatas.append({
+                    **base_metadata,
+                    "parent_id": doc_id,
+                    "chunk_index": chunk.index,
+                    "chunk_count": len(chunks),
+                    "char_start": chunk.start,
+                    "char_end": chunk.end,
+                    "content_hash": digest,
+                })
+                embeddings.append(reusable.get(digest))
+                if digest not in reusable:
+                    to_encode.append(chunk.index)
+
+            # Mêmes passages aux mêmes positions (ex: seuls le statut ou la classification ont changé) :
+            # mise à jour des métadonnées uniquement, sans réécrire textes et vecteurs
+            existing_hashes = {old_id: (m or {}).get("content_hash")
+                               for old_id, m in zip(existing["ids"], existing.get("metadatas") or [])}
+            if ids and existing_hashes == {i: m["content_hash"] for i, m in zip(ids, metadatas)} \
+                    and not self.store.get(ids=[doc_id], include=[])["ids"]:
+                self.update_metadata(ids, metadatas)
+                metrics.observe_indexing(doc_type, start, encoded=0, reused=len(ids))
+                print(f"[RAGEngine] Métadonnées mises à jour: {doc_id} ({len(ids)} passages)")
+                return {"chunks": len(ids), "encoded": 0, "reused": len(ids), "metadata_only": True}
+
+            if to_encode:
+                vectors, encoded = self._encode_documents([inputs[i] for i in to_encode], [ids[i] for i in to_encode])
+                for i, vector in zip(to_encode, vectors):
+                    embeddings[i] = vector
+            if ids:
+                self.store.upsert(ids=ids, embeddings=embeddings, documents=inputs, metadatas=metadatas)
+            
+            # Passages devenus obsolètes, et éventuelle entrée non découpée d'une ancienne indexation
+            stale_ids = [old_id for old_id in existing["ids"] if old_id not in set(ids)]
+            # Contenus qui ne sont plus indexés : leurs embeddings sont retirés du cache
+            kept_hashes = {m["content_hash"] for m in metadatas}
+            self._forget_embeddings([
+                m["content_hash"] for m in existing.get("metadatas") or []
+                if m and m.get("content_hash") and m["content_hash"] not in kept_hashes
+            ])
+            if self.store.get(ids=[doc_id], include=[])["ids"]:
+                stale_ids.append(doc_id)
+            if stale_ids:
+                self.store.delete(ids=stale_ids)
+            for stale_id in stale_ids:
+                self.lexical.remove(stale_id)
+            for passage_id, embed_input, passage_metadata in zip(ids, inputs, metadatas):
+                self.lexical.add(passage_id, embed_input, passage_metadata)
+            
+            metrics.observe_indexing(doc_type, start, encoded=encoded, reused=len(ids) - encoded)
+            print(f"[RAGEngine] Document découpé ajouté: {doc_id} ({len(ids)} passages, "
+                  f"{encoded} encodés, {len(ids) - encoded} réutilisés)")
+            return {"chunks": len(ids), "encoded": encoded, "reused": len(ids) - encoded, "metadata_only": False}
+        except Exception as e:
+            metrics.observe_indexing(doc_type, start, status="error")
+            print(f"[RAGEngine][ERROR] add_chunked_document: {e}")
+            raise
+
     def add_edls_document(self, edls_item: Dict[str, Any]):
         """
         Indexe un document EDLS dans le moteur RAG
@@ -95,14 +423,42 @@ class RAGEngine:
                 "updated_at": edls_item.get('updatedAt', ''),
             }
             
-            # Ajouter le document
-            self.add_document(doc_id, text, metadata)
-            return {"status": "success", "doc_id": doc_id}
+            # Ajouter le document, découpé en passages pour ne pas dépasser la fenêtre de MiniLM
+            chunk_stats = self.add_chunked_document(doc_id, text, metadata, context_prefix=f"TITRE: {title}\n\n")
+            return {"status": "success", "doc_id": doc_id, **chunk_stats}
             
         except Exception as e:
             print(f"[RAGEngine][ERROR] add_edls_document: {e}")
             return {"status": "error", "error": str(e)}
     
+    @staticmethod
+    def forces_document(item: Dict[str, Any], party_name: str = ""):
+        """Identifiant, texte et métadonnées indexés pour un élément Forces/Faiblesses."""
+        # Créer un identifiant unique
+        doc_id = f"forces_{item['id']}"
+        
+        # Préparer le contenu textuel à indexer
+        type_element = item.get('type', '')
+        categorie = item.get('categorie', '')
+        contenu = item.get('contenu', '')
+        resume = item.get('resume', '')
+        source = item.get('source', '')
+        
+        # Combiner les informations en un seul texte
+        text = f"PARTI: {party_name}\n\nTYPE: {type_element}\n\nCATÉGORIE: {categorie}\n\nCONTENU: {contenu}\n\nRÉSUMÉ: {resume}\n\nSOURCE: {source}"
+        
+        # Métadonnées pour Forces/Faiblesses
+        metadata = {
+            "doc_type": "forces",
+            "source_type": "internal",
+            "party_id": item.get('party_id', ''),
+            "party_name": party_name,
+            "type_element": type_element,
+            "categorie": categorie,
+            "date": str(item.get('date', '')),
+        }
+        return doc_id, text, metadata
+
     def add_forces_faiblesses_document(self, item: Dict[str, Any], party_name: str = ""):
         """
         Indexe un document Forces/Faiblesses dans le moteur RAG
@@ -112,29 +468,7 @@ class RAGEngine:
             party_name: Nom du parti politique (optionnel)
         """
         try:
-            # Créer un identifiant unique
-            doc_id = f"forces_{item['id']}"
-            
-            # Préparer le contenu textuel à indexer
-            type_element = item.get('type', '')
-            categorie = item.get('categorie', '')
-            contenu = item.get('contenu', '')
-            resume = item.get('resume', '')
-            source = item.get('source', '')
-            
-            # Combiner les informations en un seul texte
-            text = f"PARTI: {party_name}\n\nTYPE: {type_element}\n\nCATÉGORIE: {categorie}\n\nCONTENU: {contenu}\n\nRÉSUMÉ: {resume}\n\nSOURCE: {source}"
-            
-            # Métadonnées pour Forces/Faiblesses
-            metadata = {
-                "doc_type": "forces",
-                "source_type": "internal",
-                "party_id": item.get('party_id', ''),
-                "party_name": party_name,
-                "type_element": type_element,
-                "categorie": categorie,
-                "date": str(item.get('date', '')),
-            }
+            doc_id, text, metadata = self.forces_document(item, party_name)
             
             # Ajouter le document
             self.add_document(doc_id, text, metadata)
@@ -144,7 +478,219 @@ class RAGEngine:
             print(f"[RAGEngine][ERROR] add_forces_faiblesses_document: {e}")
             return {"status": "error", "error": str(e)}
 
-    def search(self, query: str, n_results: int = 3, filters: Optional[Dict[str, Any]] = None):
+    @staticmethod
+    def _passes_date_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+        """Post-filtrage des dates (ChromaDB a des limitations sur les filtres de date)."""
+        if not filters or not metadata.get('created_at'):
+            return True
+        
+        if filters.get('date_from'):
+            try:
+                doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
+                filter_date = datetime.fromisoformat(filters['date_from'].replace('Z', '+00:00'))
+                if doc_date < filter_date:
+                    return False
+            except (ValueError, TypeError):
+                pass
+        
+        if filters.get('date_to'):
+            try:
+                doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
+                filter_date = datetime.fromisoformat(filters['date_to'].replace('Z', '+00:00'))
+                if doc_date > filter_date:
+                    return False
+            except (ValueError, TypeError):
+                pass
+        
+        return True
+
+    def _sync_lexical_index(self, force: bool = False):
+        """
+        Synchronise l'index BM25 avec le stockage vectoriel : au premier usage, puis au plus
+        toutes les LEXICAL_SYNC_INTERVAL secondes, pour prendre en compte les documents
+        indexés par un autre processus (indexer.py, autre worker).
+        """
+        now = time.monotonic()
+        if not force and self._lexical_synced_at is not None \
+                and now - self._lexical_synced_at < settings.LEXICAL_SYNC_INTERVAL:
+            return
+        with self._lexical_sync_lock:
+            if not force and self._lexical_synced_at is not None \
+                    and now - self._lexical_synced_at < settings.LEXICAL_SYNC_INTERVAL:
+                return
+            stored_ids = set(self.store.get(include=[])["ids"])
+            indexed_ids = set(self.lexical.ids())
+            for doc_id in indexed_ids - stored_ids:
+                self.lexical.remove(doc_id)
+            missing = list(stored_ids - indexed_ids)
+            for start in range(0, len(missing), 500):
+                batch = self.store.get(ids=missing[start:start + 500], include=["documents", "metadatas"])
+                self.lexical.add_many(batch["ids"], batch["documents"], batch["metadatas"])
+            self._lexical_synced_at = time.monotonic()
+
+    @staticmethod
+    def _collapse_chunks(ranked_ids: List[str]) -> List[str]:
+        """Ne garde que le passage le mieux classé de chaque document parent (agrégation par max)."""
+        seen = set()
+        collapsed = []
+        for doc_id in ranked_ids:
+            parent = parent_id_of(doc_id)
+            if parent not in seen:
+                seen.add(parent)
+                collapsed.append(doc_id)
+        return collapsed
+
+    def _fetch_hits(self, ids: List[str], query_emb) -> Dict[str, Dict[str, Any]]:
+        """Récupère document, métadonnées et distance cosinus à la requête pour des ids donnés."""
+        if not ids:
+            return {}
+        fetched = self.store.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        query_vec = np.asarray(query_emb, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+        hits = {}
+        for doc_id, doc, metadata, embedding in zip(fetched["ids"], fetched["documents"],
+                                                     fetched["metadatas"], fetched["embeddings"]):
+            vector = np.asarray(embedding, dtype=np.float32)
+            similarity = float(vector @ query_vec / (np.linalg.norm(vector) or 1.0))
+            hits[doc_id] = {"document": doc, "id": doc_id, "distance": 1.0 - similarity, "metadata": metadata or {}}
+        return hits
+
+    def _rerank(self, query: str, ranked_ids: List[str], hits: Dict[str, Dict[str, Any]]) -> Optional[List[str]]:
+        """Reclasse les candidats par cross-encoder ; None si le budget de temps est dépassé."""
+        candidates = [doc_id for doc_id in ranked_ids if doc_id in hits]
+        scores = self.reranker.score(query, [hits[doc_id]["document"] for doc_id in candidates])
+        if scores is None:
+            metrics.rag_rerank_budget_exceeded.inc()
+            print(f"[RAGEngine] Budget de reranking dépassé ({settings.RERANK_BUDGET_MS} ms), ordre du bi-encodeur conservé")
+            return None
+        for doc_id, score in zip(candidates, scores):
+            hits[doc_id]["rerank_score"] = score
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        return [candidates[i] for i in order]
+
+    def _retrieve_candidates(self, query: str, n_results: int, filters: Optional[Dict[str, Any]], mode: str = "dense",
+                             rerank: bool = False, rerank_candidates: Optional[int] = None,
+                             query_emb=None, encode_ms: Optional[float] = None,
+                             exclude_ids: Optional[List[str]] = None):
+        """
+        Étapes de _retrieve qui précèdent le reclassement : encodage, requête vectorielle et/ou
+        lexicale, fusion RRF. Retourne les ids classés, les résultats par id et les durées.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Mode de recherche inconnu: {mode} (attendu: {', '.join(SEARCH_MODES)})")
+        timings: Dict[str, float] = {}
+        where = self._build_where(filters)
+        # Nombre de documents candidats conservés avant le reclassement (plafonné : chacun est scoré par le cross-encoder)
+        candidates = min(rerank_candidates or settings.RERANK_CANDIDATES, settings.RERANK_MAX_CANDIDATES)
+        keep = max(n_results, candidates) if rerank else n_results
+        excluded = set(exclude_ids or ())
+        # Sur-échantillonnage : plusieurs passages d'un même document peuvent occuper le haut du classement
+        pool = (keep + len(excluded)) * settings.CHUNK_OVERFETCH
+        if mode != "dense":
+            pool = max(pool, settings.HYBRID_CANDIDATES)
+        
+        if query_emb is None:
+            with span("encode", timings):
+                query_emb = self.model.encode([query])[0]
+        else:
+            timings["encode"] = encode_ms or 0.0
+        
+        dense_hits: Dict[str, Dict[str, Any]] = {}
+        dense_ranking: List[str] = []
+        if mode in ("dense", "hybrid"):
+            with span("vector_query", timings, n_results=pool):
+                results = self.store.query(
+                    query_embeddings=[query_emb],
+                    n_results=pool,
+                    where=where,
+                    include=["documents", "metadatas", "distances"]
+                )
+            for doc, doc_id, distance, metadata in zip(results.get("documents", [[]])[0], results.get("ids", [[]])[0],
+                                                       results.get("distances", [[]])[0], results.get("metadatas", [[]])[0]):
+                dense_hits[doc_id] = {"document": doc, "id": doc_id, "distance": distance, "metadata": metadata or {}}
+                dense_ranking.append(doc_id)
+        
+        if mode == "dense":
+            ranked_ids = [doc_id for doc_id in self._collapse_chunks(dense_ranking)
+                          if parent_id_of(doc_id) not in excluded][:keep]
+            hits = dense_hits
+        else:
+            with span("lexical_query", timings):
+                self._sync_lexical_index()
+                lexical_ranking = [doc_id for doc_id, _ in self.lexical.search(query, pool, where)]
+            
+            with span("fusion", timings):
+                if mode == "lexical":
+                    ranked_ids = lexical_ranking
+                else:
+                    fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking], k=settings.RRF_K)
+                    ranked_ids = [doc_id for doc_id, _ in fused]
+                ranked_ids = [doc_id for doc_id in self._collapse_chunks(ranked_ids)
+                              if parent_id_of(doc_id) not in excluded][:keep]
+                hits = dict(dense_hits)
+                hits.update(self._fetch_hits([doc_id for doc_id in ranked_ids if doc_id not in hits], query_emb))
+        return ranked_ids, hits, timings
+
+    def _rerank_candidates(self, query: str, ranked_ids: List[str], hits: Dict[str, Dict[str, Any]],
+                           timings: Dict[str, float]):
+        """Étape de reclassement de _retrieve ; retourne les ids classés et si le reclassement a été appliqué."""
+        with span("rerank", timings, candidates=len(ranked_ids)):
+            reranked_ids = self._rerank(query, ranked_ids, hits)
+        return (ranked_ids, False) if reranked_ids is None else (reranked_ids, True)
+
+    def _select_results(self, ranked_ids: List[str], hits: Dict[str, Dict[str, Any]], n_results: int,
+                        filters: Optional[Dict[str, Any]], timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        with span("filter", timings):
+            # Les passages sont restitués sous l'id de leur document parent
+            return [{**hits[doc_id], "id": parent_id_of(doc_id)} for doc_id in ranked_ids[:n_results]
+                    if doc_id in hits and self._passes_date_filters(hits[doc_id]["metadata"], filters)]
+
+    def _retrieve(self, query: str, n_results: int, filters: Optional[Dict[str, Any]], mode: str = "dense",
+                  rerank: bool = False, rerank_candidates: Optional[int] = None,
+                  query_emb=None, encode_ms: Optional[float] = None, exclude_ids: Optional[List[str]] = None):
+        """
+        Étapes communes à search et answer_question : encodage, requête vectorielle et/ou
+        lexicale, fusion RRF (mode "hybrid"), reclassement optionnel par cross-encoder
+        puis post-filtrage des dates.
+        
+        `query_emb` (et la durée `encode_ms` de son calcul) évite de ré-encoder une requête
+        déjà encodée, ex: par les méthodes async sur l'exécuteur du modèle. Les documents de
+        `exclude_ids` (et leurs passages) sont écartés du classement.
+        
+        Retourne la liste des résultats, la durée de chaque étape en millisecondes, et si
+        le reclassement a été appliqué (None s'il n'a pas été demandé).
+        """
+        ranked_ids, hits, timings = self._retrieve_candidates(query, n_results, filters, mode, rerank,
+                                                              rerank_candidates, query_emb, encode_ms, exclude_ids)
+        reranked = None
+        if rerank:
+            ranked_ids, reranked = self._rerank_candidates(query, ranked_ids, hits, timings)
+        return self._select_results(ranked_ids, hits, n_results, filters, timings), timings, reranked
+
+    async def _aretrieve(self, query: str, n_results: int, filters: Optional[Dict[str, Any]], mode: str = "dense",
+                         rerank: bool = False, rerank_candidates: Optional[int] = None,
+                         query_emb=None, encode_ms: Optional[float] = None):
+        """
+        Version async de _retrieve : les requêtes au stockage s'exécutent sur son exécuteur,
+        l'encodage de la requête (si `query_emb` n'est pas fourni) et le reclassement (inférence
+        du cross-encoder) sur celui du modèle.
+        """
+        if query_emb is None:
+            query_emb, encode_ms = await self._aencode_query(query)
+        ranked_ids, hits, timings = await run_in_executor(store_executor, self._retrieve_candidates, query,
+                                                          n_results, filters, mode, rerank, rerank_candidates,
+                                                          query_emb, encode_ms)
+        reranked = None
+        if rerank:
+            ranked_ids, reranked = await run_in_executor(encode_executor, self._rerank_candidates, query,
+                                                         ranked_ids, hits, timings)
+        return self._select_results(ranked_ids, hits, n_results, filters, timings), timings, reranked
+
+    def search(self, query: str, n_results: int = 3, filters: Optional[Dict[str, Any]] = None, mode: str = "dense",
+               rerank: bool = False, rerank_candidates: Optional[int] = None,
+               query_emb=None, encode_ms: Optional[float] = None,
+               fields: Optional[List[str]] = None, snippet_length: Optional[int] = None,
+               exclude_ids: Optional[List[str]] = None):
         """
         Recherche des documents pertinents en fonction d'une requête et de filtres optionnels
         
@@ -152,84 +698,98 @@ class RAGEngine:
             query: Texte de la requête de recherche
             n_results: Nombre de résultats à retourner
             filters: Filtres optionnels (type de document, plage de dates, etc.)
+            mode: "dense" (embeddings), "lexical" (BM25) ou "hybrid" (fusion RRF des deux)
+            rerank: Reclasser les candidats avec le cross-encoder (sous budget de temps)
+            rerank_candidates: Nombre de candidats reclassés (par défaut settings.RERANK_CANDIDATES)
+            fields: Champs renvoyés parmi SEARCH_FIELDS (par défaut settings.SEARCH_DEFAULT_FIELDS) ;
+                "snippets" contient un extrait du passage retenu, "documents" son texte complet
+            snippet_length: Longueur maximale des extraits (par défaut settings.SNIPPET_LENGTH)
+            exclude_ids: Documents écartés des résultats (ex: le document de référence de similar)
         """
+        validated = None  # jamais les champs bruts dans la réponse d'erreur
         try:
-            # Encoder la requête
-            query_emb = self.model.encode([query])[0]
-            
-            # Préparer les filtres pour ChromaDB
-            where_clause = {}
-            if filters:
-                # Filtre par type de document
-                if filters.get('document_type'):
-                    where_clause["doc_type"] = filters['document_type']
-                
-                # Filtre par source
-                if filters.get('source_type'):
-                    where_clause["source_type"] = filters['source_type']
-                
-                # Autres filtres spécifiques pourraient être ajoutés ici
-                # Note: ChromaDB a des limitations sur les filtres de date, 
-                # nous devrons peut-être implémenter un post-filtrage
-            
-            # Exécuter la requête avec les filtres
-            results = self.collection.query(
-                query_embeddings=[query_emb],
-                n_results=n_results,
-                where=where_clause if where_clause else None,
-                include=["metadatas"]
-            )
-            
-            # Formatage pour le front avec métadonnées
-            documents = results.get("documents", [[]])[0]
-            ids = results.get("ids", [[]])[0]
-            distances = results.get("distances", [[]])[0]
-            metadatas = results.get("metadatas", [[]])[0]
-            
-            # Post-filtrage pour les dates si nécessaire
-            filtered_results = []
-            for i, (doc, doc_id, distance, metadata) in enumerate(zip(documents, ids, distances, metadatas)):
-                # Vérifier les filtres de date si présents
-                include_doc = True
-                
-                if filters and filters.get('date_from') and metadata.get('created_at'):
-                    try:
-                        doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
-                        filter_date = datetime.fromisoformat(filters['date_from'].replace('Z', '+00:00'))
-                        if doc_date < filter_date:
-                            include_doc = False
-                    except (ValueError, TypeError):
-                        pass
-                
-                if filters and filters.get('date_to') and metadata.get('created_at'):
-                    try:
-                        doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
-                        filter_date = datetime.fromisoformat(filters['date_to'].replace('Z', '+00:00'))
-                        if doc_date > filter_date:
-                            include_doc = False
-                    except (ValueError, TypeError):
-                        pass
-                
-                if include_doc:
-                    filtered_results.append({
-                        "document": doc,
-                        "id": doc_id,
-                        "distance": distance,
-                        "metadata": metadata
-                    })
-            
-            # Réorganiser les résultats pour la compatibilité avec le frontend existant
-            return {
-                "documents": [r["document"] for r in filtered_results],
-                "ids": [r["id"] for r in filtered_results],
-                "distances": [r["distance"] for r in filtered_results],
-                "metadatas": [r["metadata"] for r in filtered_results],
-            }
+            validated = self._search_fields(fields)
+            retrieved = self._retrieve(query, n_results, filters, mode, rerank, rerank_candidates,
+                                       query_emb, encode_ms, exclude_ids)
+            return self._search_response(query, retrieved, mode, validated, snippet_length)
         except Exception as e:
-            print(f"[RAGEngine][ERROR] search: {e}")
-            return {"documents": [], "ids": [], "distances": [], "metadatas": [], "error": str(e)}
+            return self._search_error(validated, e)
 
-    def answer_question(self, question: str, n_results_for_context: int = 3, filters: Optional[Dict[str, Any]] = None):
+    @staticmethod
+    def _search_fields(fields: Optional[List[str]]) -> List[str]:
+        fields = fields or settings.SEARCH_DEFAULT_FIELDS
+        unknown = [field for field in fields if field not in SEARCH_FIELDS]
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(unknown)} (attendu: {', '.join(SEARCH_FIELDS)})")
+        return fields
+
+    @staticmethod
+    def _search_response(query: str, retrieved, mode: str, fields: List[str], snippet_length: Optional[int]):
+        """Réponse de search à partir du résultat de _retrieve."""
+        filtered_results, timings, reranked = retrieved
+        # Réorganiser les résultats pour la compatibilité avec le frontend existant
+        with span("format", timings):
+            columns = {
+                "documents": lambda r: r["document"],
+                "ids": lambda r: r["id"],
+                "distances": lambda r: r["distance"],
+                "metadatas": lambda r: r["metadata"],
+                "snippets": lambda r: make_snippet(r["document"], query,
+                                                   snippet_length or settings.SNIPPET_LENGTH),
+            }
+            response = {field: [columns[field](r) for r in filtered_results]
+                        for field in SEARCH_FIELDS if field in fields}
+        metrics.observe_stages(timings, mode)
+        response["timings"] = {stage: round(ms, 3) for stage, ms in timings.items()}
+        if reranked is not None:
+            response["reranked"] = reranked
+        return response
+
+    @staticmethod
+    def _search_error(fields: Optional[List[str]], error: Exception):
+        metrics.rag_errors.inc(operation="search")
+        print(f"[RAGEngine][ERROR] search: {error}")
+        return {**{field: [] for field in fields or SEARCH_FIELDS}, "error": str(error)}
+
+    def stored_vector(self, doc_id: str):
+        """
+        Vecteur déjà indexé d'un document, sans appel au modèle : celui de l'entrée `doc_id`, ou
+        pour un document découpé la moyenne normalisée de ses passages. None si le document
+        n'est pas indexé.
+        """
+        record = self.store.get(ids=[doc_id], include=["embeddings"])
+        if record["ids"]:
+            return np.asarray(record["embeddings"][0], dtype=np.float32)
+        passages = self.store.get(where={"parent_id": doc_id}, include=["embeddings"])
+        if not passages["ids"]:
+            return None
+        vectors = np.asarray(passages["embeddings"], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        mean = vectors.mean(axis=0)
+        return mean / (np.linalg.norm(mean) or 1.0)
+
+    def similar(self, doc_id: str, n_results: int = 5, filters: Optional[Dict[str, Any]] = None,
+                fields: Optional[List[str]] = None, snippet_length: Optional[int] = None):
+        """
+        Documents les plus proches d'un document indexé, à partir de son vecteur stocké (aucun
+        encodage) ; le document lui-même est exclu. Même format de réponse que search, les
+        extraits étant pris au début des passages retenus (aucun texte de requête : le document
+        de référence entier serait trop long pour centrer les extraits). None s'il n'est pas indexé.
+        """
+        start = time.perf_counter()
+        vector = self.stored_vector(doc_id)
+        if vector is None:
+            return None
+        lookup_ms = (time.perf_counter() - start) * 1000
+        response = self.search("", n_results, filters, "dense", query_emb=vector, encode_ms=0.0,
+                               fields=fields, snippet_length=snippet_length, exclude_ids=[doc_id])
+        if "timings" in response:
+            response["timings"]["lookup"] = round(lookup_ms, 3)
+        return response
+
+    def answer_question(self, question: str, n_results_for_context: int = 3, filters: Optional[Dict[str, Any]] = None,
+                        mode: str = "dense", rerank: bool = False, rerank_candidates: Optional[int] = None,
+                        query_emb=None, encode_ms: Optional[float] = None):
         """
         Répond à une question en utilisant les documents pertinents comme contexte
         
@@ -237,90 +797,137 @@ class RAGEngine:
             question: La question posée
             n_results_for_context: Nombre de documents à utiliser comme contexte
             filters: Filtres optionnels pour les documents de contexte
+            mode: Mode de recherche du contexte ("dense", "lexical" ou "hybrid")
+            rerank: Reclasser les candidats avec le cross-encoder (sous budget de temps)
+            rerank_candidates: Nombre de candidats reclassés (par défaut settings.RERANK_CANDIDATES)
         """
         try:
-            question_emb = self.model.encode([question])[0]
-            
-            # Préparer les filtres pour ChromaDB
-            where_clause = {}
-            if filters:
-                if filters.get('document_type'):
-                    where_clause["doc_type"] = filters['document_type']
-                if filters.get('source_type'):
-                    where_clause["source_type"] = filters['source_type']
-            
-            # Récupérer les documents pertinents pour la question
-            context_results = self.collection.query(
-                query_embeddings=[question_emb],
-                n_results=n_results_for_context,
-                where=where_clause if where_clause else None,
-                include=["metadatas"]
-            )
-            
-            retrieved_docs = context_results.get("documents", [[]])[0]
-            retrieved_ids = context_results.get("ids", [[]])[0]
-            retrieved_metadatas = context_results.get("metadatas", [[]])[0]
-            
-            # Post-filtrage pour les dates si nécessaire (même logique que dans search)
-            filtered_docs = []
-            filtered_ids = []
-            filtered_distances = []
-            filtered_metadatas = []
-            
-            distances = context_results.get("distances", [[]])[0]
-            
-            for i, (doc, doc_id, distance, metadata) in enumerate(zip(retrieved_docs, retrieved_ids, distances, retrieved_metadatas)):
-                include_doc = True
-                
-                if filters and filters.get('date_from') and metadata.get('created_at'):
-                    try:
-                        doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
-                        filter_date = datetime.fromisoformat(filters['date_from'].replace('Z', '+00:00'))
-                        if doc_date < filter_date:
-                            include_doc = False
-                    except (ValueError, TypeError):
-                        pass
-                
-                if filters and filters.get('date_to') and metadata.get('created_at'):
-                    try:
-                        doc_date = datetime.fromisoformat(metadata['created_at'].replace('Z', '+00:00'))
-                        filter_date = datetime.fromisoformat(filters['date_to'].replace('Z', '+00:00'))
-                        if doc_date > filter_date:
-                            include_doc = False
-                    except (ValueError, TypeError):
-                        pass
-                
-                if include_doc:
-                    filtered_docs.append(doc)
-                    filtered_ids.append(doc_id)
-                    filtered_distances.append(distance)
-                    filtered_metadatas.append(metadata)
-            
-            # Placeholder pour la génération de réponse avec un LLM
-            # Dans un système RAG réel, vous passeriez `question` et `filtered_docs` à un LLM
-            placeholder_answer = f"LLM Answer Generation (Pending): Based on {len(filtered_docs)} retrieved documents, the answer to '{question}' would be generated here."
-            
-            # Ajouter des informations sur les types de documents utilisés comme contexte
-            doc_types = set(metadata.get('doc_type', 'standard') for metadata in filtered_metadatas)
-            doc_types_str = ", ".join(doc_types) if doc_types else "standard"
-            placeholder_answer += f"\n\nTypes de documents utilisés comme contexte: {doc_types_str}"
-            
-            return {
-                "question": question,
-                "placeholder_answer": placeholder_answer,
-                "retrieved_context_documents": filtered_docs,
-                "retrieved_context_ids": filtered_ids,
-                "distances": filtered_distances,
-                "metadatas": filtered_metadatas
-            }
+            # Récupérer les documents pertinents pour la question (post-filtrage des dates inclus)
+            retrieved = self._retrieve(question, n_results_for_context, filters, mode,
+                                       rerank, rerank_candidates, query_emb, encode_ms)
+            return self._answer_response(question, retrieved, mode)
         except Exception as e:
-            print(f"[RAGEngine][ERROR] answer_question: {e}")
-            return {
-                "question": question,
-                "placeholder_answer": "Error occurred during context retrieval.",
-                "retrieved_context_documents": [],
-                "retrieved_context_ids": [],
-                "distances": [],
-                "metadatas": [],
-                "error": str(e)
-            }
+            return self._answer_error(question, e)
+
+    @staticmethod
+    def _answer_response(question: str, retrieved, mode: str):
+        """Réponse de answer_question à partir du résultat de _retrieve."""
+        filtered_results, timings, reranked = retrieved
+        metrics.observe_stages(timings, mode)
+        
+        filtered_docs = [r["document"] for r in filtered_results]
+        filtered_ids = [r["id"] for r in filtered_results]
+        filtered_distances = [r["distance"] for r in filtered_results]
+        filtered_metadatas = [r["metadata"] for r in filtered_results]
+        
+        # Placeholder pour la génération de réponse avec un LLM
+        # Dans un système RAG réel, vous passeriez `question` et `filtered_docs` à un LLM
+        placeholder_answer = f"LLM Answer Generation (Pending): Based on {len(filtered_docs)} retrieved documents, the answer to '{question}' would be generated here."
+        
+        # Ajouter des informations sur les types de documents utilisés comme contexte
+        doc_types = set(metadata.get('doc_type', 'standard') for metadata in filtered_metadatas)
+        doc_types_str = ", ".join(doc_types) if doc_types else "standard"
+        placeholder_answer += f"\n\nTypes de documents utilisés comme contexte: {doc_types_str}"
+        
+        return {
+            "question": question,
+            "placeholder_answer": placeholder_answer,
+            "retrieved_context_documents": filtered_docs,
+            "retrieved_context_ids": filtered_ids,
+            "distances": filtered_distances,
+            "metadatas": filtered_metadatas,
+            "timings": {stage: round(ms, 3) for stage, ms in timings.items()},
+            **({"reranked": reranked} if reranked is not None else {})
+        }
+
+    @staticmethod
+    def _answer_error(question: str, error: Exception):
+        metrics.rag_errors.inc(operation="answer_question")
+        print(f"[RAGEngine][ERROR] answer_question: {error}")
+        return {
+            "question": question,
+            "placeholder_answer": "Error occurred during context retrieval.",
+            "retrieved_context_documents": [],
+            "retrieved_context_ids": [],
+            "distances": [],
+            "metadatas": [],
+            "error": str(error)
+        }
+
+    # --- API asynchrone (handlers FastAPI async) --- #
+
+    async def _aencode_queries(self, queries: List[str]):
+        """Encode les requêtes en un seul lot sur l'exécuteur du modèle ; retourne (vecteurs, durée en ms)."""
+        timings: Dict[str, float] = {}
+        with span("encode", timings, queries=len(queries)):
+            vectors = await run_in_executor(encode_executor, self.model.encode, queries)
+        return vectors, timings["encode"]
+
+    async def _aencode_query(self, query: str):
+        """Encode la requête sur l'exécuteur du modèle ; retourne (vecteur, durée en ms)."""
+        vectors, encode_ms = await self._aencode_queries([query])
+        return vectors[0], encode_ms
+
+    async def asearch(self, query: str, n_results: int = 3, filters: Optional[Dict[str, Any]] = None,
+                      mode: str = "dense", rerank: bool = False, rerank_candidates: Optional[int] = None,
+                      fields: Optional[List[str]] = None, snippet_length: Optional[int] = None):
+        """
+        Version async de search : encodage et reclassement sur l'exécuteur du modèle, requêtes
+        au stockage sur le sien.
+        """
+        return await self._asearch(query, n_results, filters, mode, rerank, rerank_candidates, fields, snippet_length)
+
+    async def _asearch(self, query: str, n_results: int = 3, filters: Optional[Dict[str, Any]] = None,
+                       mode: str = "dense", rerank: bool = False, rerank_candidates: Optional[int] = None,
+                       fields: Optional[List[str]] = None, snippet_length: Optional[int] = None,
+                       query_emb=None, encode_ms: Optional[float] = None):
+        validated = None
+        try:
+            validated = self._search_fields(fields)
+            retrieved = await self._aretrieve(query, n_results, filters, mode, rerank, rerank_candidates,
+                                              query_emb, encode_ms)
+            return await run_in_executor(store_executor, self._search_response, query, retrieved, mode, validated,
+                                         snippet_length)
+        except Exception as e:
+            return self._search_error(validated, e)
+
+    async def asimilar(self, doc_id: str, n_results: int = 5, filters: Optional[Dict[str, Any]] = None,
+                       fields: Optional[List[str]] = None, snippet_length: Optional[int] = None):
+        """Version async de similar, sur l'exécuteur du stockage (aucun passage par celui du modèle)."""
+        return await run_in_executor(store_executor, self.similar, doc_id, n_results, filters, fields, snippet_length)
+
+    async def asearch_batch(self, searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Plusieurs recherches en une fois : les requêtes distinctes sont encodées en un seul lot,
+        puis les recherches s'exécutent en parallèle (stockage et reclassement sur leurs exécuteurs).
+        
+        Chaque élément de `searches` contient les arguments de search (query, n_results, filters,
+        mode, rerank, rerank_candidates, fields, snippet_length). Les résultats sont renvoyés dans
+        le même ordre ; une recherche en échec a sa propre clé "error" sans affecter les autres.
+        La durée "encode" de chaque résultat est celle du lot complet (celle de sa requête seule
+        si l'encodage du lot a échoué).
+        """
+        queries = list(dict.fromkeys(search["query"] for search in searches))
+        try:
+            vectors, encode_ms = await self._aencode_queries(queries)
+            embeddings = dict(zip(queries, vectors))
+        except Exception as e:
+            # Chaque recherche encode alors sa requête (sur l'exécuteur du modèle) et rapporte sa propre erreur
+            print(f"[RAGEngine][ERROR] encodage des requêtes: {e}")
+            encode_ms, embeddings = None, {}
+        return await asyncio.gather(*(
+            self._asearch(query_emb=embeddings.get(search["query"]),
+                          encode_ms=encode_ms if search["query"] in embeddings else None, **search)
+            for search in searches
+        ))
+
+    async def aanswer_question(self, question: str, n_results_for_context: int = 3,
+                               filters: Optional[Dict[str, Any]] = None, mode: str = "dense",
+                               rerank: bool = False, rerank_candidates: Optional[int] = None):
+        """Version async de answer_question (reclassement sur l'exécuteur du modèle, comme asearch)."""
+        try:
+            retrieved = await self._aretrieve(question, n_results_for_context, filters, mode, rerank,
+                                              rerank_candidates)
+            return self._answer_response(question, retrieved, mode)
+        except Exception as e:
+            return self._answer_error(question, e)
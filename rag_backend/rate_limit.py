@@ -0,0 +1,211 @@
+"""
+Limitation du débit par client pour les routes coûteuses (seau à jetons).
+
+Chaque client (utilisateur authentifié, sinon adresse IP) dispose d'un seau de
+RATE_LIMIT_CAPACITY jetons, rechargé de RATE_LIMIT_REFILL_PER_S jetons par seconde. Une
+requête consomme le coût de sa route (ROUTE_COSTS, surchargeable par RATE_LIMIT_COSTS_STR) ;
+si le seau ne contient pas assez de jetons, elle est refusée en 429 avec Retry-After (délai
+avant que le seau contienne de nouveau assez de jetons).
+
+Les seaux sont gardés en mémoire du processus (un jeu par worker) ou dans Redis
+(RATE_LIMIT_BACKEND="redis", dépendance optionnelle `redis`) pour une limite commune à tous
+les workers. En cas d'erreur du backend partagé, les requêtes sont acceptées.
+
+Le plafond global de requêtes simultanées par classe de routes reste assuré par
+concurrency.concurrency_limit (503 + Retry-After).
+"""
+
+import ipaddress
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException, Request
+
+from . import metrics
+from .config import settings
+from .security import get_current_user
+
+# Coût (en jetons) d'une requête par route : encodage, appel LLM payant, ré-indexation complète
+ROUTE_COSTS: Dict[str, float] = {
+    "search": 1,
+    "answer": 2,
+    "index": 2,
+    "rhdpchat": 5,
+    "perplexity": 5,
+    "reindex": 30,
+}
+
+RATE_LIMIT_BACKENDS = ("memory", "redis")
+
+rate_limit_decisions = metrics.Counter(
+    "rate_limit_decisions_total", "Décisions du limiteur de débit par route", ("route", "result"))
+
+
+def route_cost(route: str) -> float:
+    return settings.RATE_LIMIT_COSTS.get(route, ROUTE_COSTS[route])
+
+
+class MemoryBucketStore:
+    """Seaux en mémoire du processus : {clé: (jetons, instant de la dernière mise à jour)}."""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, cost: float, capacity: float, refill_per_s: float) -> Tuple[bool, float]:
+        """Consomme `cost` jetons si possible. Retourne (accepté, secondes avant d'avoir assez de jetons)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_s)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                self._prune(now, capacity, refill_per_s)
+            self._buckets[key] = (tokens, now)
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_per_s if refill_per_s > 0 else math.inf
+        return allowed, retry_after
+
+    def _prune(self, now: float, capacity: float, refill_per_s: float):
+        # Un seau redevenu plein équivaut à un seau absent
+        for key in [key for key, (tokens, updated) in self._buckets.items()
+                    if tokens + (now - updated) * refill_per_s >= capacity]:
+            del self._buckets[key]
+        while len(self._buckets) >= self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+
+# Mise à jour atomique du seau dans Redis : KEYS[1], ARGV = coût, capacité, recharge/s, instant (s)
+_REDIS_TAKE = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local capacity, rate, now, cost = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[1])
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+if rate > 0 then
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+end
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Seaux partagés entre workers et serveurs, dans Redis (script Lua atomique)."""
+
+    def __init__(self, url: str, prefix: str = "rag_rate_limit:"):
+        import redis.asyncio as redis  # dépendance optionnelle
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_REDIS_TAKE)
+
+    async def take(self, key: str, cost: float, capacity: float, refill_per_s: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[cost, capacity, refill_per_s, time.time()])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / refill_per_s if refill_per_s > 0 else math.inf
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Backend des seaux (settings.RATE_LIMIT_BACKEND), créé au premier usage."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = settings.RATE_LIMIT_BACKEND
+                if backend == "memory":
+                    _store = MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+                elif backend == "redis":
+                    if not settings.RATE_LIMIT_REDIS_URL:
+                        raise ValueError("RATE_LIMIT_REDIS_URL est requis avec RATE_LIMIT_BACKEND=redis")
+                    _store = RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+                else:
+                    raise ValueError(f"Backend de limitation inconnu: {backend} "
+                                     f"(attendu: {', '.join(RATE_LIMIT_BACKENDS)})")
+    return _store
+
+
+@lru_cache(maxsize=8)
+def _trusted_networks(proxies: Tuple[str, ...]) -> Tuple[Any, ...]:
+    networks = []
+    for proxy in proxies:
+        try:
+            networks.append(ipaddress.ip_network(proxy, strict=False))
+        except ValueError:
+            print(f"[RAGEngine][ERROR] Proxy de confiance invalide ignoré: {proxy}")
+    return tuple(networks)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(tuple(settings.RATE_LIMIT_TRUSTED_PROXIES)))
+
+
+async def client_key(request: Request) -> str:
+    """Utilisateur du token Bearer s'il est valide (validation en cache), sinon adresse IP du client."""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            user = await get_current_user(authorization[7:].strip())
+            return f"user:{user.username}"
+        except HTTPException:
+            pass
+    peer = request.client.host if request.client else "unknown"
+    header = settings.RATE_LIMIT_CLIENT_IP_HEADER
+    # L'en-tête n'est fiable que s'il a été posé par un reverse proxy de confiance
+    ip = request.headers.get(header) if header and _is_trusted_proxy(peer) else None
+    return f"ip:{(ip or peer).split(',')[0].strip()}"
+
+
+async def charge(request: Request, route: str, units: int = 1):
+    """Consomme `units` fois le coût de la route dans le seau du client ; 429 si épuisé."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    key = await client_key(request)
+    try:
+        allowed, retry_after = await get_bucket_store().take(
+            key, route_cost(route) * units, settings.RATE_LIMIT_CAPACITY, settings.RATE_LIMIT_REFILL_PER_S)
+    except ValueError:
+        raise
+    except Exception as e:
+        # Backend partagé injoignable : on laisse passer plutôt que de bloquer le service
+        print(f"[RAGEngine][ERROR] Limiteur de débit indisponible: {e}")
+        rate_limit_decisions.inc(route=route, result="error")
+        return
+    if not allowed:
+        rate_limit_decisions.inc(route=route, result="limited")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Trop de requêtes ({route}), réessayez dans {math.ceil(retry_after)} s",
+            headers={"Retry-After": str(max(1, math.ceil(min(retry_after, 86400))))},
+        )
+    rate_limit_decisions.inc(route=route, result="allowed")
+
+
+def rate_limit(route: str):
+    """Dépendance FastAPI : consomme le coût de la route dans le seau du client, 429 si épuisé."""
+    if route not in ROUTE_COSTS:
+        raise ValueError(f"Route inconnue pour la limitation: {route} (attendu: {', '.join(ROUTE_COSTS)})")
+
+    async def dependency(request: Request):
+        await charge(request, route)
+
+    return dependency
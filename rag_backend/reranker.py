@@ -0,0 +1,60 @@
+"""
+Reclassement (reranking) des résultats de recherche par un cross-encoder.
+
+Le bi-encodeur (MiniLM) encode requête et documents séparément ; un cross-encoder
+lit chaque paire (requête, passage) et donne un score de pertinence plus fiable,
+au prix d'un passage du modèle par candidat. Le scoring se fait par lots sur CPU,
+sous un budget de temps strict : si le budget est dépassé, l'ordre du bi-encodeur
+est conservé.
+"""
+
+import threading
+import time
+from typing import List, Optional
+
+from .config import settings
+
+
+class CrossEncoderReranker:
+    """Cross-encoder chargé à la première utilisation, avec budget de temps par requête."""
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None):
+        self.model_name = model_name or settings.RERANK_MODEL
+        self.batch_size = batch_size or settings.RERANK_BATCH_SIZE
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def score(self, query: str, passages: List[str], budget_ms: Optional[float] = None) -> Optional[List[float]]:
+        """
+        Score de pertinence de chaque passage pour la requête.
+
+        Retourne None si le budget de temps est (ou serait) dépassé : l'appelant garde alors
+        l'ordre du bi-encodeur. Un lot n'est lancé que si la durée moyenne des lots précédents
+        tient dans le temps restant.
+        """
+        if not passages:
+            return []
+        budget_s = (budget_ms if budget_ms is not None else settings.RERANK_BUDGET_MS) / 1000.0
+        model = self.model
+        start = time.perf_counter()
+        scores: List[float] = []
+        batches = 0
+        for offset in range(0, len(passages), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if batches and elapsed + elapsed / batches > budget_s:
+                return None
+            batch = passages[offset:offset + self.batch_size]
+            scores.extend(float(s) for s in model.predict([(query, p or "") for p in batch], batch_size=len(batch)))
+            batches += 1
+        if time.perf_counter() - start > budget_s:
+            return None
+        return scores
@@ -0,0 +1,62 @@
+"""
+Sérialisation JSON rapide des réponses volumineuses (/search, /answer-question, liste des forces/faiblesses).
+
+Les routes concernées renvoient directement une FastJSONResponse : FastAPI ne repasse alors pas
+le résultat dans jsonable_encoder (parcours récursif en Python) avant la sérialisation.
+- FastJSONResponse : dictionnaires et listes sérialisés par orjson (repli sur json si absent) ;
+  les types NumPy, dates, énumérations et modèles Pydantic imbriqués sont pris en charge.
+- models_response() : liste de modèles Pydantic sérialisée directement en JSON par pydantic-core,
+  sans construire de dictionnaires intermédiaires.
+"""
+
+import json
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from typing import Any, List, Sequence, Type
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # repli sur json (plus lent, même résultat)
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type non sérialisable en JSON: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Sérialise en JSON compact (UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def models_response(model: Type[BaseModel], items: Sequence[BaseModel], status_code: int = 200) -> Response:
+    """Réponse JSON d'une liste de modèles, sérialisée par pydantic-core (équivalent de response_model=List[model])."""
+    return Response(_list_adapter(model).dump_json(list(items)), status_code=status_code,
+                    media_type="application/json")
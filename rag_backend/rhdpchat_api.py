@@ -1,6 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 import os
+import time
 import httpx
 from dotenv import load_dotenv
 from pathlib import Path
@@ -12,6 +13,10 @@ GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
 from .forces_api import router as forces_router
 from .perplexity_proxy import router as perplexity_router
+from . import metrics
+from .concurrency import concurrency_limit
+from .rate_limit import rate_limit
+from .tracing import span
 
 app = FastAPI()
 router = APIRouter()
@@ -37,19 +42,25 @@ async def call_groq_api(query: str) -> str:
         ],
         "stream": False
     }
+    start = time.perf_counter()
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(GROQ_API_URL, json=payload, headers=headers, timeout=45.0)
+            with span("llm.groq"):
+                response = await client.post(GROQ_API_URL, json=payload, headers=headers, timeout=45.0)
             response.raise_for_status()
             data = response.json()
             # Log sécurisé sans exposer les données sensibles
             print(f"[GROQ INFO] Requête envoyée à {GROQ_API_URL}, statut: {response.status_code}")
             # Ne pas logger la réponse complète qui peut contenir des informations sensibles
-            return data["choices"][0]["message"]["content"]
+            content = data["choices"][0]["message"]["content"]
+        metrics.observe_llm_call("groq", start)
+        return content
     except Exception as e:
+        metrics.observe_llm_call("groq", start, e)
         raise HTTPException(status_code=503, detail=f"Erreur Groq: {e}")
 
-@router.post("/api/rhdpchat", response_model=ChatResponse)
+@router.post("/api/rhdpchat", response_model=ChatResponse,
+             dependencies=[Depends(rate_limit("rhdpchat")), Depends(concurrency_limit("llm"))])
 async def handle_rhdp_chat(chat_query: ChatQuery):
     try:
         response = await call_groq_api(chat_query.query)
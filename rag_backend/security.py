@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import hashlib
+import threading
+import time
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,6 +10,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from .config import settings # Importation des settings centralisés
+from .concurrency import password_executor, run_in_executor
 
 # Les configurations sont maintenant chargées et utilisées via l'objet settings importé.
 
@@ -39,6 +43,10 @@ def get_password_hash(password: str) -> str:
     """Hache un mot de passe."""
     return pwd_context.hash(password)
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Version async de verify_password : bcrypt s'exécute sur le pool dédié, pas sur la boucle d'événements."""
+    return await run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Crée un token d'accès JWT."""
     to_encode = data.copy()
@@ -57,7 +65,8 @@ fake_users_db = {
         "username": "johndoe",
         "full_name": "John Doe",
         "email": "johndoe@example.com",
-        "hashed_password": get_password_hash("secretpassword"), # Mettez un vrai mot de passe haché
+        # Hash bcrypt de "secretpassword", précalculé : hacher à l'import ralentit le démarrage de l'API
+        "hashed_password": "$2b$12$/SqHoqej1iE8At0f8mE4Te4y7baxyXbNjm6yM/NQ33eUkRhAu9/7G",
         "disabled": False,
     }
 }
@@ -69,11 +78,57 @@ def get_user(db, username: str) -> Optional[UserInDB]:
         return UserInDB(**user_dict)
     return None
 
+# Cache des tokens déjà validés : empreinte SHA-256 du token -> (utilisateur, fin de validité time.time()).
+# Une entrée vit au plus TOKEN_CACHE_TTL secondes et jamais au-delà de l'expiration du token :
+# un utilisateur désactivé ou supprimé est refusé au plus tard TOKEN_CACHE_TTL secondes après.
+_token_cache: Dict[str, Tuple[User, float]] = {}
+_token_cache_lock = threading.Lock()
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _cached_user(digest: str) -> Optional[User]:
+    entry = _token_cache.get(digest)
+    if entry is None:
+        return None
+    user, valid_until = entry
+    if time.time() >= valid_until:
+        with _token_cache_lock:
+            _token_cache.pop(digest, None)
+        return None
+    return user
+
+def _cache_user(digest: str, user: User, expires_at: Optional[float]):
+    if settings.TOKEN_CACHE_SIZE <= 0:
+        return
+    valid_until = time.time() + settings.TOKEN_CACHE_TTL
+    if expires_at is not None:
+        valid_until = min(valid_until, expires_at)
+    with _token_cache_lock:
+        if len(_token_cache) >= settings.TOKEN_CACHE_SIZE:
+            # Entrées expirées d'abord, puis les plus anciennes (ordre d'insertion)
+            now = time.time()
+            for key in [key for key, (_, until) in _token_cache.items() if until <= now]:
+                del _token_cache[key]
+            while len(_token_cache) >= settings.TOKEN_CACHE_SIZE:
+                del _token_cache[next(iter(_token_cache))]
+        _token_cache[digest] = (user, valid_until)
+
+def clear_token_cache():
+    """Vide le cache des tokens validés (ex: après modification d'un utilisateur)."""
+    with _token_cache_lock:
+        _token_cache.clear()
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Décode le token JWT pour obtenir l'utilisateur actuel.
     Lève une exception HTTPException si le token est invalide ou a expiré.
+    Les tokens déjà validés sont servis depuis un cache à durée de vie courte.
     """
+    digest = _token_digest(token)
+    cached = _cached_user(digest)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -88,9 +143,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     except JWTError:
         raise credentials_exception
     
-    user = get_user(fake_users_db, username=token_data.username)
-    if user is None:
+    user_in_db = get_user(fake_users_db, username=token_data.username)
+    if user_in_db is None:
         raise credentials_exception
+    # Le hash du mot de passe n'est pas conservé dans le cache
+    user = User(**user_in_db.model_dump(exclude={"hashed_password"}))
+    _cache_user(digest, user, payload.get("exp"))
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -101,3 +159,12 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     if current_user.disabled:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """
+    Vérifie que l'utilisateur actuel est administrateur (settings.ADMIN_USERNAMES).
+    Lève une exception HTTPException 403 sinon.
+    """
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
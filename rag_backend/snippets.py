@@ -0,0 +1,69 @@
+"""
+Extraits (snippets) des résultats de recherche.
+
+Le texte d'un résultat est le passage retenu (document découpé) ou le document entier
+(EDLS avec résumé et points clés : plusieurs Ko). L'interface n'en affiche qu'un aperçu :
+on renvoie la fenêtre d'au plus SNIPPET_LENGTH caractères qui contient le plus de termes
+de la requête, alignée sur un début de phrase quand c'est possible et coupée entre deux mots.
+"""
+
+import re
+from functools import lru_cache
+from typing import FrozenSet, List, Sequence, Tuple
+
+from .chunking import split_sentences
+from .lexical_index import tokenize
+
+ELLIPSIS = "…"
+
+_WORD_RE = re.compile(r"\S+")
+
+
+@lru_cache(maxsize=65536)
+def _terms(word: str) -> frozenset:
+    # Le vocabulaire des documents se répète : la normalisation n'est faite qu'une fois par mot
+    return frozenset(tokenize(word))
+
+
+def _best_window(word_spans: List[Tuple[int, int]], word_terms: List[FrozenSet[str]], starts: Sequence[int],
+                 length: int) -> Tuple[int, int]:
+    """(premier mot, mot de fin exclu) de la meilleure fenêtre commençant à l'un des mots `starts`."""
+    best, best_score = (0, 0), (-1, -1, 0)
+    for first in starts:
+        last = first
+        while last < len(word_spans) and word_spans[last][1] - word_spans[first][0] <= length:
+            last += 1
+        last = max(last, first + 1)
+        hits = [i for i in range(first, last) if word_terms[i]]
+        matched = set().union(*(word_terms[i] for i in hits))
+        # Termes distincts d'abord, puis nombre d'occurrences, puis le moins de mots avant le
+        # premier terme ; à égalité, la fenêtre la plus tôt
+        score = (len(matched), len(hits), -(hits[0] - first) if hits else 0)
+        if score > best_score:
+            best, best_score = (first, last), score
+    return best
+
+
+def make_snippet(text: str, query: str, length: int = 300) -> str:
+    """Extrait d'au plus `length` caractères de `text` centré sur les termes de `query`."""
+    if not text or len(text) <= length:
+        return text or ""
+    query_terms = set(tokenize(query))
+    word_spans = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+    word_terms = [_terms(text[start:end]) & query_terms for start, end in word_spans]
+
+    # Fenêtres candidates : début du texte et de chaque phrase
+    word_starts = {start: i for i, (start, _) in enumerate(word_spans)}
+    starts = sorted({word_starts[start] for start, _ in split_sentences(text) if start in word_starts} | {0})
+    first, last = _best_window(word_spans, word_terms, starts, length)
+    if not any(word_terms[first:last]) and any(word_terms):
+        matches = [i for i, terms in enumerate(word_terms) if terms]
+        # Aucun terme dans les fenêtres alignées sur les phrases (phrases longues) : fenêtres
+        # commençant quelques mots avant chaque terme trouvé
+        first, last = _best_window(word_spans, word_terms, [max(0, i - 5) for i in matches], length)
+
+    start, end = word_spans[first][0], word_spans[last - 1][1]
+    snippet = text[start:end]
+    if len(snippet) > length:  # un seul « mot » plus long que l'extrait
+        snippet = snippet[:length]
+    return f"{ELLIPSIS if start > 0 else ''}{snippet}{ELLIPSIS if end < len(text) else ''}"
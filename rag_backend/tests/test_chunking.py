@@ -0,0 +1,38 @@
+from rag_backend.chunking import chunk_id, chunk_text, parent_id_of, split_sentences
+
+
+def test_split_sentences_returns_offsets():
+    """
+    Vérifie le découpage en phrases et les positions dans le texte d'origine.
+    """
+    text = "Première phrase. Deuxième phrase !\n\nNouveau paragraphe"
+    spans = split_sentences(text)
+    assert [text[start:end] for start, end in spans] == ["Première phrase.", "Deuxième phrase !", "Nouveau paragraphe"]
+
+
+def test_chunk_text_windows_overlap_and_cover_text():
+    """
+    Les passages respectent la taille maximale, se chevauchent et couvrent tout le texte.
+    """
+    text = " ".join(f"Phrase numéro {i} avec quelques mots." for i in range(40))
+    chunks = chunk_text(text, max_words=30, overlap_words=10)
+    assert len(chunks) > 1
+    assert all(len(c.text.split()) <= 30 for c in chunks)
+    assert all(text[c.start:c.end] == c.text for c in chunks)
+    assert chunks[0].start == 0 and chunks[-1].end == len(text)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.start < previous.end  # chevauchement
+
+
+def test_chunk_text_splits_overlong_sentences():
+    """
+    Une phrase plus longue que la fenêtre est coupée sur les limites de mots.
+    """
+    text = " ".join(["mot"] * 95)
+    chunks = chunk_text(text, max_words=40, overlap_words=0)
+    assert [len(c.text.split()) for c in chunks] == [40, 40, 15]
+
+
+def test_chunk_ids_round_trip():
+    assert parent_id_of(chunk_id("edls_12", 3)) == "edls_12"
+    assert parent_id_of("forces_7") == "forces_7"
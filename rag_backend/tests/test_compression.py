@@ -0,0 +1,118 @@
+import asyncio
+import json
+from datetime import date
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from rag_backend.compression import CompressionMiddleware, choose_encoding
+from rag_backend.forces_models import StrengthWeakness, TypeElement
+from rag_backend.responses import FastJSONResponse, models_response
+
+
+def _client_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big():
+        return FastJSONResponse({"documents": ["passage " * 50] * 10})
+
+    @app.get("/small")
+    async def small():
+        return FastJSONResponse({"status": "ok"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                yield f"ligne {i} ".encode() * 40
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/binary")
+    async def binary():
+        return PlainTextResponse("x" * 1000, media_type="application/octet-stream")
+
+    return app
+
+
+def _get(app, path, accept_encoding):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+    return asyncio.run(scenario())
+
+
+def test_choose_encoding_honours_quality():
+    """
+    gzip est retenu s'il est accepté avec q > 0 ; q=0 l'exclut.
+    """
+    assert choose_encoding("gzip, deflate") in ("gzip", "br")
+    assert choose_encoding("deflate, gzip;q=0") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("identity, gzip;q=0.5, br;q=0") == "gzip"
+
+
+def test_large_json_is_gzipped_small_is_not():
+    """
+    Une réponse JSON au-dessus du seuil est compressée (Content-Encoding, Vary) ; en dessous, elle part telle quelle.
+    """
+    app = _client_app()
+    big = _get(app, "/big", "gzip")
+    assert big.headers["content-encoding"] == "gzip"
+    assert big.headers["vary"] == "Accept-Encoding"
+    assert int(big.headers["content-length"]) < 4000
+    assert big.json()["documents"][0].startswith("passage")
+
+    small = _get(app, "/small", "gzip")
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"status": "ok"}
+
+    identity = _get(app, "/big", "identity")
+    assert "content-encoding" not in identity.headers
+
+
+def test_streamed_and_binary_responses():
+    """
+    Les réponses en flux sont compressées au fil de l'eau ; les types non textuels ne sont pas compressés.
+    """
+    app = _client_app()
+    streamed = _get(app, "/stream", "gzip")
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert streamed.text == "".join(f"ligne {i} " * 40 for i in range(5))
+
+    binary = _get(app, "/binary", "gzip")
+    assert "content-encoding" not in binary.headers
+    assert binary.content == b"x" * 1000
+
+
+def test_fast_json_response_handles_numpy_and_dates():
+    """
+    FastJSONResponse sérialise les scalaires et tableaux NumPy, les dates et les modèles Pydantic.
+    """
+    element = StrengthWeakness(id="sw-1", party_id="p-1", type=TypeElement.FORCE, categorie="politique",
+                               contenu="contenu", date=date(2024, 5, 1))
+    body = FastJSONResponse({
+        "distances": np.array([0.25, 0.5], dtype=np.float32),
+        "score": np.float64(0.75),
+        "count": np.int64(3),
+        "element": element,
+    }).body
+    content = json.loads(body)
+    assert content["distances"] == [0.25, 0.5]
+    assert content["score"] == 0.75 and content["count"] == 3
+    assert content["element"] == element.model_dump(mode="json")
+
+
+def test_models_response_matches_response_model_output():
+    """
+    models_response produit le même JSON que response_model=List[StrengthWeakness].
+    """
+    elements = [StrengthWeakness(id=f"sw-{i}", party_id="p-1", type=TypeElement.FAIBLESSE, categorie="économie",
+                                 contenu=f"élément {i}", date=date(2024, 1, i + 1)) for i in range(3)]
+    response = models_response(StrengthWeakness, elements)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == [e.model_dump(mode="json") for e in elements]
@@ -0,0 +1,32 @@
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from rag_backend import concurrency
+from rag_backend.config import settings
+
+
+def test_concurrency_limit_rejects_when_queue_times_out(monkeypatch):
+    """
+    Au-delà de la limite d'une classe de routes, une requête attend puis reçoit un 503 avec Retry-After.
+    """
+    monkeypatch.setattr(settings, "SEARCH_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "CONCURRENCY_QUEUE_TIMEOUT", 0.05)
+    app = FastAPI()
+
+    @app.get("/slow", dependencies=[Depends(concurrency.concurrency_limit("search"))])
+    async def slow():
+        await asyncio.sleep(0.3)
+        return {"status": "ok"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(client.get("/slow"), client.get("/slow"))
+
+    responses = asyncio.run(scenario())
+    assert sorted(r.status_code for r in responses) == [200, 503]
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert rejected.headers["Retry-After"] == "1"
+    assert concurrency.in_flight["search"] == 0 and concurrency.waiting["search"] == 0
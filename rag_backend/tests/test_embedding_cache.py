@@ -0,0 +1,47 @@
+import numpy as np
+
+from rag_backend.embedding_cache import EmbeddingCache
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_cache_roundtrip_and_shared_between_instances(tmp_path):
+    """
+    Vérifie l'ajout, la lecture en mémoire mappée et la visibilité des écritures d'une autre instance.
+    """
+    cache = EmbeddingCache(str(tmp_path))
+    vectors = _vectors(3)
+    cache.put_many(["a", "b", "c"], vectors, ids=["doc1", "doc2", None])
+    got = cache.get_many(["b", "x", "a"])
+    assert got[1] is None
+    np.testing.assert_array_equal(got[0], vectors[1])
+    np.testing.assert_array_equal(got[2], vectors[0])
+
+    other = EmbeddingCache(str(tmp_path))
+    assert len(other) == 3
+    other.put_many(["d", "a"], _vectors(2, seed=1))
+    assert cache.get_many(["d"])[0] is not None and "d" in cache
+    # Une empreinte déjà présente n'est pas réécrite
+    np.testing.assert_array_equal(cache.get_many(["a"])[0], vectors[0])
+
+
+def test_cache_tombstones_and_compaction(tmp_path):
+    """
+    Vérifie que les suppressions déclenchent la compaction et que les vecteurs vivants sont conservés.
+    """
+    cache = EmbeddingCache(str(tmp_path), compact_ratio=0.3, min_compact_rows=4)
+    vectors = _vectors(10)
+    keys = [f"k{i}" for i in range(10)]
+    cache.put_many(keys, vectors)
+    reader = EmbeddingCache(str(tmp_path))
+    cache.delete(keys[:2])
+    assert cache.stats()["generation"] == 0 and cache.stats()["dead"] == 2
+    cache.delete(keys[2:4])
+    stats = cache.stats()
+    assert stats["generation"] == 1 and stats["dead"] == 0 and stats["live"] == 6
+    # Une autre instance bascule sur la nouvelle génération
+    got = reader.get_many(keys)
+    assert got[:4] == [None] * 4
+    np.testing.assert_array_equal(np.stack(got[4:]), vectors[4:])
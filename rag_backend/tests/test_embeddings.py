@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+import pytest
+
+from rag_backend.embeddings import ONNX_QUANTIZED_MODEL_FILE, default_onnx_dir
+
+
+def test_onnx_backend_matches_pytorch():
+    """
+    Parité numérique du backend ONNX (int8) avec PyTorch, si les deux sont disponibles
+    et que le modèle a été exporté (python -m rag_backend.export_onnx).
+    """
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+    if not os.path.exists(os.path.join(default_onnx_dir(), ONNX_QUANTIZED_MODEL_FILE)):
+        pytest.skip("Modèle ONNX non exporté")
+    from rag_backend.embeddings import OnnxEmbedder, SentenceTransformerEmbedder
+
+    texts = ["Le RHDP renforce sa mobilisation.", "Article 48 de la Constitution.", "Réunion des militants."]
+    reference = SentenceTransformerEmbedder().encode(texts)
+    candidate = OnnxEmbedder(quantized=True).encode(texts)
+    assert candidate.shape == reference.shape
+    assert np.min(np.sum(reference * candidate, axis=1)) > 0.98
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import date
+
+import numpy as np
+import pytest
+
+from rag_backend import forces_outbox, forces_store, themes
+from rag_backend.config import settings
+from rag_backend.rag_engine import RAGEngine
+from rag_backend.vector_store import NumpyVectorStore
+
+
+class HashingModel:
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 16] += 1
+        return vectors
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """forces_store, l'outbox et les thèmes pointent vers un répertoire temporaire."""
+    monkeypatch.setattr(forces_store, "DB_PARTIES_FILE", str(tmp_path / "parties.json"))
+    monkeypatch.setattr(forces_store, "DB_SW_FILE", str(tmp_path / "strengths_weaknesses.json"))
+    monkeypatch.setattr(forces_store, "DB_MEDIA_FILE", str(tmp_path / "media_files.json"))
+    monkeypatch.setattr(forces_store, "_loaded", False)
+    monkeypatch.setattr(forces_outbox, "OUTBOX_DIR", str(tmp_path / "outbox"))
+    monkeypatch.setattr(themes, "THEMES_FILE", str(tmp_path / "themes.json"))
+    monkeypatch.setattr(settings, "FORCES_OUTBOX_ENABLED", True)
+    monkeypatch.setattr(settings, "FORCES_OUTBOX_FSYNC", False)
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    engine = RAGEngine(store=NumpyVectorStore())
+    engine._model = HashingModel()
+    engine._embedding_cache = False
+    return engine
+
+
+def test_outbox_applies_upserts_renames_and_deletes(workdir, engine):
+    """
+    Les mutations du store sont appliquées à l'index par le consommateur : ajout, renommage du
+    parti (texte, métadonnées et vecteurs mis à jour), puis suppression des vecteurs `forces_{id}`.
+    """
+    party = forces_store.create_party("RHDP", "Parti")
+    kept = forces_store.add_strength_weakness(party.id, "force", "mobilisation des militants", date(2024, 1, 1))
+    removed = forces_store.add_strength_weakness(party.id, "faiblesse", "divisions internes", date(2024, 1, 2))
+    consumer = forces_outbox.OutboxConsumer(lambda: engine, batch_size=10)
+
+    assert consumer.run_once() == 2
+    assert sorted(engine.store.get(include=[])["ids"]) == sorted([f"forces_{kept.id}", f"forces_{removed.id}"])
+    assert consumer.run_once() == 0
+
+    forces_store.update_party(party.id, nom="RHDP-Nouveau")
+    forces_store.delete_strength_weakness(removed.id)
+    assert consumer.run_once() == 2
+    stored = engine.store.get(include=["documents", "metadatas", "embeddings"])
+    assert stored["ids"] == [f"forces_{kept.id}"]
+    # Le texte renommé est ré-encodé
+    expected = engine.model.encode([stored["documents"][0]])[0]
+    assert np.allclose(stored["embeddings"][0], expected / np.linalg.norm(expected))
+    assert stored["documents"][0].startswith("PARTI: RHDP-Nouveau")
+    assert stored["metadatas"][0]["party_name"] == "RHDP-Nouveau"
+    assert [doc_id for doc_id, _ in engine.lexical.search("divisions", 5)] == []
+
+    forces_store.delete_party(party.id)
+    consumer.run_once()
+    assert engine.store.count() == 0
+    assert forces_outbox.read_offset() == (workdir / "outbox" / "events.jsonl").stat().st_size
+
+
+def test_outbox_replays_batch_after_failure(workdir, engine, monkeypatch):
+    """
+    Un lot en échec n'avance pas l'offset : il est rejoué ; les événements d'un même élément
+    sont fusionnés (le dernier l'emporte) et le journal consommé est compacté.
+    """
+    monkeypatch.setattr(settings, "FORCES_OUTBOX_COMPACT_BYTES", 1)
+    forces_outbox.emit("upsert", ["a", "b"])
+    forces_outbox.emit("delete", ["a"])
+    events, _ = forces_outbox.read_events(0, 10)
+    assert forces_outbox.coalesce(events) == {"b": "upsert", "a": "delete"}
+
+    deleted, failures = [], [RuntimeError("stockage indisponible")]
+
+    def delete_documents(doc_ids):
+        if failures:
+            raise failures.pop()
+        deleted.extend(doc_ids)
+
+    monkeypatch.setattr(engine, "delete_documents", delete_documents)
+    consumer = forces_outbox.OutboxConsumer(lambda: engine, batch_size=10)
+    with pytest.raises(RuntimeError):
+        consumer.run_once()
+    assert forces_outbox.read_offset() == 0
+
+    assert consumer.run_once() == 3
+    # L'élément "b" n'existe pas dans le store : l'upsert devient une suppression
+    assert sorted(deleted) == ["forces_a", "forces_b"]
+    assert consumer.run_once() == 0
+    assert (workdir / "outbox" / "events.jsonl").stat().st_size == 0
+    assert forces_outbox.read_offset() == 0
+
+
+def test_outbox_single_consumer_and_stop(workdir, engine):
+    """
+    Un seul consommateur prend le verrou ; la boucle s'arrête et libère le verrou à la demande.
+    """
+    first = forces_outbox.OutboxConsumer(lambda: engine)
+    second = forces_outbox.OutboxConsumer(lambda: engine)
+    assert first.try_acquire()
+    if forces_outbox.fcntl is not None:
+        assert not second.try_acquire()
+    first.release()
+
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(second.run(stop, lambda func: asyncio.to_thread(func)))
+        await asyncio.sleep(0.05)
+        stop.set()
+        await asyncio.wait_for(task, timeout=2)
+
+    asyncio.run(scenario())
+    assert not second.is_leader
@@ -0,0 +1,41 @@
+import json
+from datetime import date
+
+import pytest
+
+from rag_backend import forces_store
+from rag_backend.config import settings
+
+
+@pytest.fixture
+def store_files(tmp_path, monkeypatch):
+    """forces_store pointe vers des fichiers temporaires (sans journal d'outbox)."""
+    monkeypatch.setattr(forces_store, "DB_PARTIES_FILE", str(tmp_path / "parties.json"))
+    monkeypatch.setattr(forces_store, "DB_SW_FILE", str(tmp_path / "strengths_weaknesses.json"))
+    monkeypatch.setattr(forces_store, "DB_MEDIA_FILE", str(tmp_path / "media_files.json"))
+    monkeypatch.setattr(forces_store, "_loaded", False)
+    monkeypatch.setattr(settings, "FORCES_OUTBOX_ENABLED", False)
+    return tmp_path
+
+
+def test_mutation_reloads_other_worker_writes(store_files):
+    """
+    Une mutation relit sans délai les fichiers réécrits par un autre worker : elle n'écrase pas
+    son ajout ; le rechargement remplace les dictionnaires au lieu de vider ceux en cours de lecture.
+    """
+    party = forces_store.create_party("RHDP", "Parti")
+    before = forces_store.political_parties_db
+
+    # Écriture d'un autre worker, dans l'intervalle de RELOAD_CHECK_INTERVAL
+    with open(forces_store.DB_PARTIES_FILE, "r") as f:
+        parties = json.load(f)
+    parties["autre"] = {**parties[party.id], "id": "autre", "nom": "PDCI"}
+    with open(forces_store.DB_PARTIES_FILE, "w") as f:
+        json.dump(parties, f)
+
+    forces_store.add_strength_weakness(party.id, "force", "mobilisation", date(2024, 1, 1))
+    forces_store.create_party("PPA-CI", "Parti")
+    with open(forces_store.DB_PARTIES_FILE, "r") as f:
+        assert {p["nom"] for p in json.load(f).values()} == {"RHDP", "PDCI", "PPA-CI"}
+    assert list(before) == [party.id]
+    assert forces_store.political_parties_db is not before
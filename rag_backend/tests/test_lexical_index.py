@@ -0,0 +1,37 @@
+from rag_backend.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_folds_case_and_accents():
+    """
+    Vérifie la normalisation des termes (minuscules, accents, mots vides).
+    """
+    assert tokenize("Le RHDP et l'Élection présidentielle") == ["rhdp", "election", "presidentielle"]
+
+
+def test_bm25_ranks_exact_matches_and_stays_in_sync():
+    """
+    Vérifie le classement BM25, le filtrage par métadonnées et la mise à jour incrémentale.
+    """
+    index = BM25Index()
+    index.add("a", "PARTI: RHDP\n\nCONTENU: mobilisation des militants", {"doc_type": "forces"})
+    index.add("b", "TITRE: Loi électorale\n\nCONTENU: article 48 de la constitution", {"doc_type": "edls"})
+    index.add("c", "CONTENU: réunion des militants du PDCI", {"doc_type": "forces"})
+
+    assert index.search("RHDP")[0][0] == "a"
+    assert [doc_id for doc_id, _ in index.search("militants", where={"doc_type": "forces"})] != []
+    assert index.search("article 48", where={"doc_type": "forces"}) == []
+
+    index.add("a", "PARTI: PDCI\n\nCONTENU: autre contenu", {"doc_type": "forces"})
+    assert index.search("RHDP") == []
+    index.remove("c")
+    assert "c" not in index
+    assert [doc_id for doc_id, _ in index.search("PDCI")] == ["a"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """
+    Un document bien classé dans les deux listes passe devant ceux présents dans une seule.
+    """
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert fused[0][0] == "y"
+    assert {doc_id for doc_id, _ in fused} == {"x", "y", "z", "w"}
@@ -20,9 +20,57 @@ def test_read_openapi_json():
     assert response.status_code == 200
     assert "application/json" in response.headers["content-type"]
 
+def test_health_is_served_before_model_load():
+    """
+    La sonde de liveness répond sans attendre le chargement du modèle.
+    """
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+def test_ready_reports_cold_engine():
+    """
+    La sonde de readiness renvoie 503 tant que le modèle n'est pas chargé.
+    """
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] in ("cold", "warming", "error")
+
+def test_metrics_exposes_route_latency():
+    """
+    /metrics renvoie le format texte Prometheus, avec la latence des requêtes par gabarit de route.
+    """
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "# TYPE rag_stage_duration_seconds histogram" in response.text
+
 # Vous pouvez ajouter ici un test simple pour un endpoint public si vous en avez un,
 # par exemple un endpoint racine ("/") qui retourne un message de bienvenue.
 # def test_read_root():
 #     response = client.get("/")
 #     assert response.status_code == 200
 #     assert response.json() == {"message": "Welcome to RAG API"} # Adaptez selon votre API
+
+def test_index_all_slot_is_taken_by_the_running_task(monkeypatch):
+    """
+    Le créneau de ré-indexation n'est pris que par la tâche en cours d'exécution : une tâche jamais
+    lancée ne bloque pas les demandes suivantes ; pendant une indexation, la route répond 503.
+    """
+    from fastapi import BackgroundTasks
+    from rag_backend import main
+    from rag_backend.config import settings
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    # Tâche planifiée mais jamais exécutée (ex: client déconnecté avant l'envoi de la réponse)
+    monkeypatch.setattr(BackgroundTasks, "add_task", lambda self, func, *args, **kwargs: None)
+    assert client.post("/index-all-edls").status_code == 200
+    assert not main._indexer_lock.locked()
+    assert client.post("/index-all-forces").status_code == 200
+
+    with main._indexer_lock:
+        assert client.post("/index-all-edls").status_code == 503
+        main.run_indexer("--forces")  # ignorée, sans libérer le verrou de l'indexation en cours
+        assert main._indexer_lock.locked()
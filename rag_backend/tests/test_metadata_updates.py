@@ -0,0 +1,91 @@
+import numpy as np
+
+from rag_backend.rag_engine import RAGEngine
+from rag_backend.vector_store import NumpyVectorStore
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 16] += 1
+        return vectors
+
+
+def _engine():
+    engine = RAGEngine(store=NumpyVectorStore())
+    engine._model = CountingModel()
+    engine._embedding_cache = False
+    return engine
+
+
+def test_edls_status_change_updates_metadata_only():
+    """
+    Ré-indexer un EDLS dont seuls le statut et la classification ont changé ne ré-encode ni ne
+    réécrit ses passages : seules leurs métadonnées sont mises à jour.
+    """
+    engine = _engine()
+    item = {"id": "1", "title": "Loi électorale", "content": "Article 48 de la constitution. " * 60,
+            "status": "new", "classification": "public"}
+    first = engine.add_edls_document(item)
+    assert not first["metadata_only"] and engine._model.encoded == first["chunks"] > 1
+
+    second = engine.add_edls_document({**item, "status": "done", "classification": "confidentiel"})
+    assert second["metadata_only"] and second["encoded"] == 0
+    assert engine._model.encoded == first["chunks"]
+    metadatas = engine.store.get(where={"parent_id": "edls_1"}, include=["metadatas"])["metadatas"]
+    assert {m["status"] for m in metadatas} == {"done"}
+
+    third = engine.add_edls_document({**item, "content": item["content"] + " Nouvelle phrase."})
+    assert not third["metadata_only"]
+
+
+def test_upsert_keeps_embeddings_and_party_rename_reencodes():
+    """
+    upsert_documents ne ré-encode pas un texte inchangé ; le renommage d'un parti réécrit la ligne
+    PARTI et party_name de ses documents et ré-encode leurs textes, sans toucher aux autres partis.
+    """
+    engine = _engine()
+    items = [{"id": "a", "party_id": "p1", "type": "force", "contenu": "mobilisation des militants"},
+             {"id": "b", "party_id": "p1", "type": "faiblesse", "contenu": "divisions internes"},
+             {"id": "c", "party_id": "p2", "type": "force", "contenu": "implantation rurale"}]
+    documents = [engine.forces_document(item, "RHDP" if item["party_id"] == "p1" else "PDCI") for item in items]
+    engine.upsert_documents(*map(list, zip(*documents)))
+    engine.upsert_documents(*map(list, zip(*documents)))
+    assert engine._model.encoded == 3
+
+    assert engine.rename_party_documents("p1", "RHDP-Nouveau", batch_size=1) == 2
+    assert engine.rename_party_documents("p1", "RHDP-Nouveau") == 0
+    assert engine._model.encoded == 5
+    after = engine.store.get(include=["documents", "metadatas", "embeddings"])
+    renamed = {doc_id: (doc, m, v) for doc_id, doc, m, v in zip(after["ids"], after["documents"],
+                                                                   after["metadatas"], after["embeddings"])}
+    assert renamed["forces_a"][0].startswith("PARTI: RHDP-Nouveau\n\nTYPE: force")
+    assert renamed["forces_b"][1]["party_name"] == "RHDP-Nouveau"
+    assert renamed["forces_c"][1]["party_name"] == "PDCI"
+    # Les vecteurs correspondent aux textes renommés : un upsert identique ne ré-encode rien
+    expected = engine.model.encode([renamed["forces_a"][0]])[0]
+    assert np.allclose(renamed["forces_a"][2], expected / np.linalg.norm(expected))
+    engine._model.encoded = 0
+    engine.upsert_documents(["forces_a"], [renamed["forces_a"][0]], [renamed["forces_a"][1]])
+    assert engine._model.encoded == 0
+    assert [doc_id for doc_id, _ in engine.lexical.search("nouveau", 5)] in (["forces_a", "forces_b"], ["forces_b", "forces_a"])
+
+
+def test_add_document_ignores_existing_id():
+    """
+    Comme le stockage vectoriel, add_document ignore un id déjà indexé : l'index lexical garde
+    le texte des vecteurs, et rien n'est ré-encodé.
+    """
+    engine = _engine()
+    engine.add_document("doc_1", "mobilisation des militants")
+    engine.add_document("doc_1", "divisions internes")
+    assert engine._model.encoded == 1
+    assert engine.store.get(ids=["doc_1"], include=["documents"])["documents"] == ["mobilisation des militants"]
+    assert engine.lexical.search("divisions", 5) == []
+    assert [doc_id for doc_id, _ in engine.lexical.search("militants", 5)] == ["doc_1"]
@@ -0,0 +1,30 @@
+import httpx
+
+from rag_backend import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Les buckets d'un histogramme sont cumulés et se terminent par +Inf, suivis de _sum et _count.
+    """
+    histogram = metrics.Histogram("test_latency_seconds", "Test", ("stage",), buckets=(0.1, 1.0), register=False)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="encode")
+    lines = list(histogram.render())
+    assert 'test_latency_seconds_bucket{stage="encode",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="encode",le="1"} 3' in lines
+    assert 'test_latency_seconds_bucket{stage="encode",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_sum{stage="encode"} 4.05' in lines
+    assert 'test_latency_seconds_count{stage="encode"} 4' in lines
+
+
+def test_llm_outcome_categories():
+    """
+    Les erreurs des appels LLM sont regroupées par catégorie (timeout, classe de code HTTP).
+    """
+    request = httpx.Request("POST", "https://llm.invalid")
+    status_error = httpx.HTTPStatusError("boom", request=request, response=httpx.Response(429, request=request))
+    assert metrics.llm_outcome(None) == "ok"
+    assert metrics.llm_outcome(httpx.ReadTimeout("lent", request=request)) == "timeout"
+    assert metrics.llm_outcome(status_error) == "http_4xx"
+    assert metrics.llm_outcome(KeyError("choices")) == "error"
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from rag_backend import forces_store, profiling
+from rag_backend.config import settings
+from rag_backend.main import app
+from rag_backend.security import create_access_token
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sample_stacks_reports_busy_threads_in_collapsed_format():
+    """
+    Le profil par échantillonnage contient la pile du thread actif, racine (nom du thread) en tête.
+    """
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        stacks = profiling.sample_stacks(0.2, interval_s=0.005)
+    finally:
+        stop.set()
+        worker.join()
+    busy = [stack for stack in stacks if stack.startswith("busy-worker;")]
+    assert busy and any(f"{__name__}:_busy_loop" in stack for stack in busy)
+    line = profiling.format_collapsed(stacks).splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_line_timing_is_installed_only_during_the_window(tmp_path, monkeypatch):
+    """
+    Le chronométrage par ligne des sauvegardes du store n'est actif que dans le bloc instrument().
+    """
+    monkeypatch.setattr(forces_store, "DB_PARTIES_FILE", str(tmp_path / "parties.json"))
+    monkeypatch.setattr(forces_store, "DB_SW_FILE", str(tmp_path / "strengths_weaknesses.json"))
+    monkeypatch.setattr(forces_store, "DB_MEDIA_FILE", str(tmp_path / "media_files.json"))
+    monkeypatch.setattr(forces_store, "_loaded", False)
+    original = forces_store._save_parties
+    with profiling.instrument(["forces_store_save"]) as timer:
+        assert forces_store._save_parties is not original
+        forces_store.create_party("Parti profilé", "Description")
+    assert forces_store._save_parties is original
+    report = {entry["function"]: entry for entry in timer.report()}
+    assert "_save_parties" in report
+    assert all(line["hits"] >= 1 for line in report["_save_parties"]["lines"])
+
+
+def test_admin_profile_requires_admin(monkeypatch):
+    """
+    /admin/profile est réservé aux utilisateurs listés dans ADMIN_USERNAMES.
+    """
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'johndoe'})}"}
+    assert client.get("/admin/profile", params={"seconds": 0.05}).status_code == 401
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES_STR", None)
+    assert client.get("/admin/profile", params={"seconds": 0.05}, headers=headers).status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES_STR", "johndoe")
+    response = client.get("/admin/profile", params={"seconds": 0.05}, headers=headers)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert client.get("/admin/profile", params={"seconds": 3600}, headers=headers).status_code == 400
@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+from fastapi import Depends, FastAPI, Request
+
+from rag_backend import rate_limit
+from rag_backend.config import settings
+from rag_backend.security import create_access_token
+
+
+def test_memory_bucket_refills_over_time(monkeypatch):
+    """
+    Le seau accepte jusqu'à sa capacité, refuse ensuite avec le délai de recharge, puis se recharge.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    store = rate_limit.MemoryBucketStore()
+    take = lambda cost: asyncio.run(store.take("ip:1.2.3.4", cost, 10, 2.0))
+    assert take(6) == (True, 0.0)
+    assert take(4) == (True, 0.0)
+    allowed, retry_after = take(3)
+    assert not allowed and retry_after == 1.5
+    now[0] += 1.5
+    assert take(3) == (True, 0.0)
+
+
+def test_rate_limit_returns_429_per_client(monkeypatch):
+    """
+    Au-delà du seau d'un client, la route répond 429 avec Retry-After ; les autres clients ne sont pas touchés.
+    """
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CAPACITY", 4.0)
+    monkeypatch.setattr(settings, "RATE_LIMIT_REFILL_PER_S", 0.5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_COSTS_STR", "answer=2")
+    monkeypatch.setattr(rate_limit, "_store", rate_limit.MemoryBucketStore())
+    # Requêtes relayées par un reverse proxy de confiance (adresse du client de test d'httpx)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CLIENT_IP_HEADER", "X-Real-IP")
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES_STR", "127.0.0.0/8")
+    app = FastAPI()
+
+    @app.post("/answer", dependencies=[Depends(rate_limit.rate_limit("answer"))])
+    async def answer():
+        return {"status": "ok"}
+
+    token = create_access_token({"sub": "johndoe"})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            anonymous = [await client.post("/answer", headers={"X-Real-IP": "10.0.0.1"}) for _ in range(3)]
+            other_ip = await client.post("/answer", headers={"X-Real-IP": "10.0.0.2"})
+            user = await client.post("/answer", headers={"X-Real-IP": "10.0.0.1", "Authorization": f"Bearer {token}"})
+            return anonymous, other_ip, user
+
+    anonymous, other_ip, user = asyncio.run(scenario())
+    assert [r.status_code for r in anonymous] == [200, 200, 429]
+    assert anonymous[2].headers["Retry-After"] == "4"
+    assert other_ip.status_code == 200 and user.status_code == 200
+    assert rate_limit.rate_limit_decisions.value(route="answer", result="limited") >= 1
+
+
+def test_client_ip_header_ignored_from_untrusted_peer(monkeypatch):
+    """
+    L'en-tête d'IP n'est lu que pour les connexions d'un proxy de confiance : sinon un client
+    pourrait obtenir un nouveau seau à chaque requête en le changeant.
+    """
+    monkeypatch.setattr(settings, "RATE_LIMIT_CLIENT_IP_HEADER", "X-Real-IP")
+
+    def key(peer, forwarded):
+        scope = {"type": "http", "client": (peer, 1234), "headers": [(b"x-real-ip", forwarded.encode())]}
+        return asyncio.run(rate_limit.client_key(Request(scope)))
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES_STR", None)
+    assert key("203.0.113.5", "10.0.0.1") == "ip:203.0.113.5"
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES_STR", "127.0.0.1, 10.1.0.0/16")
+    assert key("127.0.0.1", "10.0.0.1, 127.0.0.1") == "ip:10.0.0.1"
+    assert key("10.1.2.3", "10.0.0.2") == "ip:10.0.0.2"
+    assert key("203.0.113.5", "10.0.0.1") == "ip:203.0.113.5"
@@ -0,0 +1,34 @@
+import time
+
+from rag_backend.reranker import CrossEncoderReranker
+
+
+class _FakeCrossEncoder:
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+        self.batches = []
+
+    def predict(self, pairs, batch_size=8):
+        time.sleep(self.delay_s)
+        self.batches.append(len(pairs))
+        return [float(len(passage)) for _, passage in pairs]
+
+
+def test_reranker_scores_in_batches():
+    """
+    Les paires sont scorées par lots de taille `batch_size`.
+    """
+    reranker = CrossEncoderReranker(model_name="fake", batch_size=2)
+    reranker._model = _FakeCrossEncoder()
+    assert reranker.score("q", ["a", "bbb", "cc"], budget_ms=1000) == [1.0, 3.0, 2.0]
+    assert reranker._model.batches == [2, 1]
+
+
+def test_reranker_gives_up_when_budget_exceeded():
+    """
+    Au-delà du budget, aucun score n'est renvoyé et les lots restants ne sont pas lancés.
+    """
+    reranker = CrossEncoderReranker(model_name="fake", batch_size=1)
+    reranker._model = _FakeCrossEncoder(delay_s=0.02)
+    assert reranker.score("q", ["a", "b", "c", "d"], budget_ms=30) is None
+    assert len(reranker._model.batches) < 4
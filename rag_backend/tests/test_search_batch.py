@@ -0,0 +1,158 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from rag_backend.rag_engine import RAGEngine
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def _fake_candidates(query, n_results, filters, mode, rerank, rerank_candidates, query_emb, encode_ms,
+                     exclude_ids=None):
+    assert query_emb is not None
+    if mode == "lexical":
+        raise RuntimeError("index lexical indisponible")
+    hits = {f"{query}_{i}": {"document": f"résultat pour {query} {i}", "id": f"{query}_{i}", "distance": 0.1 * i,
+                             "metadata": {"party": (filters or {}).get("party")}} for i in range(n_results)}
+    return list(hits), hits, {"encode": encode_ms}
+
+
+def test_search_batch_encodes_once_and_isolates_errors(monkeypatch):
+    """
+    Les requêtes distinctes du lot sont encodées en un seul appel ; les résultats suivent l'ordre
+    des recherches et l'échec de l'une n'affecte pas les autres.
+    """
+    engine = RAGEngine.__new__(RAGEngine)
+    engine._model = CountingModel()
+    monkeypatch.setattr(engine, "_retrieve_candidates", _fake_candidates, raising=False)
+    searches = [
+        {"query": "RHDP", "n_results": 2, "filters": {"party": "RHDP"}},
+        {"query": "PDCI", "n_results": 1, "mode": "lexical"},
+        {"query": "RHDP", "n_results": 1, "fields": ["ids", "documents"]},
+    ]
+    results = asyncio.run(engine.asearch_batch(searches))
+
+    assert engine._model.calls == [["RHDP", "PDCI"]]
+    assert results[0]["ids"] == ["RHDP_0", "RHDP_1"]
+    assert results[0]["metadatas"][0] == {"party": "RHDP"}
+    assert "index lexical indisponible" in results[1]["error"]
+    assert results[2] == {"ids": ["RHDP_0"], "documents": ["résultat pour RHDP 0"],
+                          "timings": results[2]["timings"]}
+
+
+def test_async_rerank_runs_on_model_executor(monkeypatch):
+    """
+    Dans asearch et aanswer_question, le reclassement par cross-encoder s'exécute sur l'exécuteur
+    du modèle, et non sur celui du stockage.
+    """
+    engine = RAGEngine.__new__(RAGEngine)
+    engine._model = CountingModel()
+    threads = []
+
+    def fake_rerank(query, ranked_ids, hits):
+        threads.append(threading.current_thread().name)
+        return list(reversed(ranked_ids))
+
+    monkeypatch.setattr(engine, "_retrieve_candidates", _fake_candidates, raising=False)
+    monkeypatch.setattr(engine, "_rerank", fake_rerank, raising=False)
+    response = asyncio.run(engine.asearch("RHDP", n_results=2, rerank=True, fields=["ids"]))
+    answer = asyncio.run(engine.aanswer_question("RHDP", n_results_for_context=2, rerank=True))
+
+    assert response["ids"] == ["RHDP_1", "RHDP_0"] and response["reranked"] is True
+    assert answer["retrieved_context_ids"] == ["RHDP_1", "RHDP_0"]
+    assert "rerank" in response["timings"]
+    assert len(threads) == 2 and all(name.startswith("encode") for name in threads)
+
+
+class FlakyModel(CountingModel):
+    """Échoue sur les lots de plusieurs requêtes, ou sur toute requête contenant "panne"."""
+
+    def encode(self, texts):
+        self.calls.append((threading.current_thread().name, list(texts)))
+        if len(texts) > 1 or "panne" in texts[0]:
+            raise RuntimeError("modèle indisponible")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_search_batch_falls_back_to_per_query_encoding(monkeypatch):
+    """
+    Si l'encodage du lot échoue, chaque recherche encode sa requête sur l'exécuteur du modèle
+    (jamais sur celui du stockage) ; une requête impossible à encoder a sa propre erreur.
+    """
+    engine = RAGEngine.__new__(RAGEngine)
+    engine._model = FlakyModel()
+    monkeypatch.setattr(engine, "_retrieve_candidates", _fake_candidates, raising=False)
+    results = asyncio.run(engine.asearch_batch([{"query": "RHDP", "n_results": 1},
+                                                {"query": "panne", "n_results": 1}]))
+
+    assert results[0]["ids"] == ["RHDP_0"]
+    assert "modèle indisponible" in results[1]["error"]
+    assert all(name.startswith("encode") for name, _ in engine._model.calls)
+    assert sorted(texts[0] for _, texts in engine._model.calls[1:]) == ["RHDP", "panne"]
+
+
+def test_rerank_candidates_are_bounded(monkeypatch):
+    """
+    rerank_candidates est refusé au-delà de RERANK_MAX_CANDIDATES par l'API, et plafonné par le
+    moteur pour les autres appelants.
+    """
+    import pytest
+    from pydantic import ValidationError
+
+    from rag_backend.config import settings
+    from rag_backend.main import QuestionRequest, SearchRequest
+    from rag_backend.vector_store import NumpyVectorStore
+
+    with pytest.raises(ValidationError):
+        SearchRequest(query="RHDP", rerank_candidates=100000)
+    with pytest.raises(ValidationError):
+        QuestionRequest(question="RHDP", rerank_candidates=0)
+
+    monkeypatch.setattr(settings, "RERANK_MAX_CANDIDATES", 5)
+    engine = RAGEngine(store=NumpyVectorStore())
+    engine._model = CountingModel()
+    engine.store.add(ids=[str(i) for i in range(30)], embeddings=np.random.default_rng(0).random((30, 4)),
+                     documents=["texte"] * 30)
+    ranked_ids, _, _ = engine._retrieve_candidates("RHDP", 2, None, rerank=True, rerank_candidates=100000,
+                                                   query_emb=np.ones(4, dtype=np.float32))
+    assert len(ranked_ids) == 5
+
+
+def test_result_counts_are_bounded():
+    """
+    n_results (multiplié par le nombre de recherches de /search/batch) et n_results_for_context
+    sont bornés à 1..50, comme pour les routes similar.
+    """
+    import pytest
+    from pydantic import ValidationError
+
+    from rag_backend.main import QuestionRequest, SearchRequest
+
+    for invalid in (0, 51):
+        with pytest.raises(ValidationError):
+            SearchRequest(query="RHDP", n_results=invalid)
+        with pytest.raises(ValidationError):
+            QuestionRequest(question="RHDP", n_results_for_context=invalid)
+
+
+def test_unknown_fields_are_not_echoed_in_errors(monkeypatch):
+    """Les champs inconnus produisent une erreur projetée sur les champs connus, jamais sur les noms reçus."""
+    from rag_backend.rag_engine import SEARCH_FIELDS
+
+    engine = RAGEngine.__new__(RAGEngine)
+    engine._model = CountingModel()
+    monkeypatch.setattr(engine, "_retrieve_candidates", _fake_candidates, raising=False)
+    results = asyncio.run(engine.asearch_batch([{"query": "RHDP", "fields": ["ids", "<script>"]}]))
+    sync = engine.search("RHDP", fields=["ids", "<script>"], query_emb=np.ones(4, dtype=np.float32))
+
+    for response in (results[0], sync):
+        assert "Champs inconnus" in response["error"]
+        assert set(response) == set(SEARCH_FIELDS) | {"error"}
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+from rag_backend import security
+from rag_backend.main import app
+
+
+def test_validated_token_is_cached_until_expiry(monkeypatch):
+    """
+    Un token déjà validé n'est plus décodé ; l'entrée du cache ne survit pas à l'expiration du token.
+    """
+    security.clear_token_cache()
+    decoded = []
+    real_decode = security.jwt.decode
+    monkeypatch.setattr(security.jwt, "decode", lambda *a, **kw: decoded.append(1) or real_decode(*a, **kw))
+    token = security.create_access_token({"sub": "johndoe"}, expires_delta=timedelta(seconds=30))
+
+    first = asyncio.run(security.get_current_user(token))
+    second = asyncio.run(security.get_current_user(token))
+    assert first.username == second.username == "johndoe"
+    assert not hasattr(first, "hashed_password")
+    assert len(decoded) == 1
+
+    _, valid_until = security._token_cache[security._token_digest(token)]
+    assert valid_until <= time.time() + 30
+    monkeypatch.setattr(security.time, "time", lambda: valid_until + 1)
+    assert security._cached_user(security._token_digest(token)) is None
+
+
+def test_token_cache_is_bounded(monkeypatch):
+    """
+    Le cache ne dépasse pas TOKEN_CACHE_SIZE entrées (les plus anciennes sont évincées).
+    """
+    security.clear_token_cache()
+    monkeypatch.setattr(security.settings, "TOKEN_CACHE_SIZE", 2)
+    user = security.User(username="johndoe")
+    for digest in ("a", "b", "c"):
+        security._cache_user(digest, user, None)
+    assert list(security._token_cache) == ["b", "c"]
+
+
+def test_login_verifies_password_off_the_event_loop():
+    """
+    /token vérifie le mot de passe (bcrypt sur le pool dédié) et renvoie un token utilisable.
+    """
+    client = TestClient(app)
+    rejected = client.post("/token", data={"username": "johndoe", "password": "mauvais"})
+    assert rejected.status_code == 401
+    response = client.post("/token", data={"username": "johndoe", "password": "secretpassword"})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    me = client.get("/users/me/", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200 and me.json()["username"] == "johndoe"
@@ -0,0 +1,80 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from rag_backend.main import app, get_rag
+from rag_backend.rag_engine import RAGEngine
+from rag_backend.vector_store import NumpyVectorStore
+
+
+class IndexingOnlyModel:
+    """Encode à l'indexation ; tout appel après `freeze()` fait échouer le test."""
+
+    def __init__(self):
+        self.frozen = False
+
+    def freeze(self):
+        self.frozen = True
+
+    def encode(self, texts):
+        assert not self.frozen, "similar ne doit pas appeler le modèle"
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, sum(map(ord, word)) % 16] += 1
+        return vectors
+
+
+def _engine():
+    engine = RAGEngine(store=NumpyVectorStore())
+    engine._model = IndexingOnlyModel()
+    engine._embedding_cache = False
+    contents = {"a": "mobilisation des militants dans les quartiers",
+                "b": "mobilisation des militants en zone rurale",
+                "c": "divisions internes du bureau politique"}
+    for sw_id, contenu in contents.items():
+        engine.add_forces_faiblesses_document({"id": sw_id, "party_id": "p1", "type": "force", "contenu": contenu}, "RHDP")
+    engine.add_edls_document({"id": "1", "title": "Loi électorale", "content": "Article 48 de la constitution. " * 60})
+    engine.add_document("doc_1", "Article 48 de la constitution révisée", {"doc_type": "standard"})
+    engine._model.freeze()
+    return engine
+
+
+def test_similar_uses_stored_vectors_and_excludes_reference():
+    """
+    similar réutilise le vecteur indexé (moyenne des passages pour un document découpé),
+    exclut le document de référence et applique les filtres habituels ; les extraits ne sont
+    pas centrés sur le texte du document de référence.
+    """
+    engine = _engine()
+    results = engine.similar("forces_a", n_results=2)
+    assert results["ids"][0] == "forces_b"
+    assert "forces_a" not in results["ids"]
+    assert results["timings"]["encode"] == 0.0
+
+    edls = engine.similar("edls_1", n_results=3)
+    assert edls["ids"][0] == "doc_1"
+    assert "edls_1" not in edls["ids"]
+    assert engine.similar("edls_1", n_results=3, filters={"document_type": "forces"})["ids"][0].startswith("forces_")
+    assert engine.similar("forces_inconnu") is None
+    # Sans texte de requête, les extraits commencent au début du passage retenu
+    snippet = engine.similar("doc_1", n_results=1, fields=["ids", "snippets"], snippet_length=40)["snippets"][0]
+    assert snippet.startswith("TITRE: Loi électorale") and snippet.endswith("…")
+
+
+def test_similar_endpoints():
+    """
+    Les routes similar renvoient 404 pour un élément non indexé et acceptent filtres et champs en paramètres.
+    """
+    engine = _engine()
+    app.dependency_overrides[get_rag] = lambda: engine
+    try:
+        client = TestClient(app)
+        response = client.get("/forces-faiblesses/a/similar",
+                              params={"n_results": 1, "document_type": "forces", "fields": ["ids", "snippets"]})
+        assert response.status_code == 200
+        assert response.json()["ids"] == ["forces_b"]
+        assert set(response.json()) == {"ids", "snippets", "timings"}
+        assert client.get("/edls/1/similar").status_code == 200
+        assert client.get("/edls/inconnu/similar").status_code == 404
+    finally:
+        app.dependency_overrides.pop(get_rag, None)
@@ -0,0 +1,47 @@
+from rag_backend.rag_engine import RAGEngine
+from rag_backend.snippets import ELLIPSIS, make_snippet
+
+EDLS_TEXT = (
+    "TITRE: Rapport hebdomadaire. "
+    + "Les réunions de quartier se sont tenues sans incident notable. " * 8
+    + "Le RHDP a mobilisé ses militants à Bouaké pour la campagne de proximité. "
+    + "La situation reste calme dans les autres régions du pays. " * 8
+)
+
+
+def test_snippet_is_centred_on_query_terms():
+    """
+    L'extrait contient la phrase qui porte les termes de la requête, commence sur un début de phrase
+    et signale les coupures par des points de suspension.
+    """
+    snippet = make_snippet(EDLS_TEXT, "mobilisation RHDP Bouaké", length=160)
+    assert "Le RHDP a mobilisé ses militants à Bouaké" in snippet
+    assert snippet.startswith(ELLIPSIS + "Le RHDP")
+    assert snippet.endswith(ELLIPSIS)
+    assert len(snippet) <= 160 + 2 * len(ELLIPSIS)
+
+
+def test_snippet_of_short_text_or_without_match():
+    """
+    Un texte plus court que l'extrait est renvoyé tel quel ; sans terme commun, l'extrait est le début du texte.
+    """
+    assert make_snippet("Texte court.", "RHDP", length=100) == "Texte court."
+    snippet = make_snippet(EDLS_TEXT, "agriculture", length=80)
+    assert snippet.startswith("TITRE: Rapport") and snippet.endswith(ELLIPSIS)
+
+
+def test_search_returns_selected_fields(monkeypatch):
+    """
+    Par défaut, search renvoie des extraits sans le texte complet ; `fields` choisit les champs renvoyés.
+    """
+    engine = RAGEngine.__new__(RAGEngine)
+    hits = [{"document": EDLS_TEXT, "id": "edls_1", "distance": 0.2, "metadata": {"doc_type": "edls"}}]
+    monkeypatch.setattr(engine, "_retrieve", lambda *args, **kwargs: (hits, {"encode": 1.0}, None), raising=False)
+
+    default = engine.search("RHDP Bouaké", n_results=1)
+    assert set(default) == {"ids", "distances", "metadatas", "snippets", "timings"}
+    assert "Bouaké" in default["snippets"][0] and len(default["snippets"][0]) < len(EDLS_TEXT)
+
+    projected = engine.search("RHDP Bouaké", n_results=1, fields=["ids", "documents"])
+    assert projected["ids"] == ["edls_1"] and projected["documents"] == [EDLS_TEXT]
+    assert "snippets" not in projected and "metadatas" not in projected
@@ -0,0 +1,144 @@
+import sys
+from datetime import date
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from rag_backend import forces_outbox, forces_store, themes
+from rag_backend.config import settings
+from rag_backend.rag_engine import RAGEngine
+from rag_backend.vector_store import NumpyVectorStore
+
+TOPICS = {"militants": 0, "jeunesse": 1, "corruption": 2}
+
+
+class TopicModel:
+    """Un axe par thème (mot-clé présent dans le texte) plus un léger bruit déterministe."""
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), 8), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word, axis in TOPICS.items():
+                if word in text:
+                    vectors[row, axis] = 1.0
+            vectors[row, 3 + len(text) % 5] = 0.1
+        return vectors
+
+
+@pytest.fixture
+def indexed(tmp_path, monkeypatch):
+    """Un parti et ses éléments, dans un forces_store temporaire, indexés dans un index NumPy."""
+    monkeypatch.setattr(forces_store, "DB_PARTIES_FILE", str(tmp_path / "parties.json"))
+    monkeypatch.setattr(forces_store, "DB_SW_FILE", str(tmp_path / "strengths_weaknesses.json"))
+    monkeypatch.setattr(forces_store, "DB_MEDIA_FILE", str(tmp_path / "media_files.json"))
+    monkeypatch.setattr(forces_store, "_loaded", False)
+    monkeypatch.setattr(forces_outbox, "OUTBOX_DIR", str(tmp_path / "outbox"))
+    monkeypatch.setattr(themes, "THEMES_FILE", str(tmp_path / "themes.json"))
+    monkeypatch.setattr(settings, "FORCES_OUTBOX_FSYNC", False)
+    engine = RAGEngine(store=NumpyVectorStore())
+    engine._model = TopicModel()
+    engine._embedding_cache = False
+    party = forces_store.create_party("RHDP", "Parti")
+    contents = ["mobilisation des militants", "formation des militants", "militants de quartier",
+                "emploi de la jeunesse", "jeunesse et sport", "vote de la jeunesse",
+                "affaires de corruption", "corruption locale"]
+    items = [forces_store.add_strength_weakness(party.id, "force" if i % 2 else "faiblesse", contenu, date(2024, 1, 1))
+             for i, contenu in enumerate(contents)]
+    documents = [engine.forces_document(item.model_dump(), party.nom) for item in items]
+    engine.upsert_documents(*map(list, zip(*documents)))
+    return engine, party, items
+
+
+def test_compute_party_themes_groups_items_and_labels(indexed):
+    """
+    Le calcul complet regroupe les éléments proches (3 thèmes pour 8 éléments) et nomme chaque
+    thème par ses termes distinctifs, sans le nom du parti ni les intitulés communs.
+    """
+    engine, party, items = indexed
+    entry = themes.compute_party_themes(engine.store, party.id, n_clusters=3)
+    assignments = entry["assignments"]
+    assert len({assignments[item.id] for item in items[:3]}) == 1
+    assert len({assignments[item.id] for item in items[3:6]}) == 1
+    assert len({assignments[item.id] for item in items[:3] + items[3:6] + items[6:]}) == 3
+    labels = {theme["id"]: theme["terms"] for theme in entry["themes"]}
+    assert "militants" in labels[assignments[items[0].id]]
+    assert all("rhdp" not in terms and "parti" not in terms for terms in labels.values())
+
+    result = themes.get_party_themes(party.id)
+    assert [theme["size"] for theme in result["themes"]] == [3, 3, 2]
+    assert sum(result["themes"][0]["types"].values()) == 3
+
+
+def test_update_items_assigns_new_and_removes_deleted(indexed, monkeypatch):
+    """
+    Un élément ajouté est rattaché au thème le plus proche sans recalcul complet ; un élément
+    supprimé est retiré ; au-delà de THEMES_REFIT_RATIO d'ajouts, le parti est recalculé.
+    """
+    engine, party, items = indexed
+    themes.compute_party_themes(engine.store, party.id, n_clusters=3)
+    monkeypatch.setattr(settings, "THEMES_REFIT_RATIO", 0.5)
+    new = forces_store.add_strength_weakness(party.id, "force", "corruption des élus", date(2024, 2, 1))
+    engine.upsert_documents(*map(list, zip(engine.forces_document(new.model_dump(), party.nom))))
+    themes.update_items(engine.store, upserted=[new.id], deleted=[items[0].id])
+
+    entry = themes._load()[party.id]
+    assert entry["pending_items"] == 1
+    assert entry["assignments"][new.id] == entry["assignments"][items[6].id]
+    assert items[0].id not in entry["assignments"]
+    corruption = entry["themes"][entry["assignments"][new.id]]
+    assert corruption["size"] == 3
+
+    monkeypatch.setattr(settings, "THEMES_REFIT_RATIO", 0.0)
+    themes.update_items(engine.store, upserted=[items[1].id])
+    assert themes._load()[party.id]["pending_items"] == 0
+
+
+def test_update_items_counts_small_party_without_fetching_vectors(indexed, monkeypatch):
+    """
+    Pour un parti sous THEMES_MIN_ITEMS, la vérification du recalcul ne compte que les ids : ni
+    textes ni vecteurs du parti ne sont relus, et aucun thème n'est calculé.
+    """
+    engine, party, items = indexed
+    monkeypatch.setattr(settings, "THEMES_MIN_ITEMS", 100)
+    calls = []
+    get = engine.store.get
+    monkeypatch.setattr(engine.store, "get", lambda **kwargs: calls.append(kwargs) or get(**kwargs))
+    themes.update_items(engine.store, upserted=[items[0].id])
+
+    assert [call["include"] for call in calls if call.get("where")] == [[]]
+    assert party.id not in themes._load()
+
+
+def test_themes_disabled_without_sklearn(indexed, monkeypatch, capsys):
+    """
+    Sans scikit-learn, les thèmes sont désactivés après un seul message : le consommateur de
+    l'outbox applique ses lots sans tenter de recalcul.
+    """
+    engine, party, items = indexed
+    monkeypatch.setitem(sys.modules, "sklearn.cluster", None)
+    monkeypatch.setattr(themes, "_kmeans_class", None)
+    monkeypatch.setattr(themes, "update_items", lambda *args, **kwargs: pytest.fail("thèmes désactivés"))
+    assert not themes.enabled() and not themes.enabled()
+    assert capsys.readouterr().out.count("scikit-learn") == 1
+
+    forces_outbox.apply_changes(engine, {items[0].id: "upsert"})
+    with pytest.raises(RuntimeError):
+        themes.compute_party_themes(engine.store, party.id)
+
+
+def test_party_themes_endpoint(indexed):
+    """
+    /parties/{id}/themes sert le résultat précalculé ; 404 pour un parti inconnu.
+    """
+    from rag_backend.main import app
+
+    engine, party, _ = indexed
+    client = TestClient(app)
+    assert client.get(f"/parties/{party.id}/themes").json()["themes"] == []
+    themes.compute_party_themes(engine.store, party.id, n_clusters=3)
+    body = client.get(f"/parties/{party.id}/themes").json()
+    assert body["party_id"] == party.id and body["computed_at"]
+    assert [theme["size"] for theme in body["themes"]] == [3, 3, 2]
+    assert "centroid" not in body["themes"][0]
+    assert client.get("/parties/inconnu/themes").status_code == 404
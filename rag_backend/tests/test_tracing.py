@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from rag_backend import tracing
+from rag_backend.concurrency import run_in_executor, store_executor
+from rag_backend.config import settings
+
+
+def _traced_app():
+    app = FastAPI()
+
+    def blocking_stage():
+        with tracing.span("vector_query"):
+            time.sleep(0.01)
+        return tracing.current_request_id()
+
+    @app.get("/traced")
+    async def traced():
+        with tracing.span("encode"):
+            await asyncio.sleep(0.005)
+        return {"request_id": await run_in_executor(store_executor, blocking_stage)}
+
+    app.add_middleware(tracing.TracingMiddleware)
+    return app
+
+
+def _get(app, path, headers=None):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+    return asyncio.run(scenario())
+
+
+def test_request_id_follows_executor_threads_and_server_timing(monkeypatch):
+    """
+    L'identifiant de requête est propagé aux threads des exécuteurs et renvoyé dans X-Request-ID ;
+    avec SERVER_TIMING, chaque span apparaît dans l'en-tête Server-Timing.
+    """
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+    response = _get(_traced_app(), "/traced", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["x-request-id"] == "abc-123"
+    assert response.json() == {"request_id": "abc-123"}
+    names = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert names == ["encode", "vector_query", "total"]
+
+
+def test_invalid_request_id_is_replaced_and_server_timing_is_opt_in(monkeypatch):
+    """
+    Un X-Request-ID reçu invalide est remplacé par un identifiant généré ; pas de Server-Timing par défaut.
+    """
+    monkeypatch.setattr(settings, "SERVER_TIMING", False)
+    response = _get(_traced_app(), "/traced", headers={"X-Request-ID": "x" * 200})
+    assert len(response.headers["x-request-id"]) == 32
+    assert "server-timing" not in response.headers
+
+
+def test_log_payload_is_sampled_and_truncated(monkeypatch, caplog):
+    """
+    Les corps volumineux ne sont journalisés que pour une fraction des appels, et tronqués.
+    """
+    target = logging.getLogger("test_tracing.payload")
+    monkeypatch.setattr(settings, "PAYLOAD_LOG_MAX_CHARS", 20)
+    monkeypatch.setattr(settings, "PAYLOAD_LOG_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.INFO, logger=target.name):
+        tracing.log_payload(target, "Corps", {"prompt": "a" * 1000})
+        assert not caplog.records
+        monkeypatch.setattr(settings, "PAYLOAD_LOG_SAMPLE_RATE", 1.0)
+        tracing.log_payload(target, "Corps", {"prompt": "a" * 1000})
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().endswith("... (1014 caractères)")
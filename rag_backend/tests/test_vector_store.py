@@ -0,0 +1,229 @@
+import numpy as np
+
+from rag_backend import migrate_partitions
+from rag_backend.config import settings
+from rag_backend.vector_store import NumpyVectorStore, PartitionedVectorStore, create_vector_store, match_where
+
+
+def _vec(*values):
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_match_where_operators():
+    """
+    Vérifie le sous-ensemble de la syntaxe `where` de ChromaDB.
+    """
+    metadata = {"doc_type": "edls", "status": "new", "score": 3}
+    assert match_where(metadata, None)
+    assert match_where(metadata, {"doc_type": "edls"})
+    assert not match_where(metadata, {"doc_type": "forces"})
+    assert match_where(metadata, {"$and": [{"doc_type": "edls"}, {"score": {"$gte": 3}}]})
+    assert match_where(metadata, {"$or": [{"doc_type": "forces"}, {"status": {"$in": ["new", "done"]}}]})
+    assert not match_where(metadata, {"score": {"$lt": 3}})
+
+
+def test_numpy_store_query_and_filters():
+    """
+    Vérifie l'ordre par distance cosinus et le filtrage par métadonnées.
+    """
+    store = NumpyVectorStore()
+    store.add(
+        ids=["a", "b", "c"],
+        embeddings=[_vec(1, 0), _vec(0.8, 0.6), _vec(0, 1)],
+        documents=["doc a", "doc b", "doc c"],
+        metadatas=[{"doc_type": "edls"}, {"doc_type": "forces"}, {"doc_type": "edls"}],
+    )
+    results = store.query(query_embeddings=[_vec(1, 0)], n_results=2)
+    assert results["ids"][0] == ["a", "b"]
+    assert results["documents"][0] == ["doc a", "doc b"]
+    assert abs(results["distances"][0][0]) < 1e-6
+
+    filtered = store.query(query_embeddings=[_vec(1, 0)], n_results=5, where={"doc_type": "edls"})
+    assert filtered["ids"][0] == ["a", "c"]
+
+
+def test_numpy_store_delete_update_and_persist(tmp_path):
+    """
+    Vérifie la suppression, la mise à jour des métadonnées et le rechargement depuis le disque.
+    """
+    store = NumpyVectorStore(persist_dir=str(tmp_path))
+    store.add(ids=["a", "b", "c"], embeddings=[_vec(1, 0), _vec(0, 1), _vec(1, 1)],
+              documents=["a", "b", "c"], metadatas=[{"k": 1}, {"k": 2}, {"k": 3}])
+    store.delete(ids=["a"])
+    store.update(ids=["b"], metadatas=[{"status": "done"}])
+    assert store.count() == 2
+
+    reloaded = NumpyVectorStore(persist_dir=str(tmp_path))
+    assert reloaded.count() == 2
+    got = reloaded.get(ids=["b"])
+    assert got["metadatas"] == [{"k": 2, "status": "done"}]
+    assert reloaded.query(query_embeddings=[_vec(0, 1)], n_results=1)["ids"][0] == ["b"]
+
+
+def test_quantized_store_matches_exact_search(tmp_path):
+    """
+    Vérifie que les index float16 et int8 (avec rescoring) retrouvent les mêmes voisins que la recherche exacte.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 32)).astype(np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+    exact = NumpyVectorStore()
+    exact.add(ids=ids, embeddings=vectors)
+    for quantization in ("float16", "int8"):
+        store = NumpyVectorStore(persist_dir=str(tmp_path / quantization), quantization=quantization,
+                                 rescore_candidates=20)
+        store.add(ids=ids, embeddings=vectors)
+        store.delete(ids=["0"])
+        exact_ids = exact.query(query_embeddings=[vectors[5]], n_results=6)["ids"][0]
+        expected = [doc_id for doc_id in exact_ids if doc_id != "0"][:5]
+        assert store.query(query_embeddings=[vectors[5]], n_results=5)["ids"][0] == expected
+        assert store.memory_usage()["scan_bytes"] < 199 * 32 * 4
+
+
+def test_quantized_store_appends_without_loading_full_matrix(tmp_path):
+    """
+    Un index quantifié rechargé depuis le disque garde sa matrice float32 mappée : les ajouts vont
+    dans un tampon séparé (lectures, rescoring et suppressions compris), réuni au fichier par persist().
+    """
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((100, 16)).astype(np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    NumpyVectorStore(persist_dir=str(tmp_path), quantization="int8").add(ids=ids[:90], embeddings=vectors[:90])
+
+    store = NumpyVectorStore(persist_dir=str(tmp_path), auto_persist=False, quantization="int8",
+                             rescore_candidates=10)
+    store.add(ids=ids[90:], embeddings=vectors[90:])
+    assert isinstance(store._matrix, np.memmap) and store._matrix.shape[0] == 90
+    assert store.memory_usage()["full_precision_bytes"] == store._tail.nbytes < 90 * 16 * 4
+    assert store.query(query_embeddings=[vectors[95]], n_results=1)["ids"][0] == ["95"]
+    # La dernière ligne (dans le tampon) prend la place d'une ligne de la matrice mappée
+    store.delete(ids=["3"])
+    stored = store.get(ids=["99", "42"], include=["embeddings"])
+    assert np.allclose(stored["embeddings"], normalized[[99, 42]], atol=1e-6)
+    store.persist()
+
+    reloaded = NumpyVectorStore(persist_dir=str(tmp_path), quantization="int8", rescore_candidates=10)
+    assert reloaded.count() == 99
+    assert np.allclose(reloaded.get(ids=["99"], include=["embeddings"])["embeddings"], normalized[[99]],
+                       atol=1e-6)
+    assert reloaded.query(query_embeddings=[vectors[97]], n_results=1)["ids"][0] == ["97"]
+
+
+def test_mmap_store_reloads_writes_from_other_process(tmp_path):
+    """
+    Vérifie que deux instances (deux workers) sur le même répertoire voient les écritures de l'autre.
+    """
+    writer = NumpyVectorStore(persist_dir=str(tmp_path), mmap=True, reload_interval=0.01)
+    writer.add(ids=["a"], embeddings=[_vec(1, 0)], documents=["a"])
+    reader = NumpyVectorStore(persist_dir=str(tmp_path), mmap=True, reload_interval=0.01)
+    assert isinstance(reader._matrix, np.memmap)
+
+    writer.add(ids=["b"], embeddings=[_vec(0, 1)], documents=["b"])
+    reader._last_reload_check = 0.0
+    assert reader.query(query_embeddings=[_vec(0, 1)], n_results=1)["ids"][0] == ["b"]
+
+    # Une écriture du lecteur ne doit pas effacer celles de l'autre instance
+    writer.add(ids=["c"], embeddings=[_vec(1, 1)], documents=["c"])
+    reader.delete(ids=["a"])
+    assert sorted(NumpyVectorStore(persist_dir=str(tmp_path)).get()["ids"]) == ["b", "c"]
+
+
+def test_auto_persist_appends_to_journal_until_compaction(tmp_path, monkeypatch):
+    """
+    Avec auto_persist, les mutations sont ajoutées au journal sans réécrire vectors.npy ni
+    records.json ; ces fichiers ne sont réécrits qu'à la compaction, qui vide le journal.
+    """
+    monkeypatch.setattr(NumpyVectorStore, "COMPACT_MIN_ROWS", 5)
+    store = NumpyVectorStore(persist_dir=str(tmp_path), mmap=True)
+    store.add(ids=["a", "b"], embeddings=[_vec(1, 0), _vec(0, 1)], documents=["a", "b"])
+    records_mtime = (tmp_path / "records.json").stat().st_mtime_ns
+
+    store.add(ids=["c"], embeddings=[_vec(1, 1)], documents=["c"])
+    store.update(ids=["b"], documents=["b2"], metadatas=[{"k": 1}])
+    store.delete(ids=["a"])
+    assert (tmp_path / "records.json").stat().st_mtime_ns == records_mtime
+    assert len((tmp_path / "journal.jsonl").read_text(encoding="utf-8").splitlines()) == 3
+
+    reloaded = NumpyVectorStore(persist_dir=str(tmp_path), mmap=True)
+    assert sorted(reloaded.get()["ids"]) == ["b", "c"]
+    assert reloaded.get(ids=["b"])["documents"] == ["b2"]
+    assert reloaded.query(query_embeddings=[_vec(1, 1)], n_results=1)["ids"][0] == ["c"]
+
+    store.upsert(ids=["d", "e", "f"], embeddings=[_vec(1, 0)] * 3)
+    assert not (tmp_path / "journal.jsonl").exists()
+    assert sorted(NumpyVectorStore(persist_dir=str(tmp_path)).get()["ids"]) == ["b", "c", "d", "e", "f"]
+
+
+def _partitioned(opened, by_party=False):
+    def open_partition(name):
+        opened.setdefault(name, NumpyVectorStore())
+        return opened[name]
+    return PartitionedVectorStore("docs", open_partition, lambda: list(opened), by_party=by_party)
+
+
+def test_partitioned_store_routes_filtered_queries():
+    """
+    Chaque enregistrement va dans la partition de son doc_type (et de son parti) ; une requête filtrée
+    n'interroge que les partitions concernées, une requête sans filtre fusionne toutes les partitions.
+    """
+    opened = {}
+    store = _partitioned(opened, by_party=True)
+    store.upsert(
+        ids=["e1", "f1", "f2", "s1"],
+        embeddings=[_vec(1, 0), _vec(0.9, 0.1), _vec(0.6, 0.8), _vec(0, 1)],
+        documents=["edls", "force A", "force B", "standard"],
+        metadatas=[{"doc_type": "edls"}, {"doc_type": "forces", "party_id": "A"},
+                   {"doc_type": "forces", "party_id": "B"}, {"doc_type": "standard"}],
+    )
+    assert sorted(opened) == ["docs__edls", "docs__forces__A", "docs__forces__B", "docs__standard"]
+    assert store.count() == 4
+
+    merged = store.query([_vec(1, 0)], n_results=3)
+    assert merged["ids"][0] == ["e1", "f1", "f2"]
+    assert merged["distances"][0] == sorted(merged["distances"][0])
+
+    queried = []
+    for name, partition in opened.items():
+        original = partition.query
+        partition.query = lambda *a, _name=name, _original=original, **k: queried.append(_name) or _original(*a, **k)
+    forces = store.query([_vec(1, 0)], n_results=5, where={"$and": [{"doc_type": "forces"}, {"party_id": "B"}]})
+    assert forces["ids"][0] == ["f2"]
+    assert queried == ["docs__forces__B"]
+
+    # Changement de parti : l'enregistrement quitte son ancienne partition (la seule modifiée)
+    deleted = []
+    for name, partition in opened.items():
+        original = partition.delete
+        partition.delete = lambda *a, _name=name, _original=original, **k: deleted.append(_name) or _original(*a, **k)
+    store.upsert(ids=["f1"], embeddings=[_vec(0.9, 0.1)], documents=["force A"],
+                 metadatas=[{"doc_type": "forces", "party_id": "B"}])
+    assert opened["docs__forces__A"].count() == 0 and opened["docs__forces__B"].count() == 2
+    assert deleted == ["docs__forces__A"]
+    # Même déplacement par une mise à jour des seules métadonnées (vecteur et texte conservés)
+    store.update(ids=["f1"], metadatas=[{"party_id": "A"}])
+    assert opened["docs__forces__A"].get(ids=["f1"], include=["documents"])["documents"] == ["force A"]
+    assert opened["docs__forces__B"].count() == 1
+    assert store.query([_vec(0.9, 0.1)], n_results=1, where={"party_id": "A"})["ids"][0] == ["f1"]
+    assert sorted(store.get(ids=["f1", "s1"])["ids"]) == ["f1", "s1"]
+    store.delete(where={"doc_type": "standard"})
+    assert store.count() == 3
+
+
+def test_migrate_single_collection_to_partitions(tmp_path, monkeypatch):
+    """
+    La migration copie les enregistrements (embeddings compris) dans leurs partitions sans toucher à la source.
+    """
+    monkeypatch.setattr(settings, "VECTOR_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "VECTOR_RELOAD_INTERVAL", 0.0)
+    source = create_vector_store("docs", "numpy", partitioning="none")
+    source.add(ids=["e1", "e2", "f1"], embeddings=[_vec(1, 0), _vec(0.8, 0.6), _vec(0, 1)],
+               documents=["a", "b", "c"], metadatas=[{"doc_type": "edls"}, {"doc_type": "edls"},
+                                                     {"doc_type": "forces", "party_id": "A"}])
+
+    copied = migrate_partitions.migrate("docs", "doc_type", batch_size=2, backend="numpy")
+    assert copied == {"edls": 2, "forces": 1}
+    partitioned = create_vector_store("docs", "numpy", partitioning="doc_type")
+    assert partitioned.count() == 3 and source.count() == 3
+    result = partitioned.query([_vec(1, 0)], n_results=1, where={"doc_type": "edls"}, include=["embeddings"])
+    assert result["ids"][0] == ["e1"] and np.allclose(result["embeddings"][0][0], [1, 0])
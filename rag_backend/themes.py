@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Thèmes des forces/faiblesses de chaque parti, précalculés à partir des embeddings indexés.
+
+Le calcul complet récupère les vecteurs `forces_{id}` d'un parti dans le stockage vectoriel
+(aucun encodage), les regroupe par MiniBatchKMeans (scikit-learn) et enregistre dans
+themes.json, pour chaque thème, son centroïde, ses éléments et un libellé formé des termes
+les plus caractéristiques de ses textes. /parties/{id}/themes sert ce résultat tel quel.
+
+Les éléments ajoutés ou modifiés ensuite (appliqués par le consommateur de forces_outbox.py)
+sont rattachés au centroïde le plus proche, mis à jour en moyenne glissante ; le parti est
+recalculé entièrement quand ces ajouts dépassent THEMES_REFIT_RATIO des éléments du dernier
+calcul, ou dès qu'il atteint THEMES_MIN_ITEMS éléments.
+
+Usage (depuis la racine du projet):
+    python -m rag_backend.themes
+    python -m rag_backend.themes --party <id_du_parti> --clusters 6
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .config import settings
+from .lexical_index import tokenize
+from .vector_store import VectorStore
+
+BASE_DIR = Path(__file__).parent.absolute()
+THEMES_FILE = settings.THEMES_FILE or os.path.join(BASE_DIR, "themes.json")
+
+_lock = threading.RLock()
+# Contenu de themes.json et date de modification correspondante
+_cache: Dict[str, Any] = {"mtime": None, "parties": {}}
+# Classe MiniBatchKMeans importée au premier besoin ; False si scikit-learn n'est pas installé
+_kmeans_class = None
+
+
+def _get_kmeans_class():
+    global _kmeans_class
+    if _kmeans_class is None:
+        try:
+            from sklearn.cluster import MiniBatchKMeans
+        except ImportError as e:
+            print(f"[RAGEngine][ERROR] Thèmes des partis désactivés ({e}) : installer scikit-learn")
+            _kmeans_class = False
+            return _kmeans_class
+        _kmeans_class = MiniBatchKMeans
+    return _kmeans_class
+
+
+def enabled() -> bool:
+    """THEMES_ENABLED et scikit-learn disponible (vérifié une seule fois)."""
+    return settings.THEMES_ENABLED and _get_kmeans_class() is not False
+
+
+def _mtime() -> Optional[int]:
+    try:
+        return os.stat(THEMES_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    """Thèmes de tous les partis, relus si le fichier a été réécrit (ex: par un autre worker)."""
+    with _lock:
+        mtime = _mtime()
+        if mtime != _cache["mtime"]:
+            try:
+                with open(THEMES_FILE, "r", encoding="utf-8") as f:
+                    _cache["parties"] = json.load(f)
+            except FileNotFoundError:
+                _cache["parties"] = {}
+            except json.JSONDecodeError as e:
+                print(f"[RAGEngine][ERROR] themes.json illisible: {e}")
+                _cache["parties"] = {}
+            _cache["mtime"] = mtime
+        return _cache["parties"]
+
+
+def _save(parties: Dict[str, Dict[str, Any]]):
+    temp_file = f"{THEMES_FILE}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(parties, f)
+    os.replace(temp_file, THEMES_FILE)
+    _cache.update(mtime=_mtime(), parties=parties)
+
+
+def _party_where(party_id: str) -> Dict[str, Any]:
+    return {"$and": [{"doc_type": "forces"}, {"party_id": party_id}]}
+
+
+def _party_records(store: VectorStore, party_id: str) -> Dict[str, Any]:
+    return store.get(where=_party_where(party_id), include=["documents", "embeddings"])
+
+
+def _party_count(store: VectorStore, party_id: str) -> int:
+    """Nombre d'éléments indexés d'un parti (ids seulement, sans textes ni vecteurs)."""
+    return len(store.get(where=_party_where(party_id), include=[])["ids"])
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True).clip(min=1e-12)
+
+
+def _sw_id(doc_id: str) -> str:
+    return doc_id[len("forces_"):] if doc_id.startswith("forces_") else doc_id
+
+
+def n_clusters_for(n_items: int) -> int:
+    """Nombre de thèmes pour `n_items` éléments : règle empirique sqrt(n/2), plafonnée."""
+    return max(1, min(settings.THEMES_MAX_CLUSTERS, n_items, round(math.sqrt(n_items / 2))))
+
+
+def label_clusters(documents: List[str], labels: Iterable[int], n_clusters: int,
+                   n_terms: Optional[int] = None) -> List[List[str]]:
+    """
+    Termes caractéristiques de chaque groupe : fréquence dans le groupe pondérée par la rareté
+    dans l'ensemble des documents (les termes présents partout, ex: le nom du parti ou les
+    intitulés PARTI/TYPE/CONTENU, ont un poids nul).
+    """
+    n_terms = n_terms or settings.THEMES_LABEL_TERMS
+    term_sets = [set(tokenize(document or "")) for document in documents]
+    df = Counter(term for terms in term_sets for term in terms)
+    counts = [Counter() for _ in range(n_clusters)]
+    for terms, label in zip(term_sets, labels):
+        counts[label].update(terms)
+    idf = {term: math.log(len(documents) / freq) for term, freq in df.items()}
+    return [[term for term, _ in sorted(((term, tf * idf[term]) for term, tf in cluster.items() if idf[term] > 0),
+                                        key=lambda pair: (-pair[1], pair[0]))[:n_terms]]
+            for cluster in counts]
+
+
+def compute_party_themes(store: VectorStore, party_id: str, n_clusters: Optional[int] = None) -> Dict[str, Any]:
+    """Regroupe les forces/faiblesses indexées d'un parti et enregistre le résultat."""
+    start = time.perf_counter()
+    records = _party_records(store, party_id)
+    entry: Dict[str, Any] = {"computed_at": datetime.now().isoformat(), "fitted_items": len(records["ids"]),
+                             "pending_items": 0, "themes": [], "assignments": {}}
+    if len(records["ids"]) >= settings.THEMES_MIN_ITEMS:
+        MiniBatchKMeans = _get_kmeans_class()
+        if MiniBatchKMeans is False:
+            raise RuntimeError("scikit-learn n'est pas installé : calcul des thèmes impossible")
+        vectors = _normalize(records["embeddings"])
+        k = min(n_clusters or n_clusters_for(len(vectors)), len(vectors))
+        kmeans = MiniBatchKMeans(n_clusters=k, random_state=0, n_init=3,
+                                 batch_size=settings.THEMES_BATCH_SIZE).fit(vectors)
+        labels = kmeans.labels_.tolist()
+        terms = label_clusters(records["documents"], labels, k)
+        sizes = Counter(labels)
+        entry["themes"] = [{"id": theme_id, "label": ", ".join(terms[theme_id]), "terms": terms[theme_id],
+                            "size": sizes[theme_id], "centroid": _normalize(centroid).tolist()}
+                           for theme_id, centroid in enumerate(kmeans.cluster_centers_)]
+        entry["assignments"] = {_sw_id(doc_id): label for doc_id, label in zip(records["ids"], labels)}
+    with _lock:
+        parties = dict(_load())
+        parties[party_id] = entry
+        _save(parties)
+    print(f"[RAGEngine] Thèmes du parti {party_id}: {len(entry['themes'])} thèmes pour "
+          f"{len(records['ids'])} éléments en {(time.perf_counter() - start) * 1000:.0f} ms")
+    return entry
+
+
+def compute_all(store: VectorStore, party_ids: Optional[List[str]] = None,
+                n_clusters: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Calcul complet pour les partis donnés (par défaut : tous ceux de forces_store)."""
+    if party_ids is None:
+        from .forces_store import list_parties
+
+        party_ids = [party.id for party in list_parties()]
+    return {party_id: compute_party_themes(store, party_id, n_clusters) for party_id in party_ids}
+
+
+def update_items(store: VectorStore, upserted: Iterable[str] = (), deleted: Iterable[str] = ()):
+    """
+    Mise à jour incrémentale après l'indexation ou la suppression d'éléments (ids forces_store) :
+    rattachement au thème le plus proche et déplacement de son centroïde, retrait des éléments
+    supprimés, recalcul complet des partis qui ont trop changé depuis le dernier calcul.
+    """
+    upserted, deleted = list(upserted), set(deleted)
+    records = store.get(ids=[f"forces_{sw_id}" for sw_id in upserted], include=["metadatas", "embeddings"]) \
+        if upserted else {"ids": [], "metadatas": [], "embeddings": []}
+    refit = set()
+    with _lock:
+        parties = {party_id: dict(entry) for party_id, entry in _load().items()}
+        present = {_sw_id(doc_id) for doc_id in records["ids"]}
+        # Éléments supprimés, ou ré-indexés (éventuellement sous un autre parti) : retirés de leur thème
+        for party_id, entry in parties.items():
+            leaving = [sw_id for sw_id in entry["assignments"] if sw_id in deleted or sw_id in present]
+            if not leaving:
+                continue
+            entry["assignments"] = dict(entry["assignments"])
+            entry["themes"] = [dict(theme) for theme in entry["themes"]]
+            for sw_id in leaving:
+                theme = entry["themes"][entry["assignments"].pop(sw_id)]
+                theme["size"] = max(0, theme["size"] - 1)
+        for doc_id, metadata, embedding in zip(records["ids"], records["metadatas"], records["embeddings"]):
+            party_id = (metadata or {}).get("party_id")
+            entry = parties.get(party_id)
+            if not entry or not entry["themes"]:
+                # Parti sans thèmes (trop peu d'éléments jusqu'ici) : calcul complet s'il en a assez
+                if party_id:
+                    refit.add(party_id)
+                continue
+            entry["pending_items"] = entry.get("pending_items", 0) + 1
+            vector = _normalize(embedding)
+            centroids = np.asarray([theme["centroid"] for theme in entry["themes"]], dtype=np.float32)
+            theme_id = int(np.argmax(centroids @ vector))
+            entry["themes"] = [dict(theme) for theme in entry["themes"]]
+            theme = entry["themes"][theme_id]
+            theme["size"] += 1
+            # Moyenne glissante (k-means en ligne), renormalisée
+            centroid = centroids[theme_id] + (vector - centroids[theme_id]) / theme["size"]
+            theme["centroid"] = _normalize(centroid).tolist()
+            entry["assignments"] = {**entry["assignments"], _sw_id(doc_id): theme_id}
+            if entry["pending_items"] > settings.THEMES_REFIT_RATIO * max(entry["fitted_items"], 1):
+                refit.add(party_id)
+        # Partis dont tous les éléments ont été supprimés
+        for party_id in [p for p, entry in parties.items() if entry["themes"] and not entry["assignments"]]:
+            del parties[party_id]
+        _save(parties)
+    for party_id in refit:
+        if _party_count(store, party_id) >= settings.THEMES_MIN_ITEMS:
+            compute_party_themes(store, party_id)
+
+
+def get_party_themes(party_id: str) -> Dict[str, Any]:
+    """Thèmes précalculés d'un parti (sans les centroïdes), avec les éléments et leur répartition par type."""
+    from .forces_store import get_strength_weakness
+
+    entry = _load().get(party_id) or {"computed_at": None, "pending_items": 0, "themes": [], "assignments": {}}
+    members: Dict[int, List[str]] = {}
+    for sw_id, theme_id in entry["assignments"].items():
+        members.setdefault(theme_id, []).append(sw_id)
+    themes = []
+    for theme in entry["themes"]:
+        items = [item for item in map(get_strength_weakness, members.get(theme["id"], [])) if item is not None]
+        if not items:
+            continue
+        themes.append({"id": theme["id"], "label": theme["label"], "terms": theme["terms"], "size": len(items),
+                       "item_ids": [item.id for item in items],
+                       "types": dict(Counter(item.type.value for item in items))})
+    themes.sort(key=lambda theme: -theme["size"])
+    return {"party_id": party_id, "computed_at": entry["computed_at"], "pending_items": entry.get("pending_items", 0),
+            "themes": themes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcul des thèmes des forces/faiblesses par parti")
+    parser.add_argument("--party", action="append", help="Parti à traiter (répétable ; par défaut: tous)")
+    parser.add_argument("--clusters", type=int, default=None,
+                        help="Nombre de thèmes par parti (par défaut: sqrt(n/2), au plus THEMES_MAX_CLUSTERS)")
+    args = parser.parse_args()
+
+    from .vector_store import create_vector_store
+
+    results = compute_all(create_vector_store("docs"), args.party, args.clusters)
+    for party_id, entry in results.items():
+        print(f"  {party_id}: {entry['fitted_items']} éléments")
+        for theme in sorted(entry["themes"], key=lambda theme: -theme["size"]):
+            print(f"    [{theme['size']:>4}] {theme['label']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Traçage des requêtes : identifiant de requête, spans par étape et export.
+
+- TracingMiddleware attribue à chaque requête un identifiant (en-tête X-Request-ID reçu ou
+  généré), renvoyé dans la réponse et ajouté à chaque ligne de log émise pendant la requête.
+- span(name) mesure une étape (encodage, requête vectorielle, appel LLM...) et l'ajoute à la
+  trace de la requête en cours. Le contexte suit les appels délégués aux pools de threads
+  (concurrency.run_in_executor copie le contexte).
+- En fin de requête, la trace est exportée selon settings.TRACE_EXPORTER : "json" (une ligne
+  JSON par requête, via le logger rag_backend.trace), "otlp" (OpenTelemetry vers un collecteur,
+  dépendances optionnelles opentelemetry-sdk et opentelemetry-exporter-otlp-proto-http) ou "none".
+- Avec settings.SERVER_TIMING, la réponse porte un en-tête Server-Timing (durée de chaque étape,
+  visible dans l'onglet réseau du navigateur).
+- log_payload() remplace la journalisation systématique des corps de requête/réponse : seule une
+  fraction des appels est journalisée, tronquée à settings.PAYLOAD_LOG_MAX_CHARS caractères.
+"""
+
+import json
+import logging
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .metrics import route_label
+
+TRACE_EXPORTERS = ("none", "json", "otlp")
+
+logger = logging.getLogger("rag_backend.trace")
+
+# Identifiant reçu du client ou du reverse proxy : accepté s'il reste court et sans caractère spécial
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class Span:
+    __slots__ = ("name", "start_ms", "duration_ms", "attributes")
+
+    def __init__(self, name: str, start_ms: float, duration_ms: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.start_ms = start_ms
+        self.duration_ms = duration_ms
+        self.attributes = attributes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "start_ms": round(self.start_ms, 3), "duration_ms": round(self.duration_ms, 3),
+                **self.attributes}
+
+
+class Trace:
+    """Spans d'une requête ; `start` (perf_counter) sert d'origine aux décalages des spans."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.wall_start_ns = time.time_ns()
+        self.spans: List[Span] = []
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("rag_trace", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current.get()
+    return trace.request_id if trace is not None else None
+
+
+class span:
+    """
+    Context manager mesurant une étape de la requête en cours. Si `timings` est fourni, la
+    durée (ms) y est aussi enregistrée sous `name` (champ "timings" des réponses de recherche).
+    Hors requête (scripts, indexeur), seul `timings` est renseigné.
+    """
+
+    __slots__ = ("name", "timings", "attributes", "start")
+
+    def __init__(self, name: str, timings: Optional[Dict[str, float]] = None, **attributes):
+        self.name = name
+        self.timings = timings
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        duration_ms = (end - self.start) * 1000
+        if self.timings is not None:
+            self.timings[self.name] = duration_ms
+        trace = _current.get()
+        if trace is not None:
+            if exc_type is not None:
+                self.attributes["error"] = exc_type.__name__
+            # list.append est atomique : les spans peuvent venir de plusieurs threads
+            trace.spans.append(Span(self.name, (self.start - trace.start) * 1000, duration_ms, self.attributes))
+        return False
+
+
+def server_timing_header(trace: Trace, total_ms: float) -> str:
+    entries = [f"{s.name};dur={s.duration_ms:.1f}" for s in trace.spans]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """Middleware ASGI : identifiant de requête, en-tête Server-Timing optionnel et export de la trace."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        received = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        trace = Trace(received if _REQUEST_ID_PATTERN.match(received) else uuid.uuid4().hex)
+        # Aussi dans le scope : le gestionnaire des exceptions non gérées s'exécute hors de ce middleware
+        scope["request_id"] = trace.request_id
+        token = _current.set(trace)
+        status = {"code": 500}
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", trace.request_id.encode("latin-1")))
+                if settings.SERVER_TIMING:
+                    total_ms = (time.perf_counter() - trace.start) * 1000
+                    headers.append((b"server-timing", server_timing_header(trace, total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            export(trace, scope, status["code"], (time.perf_counter() - trace.start) * 1000)
+
+
+def export(trace: Trace, scope, status: int, duration_ms: float):
+    """Exporte la trace d'une requête terminée (les 5xx sont toujours exportées, les autres échantillonnées)."""
+    exporter = settings.TRACE_EXPORTER
+    if exporter == "none" or (status < 500 and random.random() >= settings.TRACE_SAMPLE_RATE):
+        return
+    route = route_label(scope)
+    if exporter == "json":
+        logger.info("request", extra={"trace": {
+            "request_id": trace.request_id, "method": scope["method"], "route": route, "status": status,
+            "duration_ms": round(duration_ms, 3), "spans": [s.to_dict() for s in trace.spans],
+        }})
+    elif exporter == "otlp":
+        _export_otlp(trace, f"{scope['method']} {route}", {
+            "http.method": scope["method"], "http.route": route, "http.status_code": status,
+            "request_id": trace.request_id,
+        }, duration_ms)
+
+
+# --- OpenTelemetry (optionnel) --- #
+
+_otlp_tracer = None
+
+
+def _get_otlp_tracer():
+    """Tracer OpenTelemetry créé au premier export (dans le worker, après un éventuel fork) ; False si indisponible."""
+    global _otlp_tracer
+    if _otlp_tracer is None:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError as e:
+            print(f"[RAGEngine][ERROR] Export OTLP indisponible ({e}) : installer opentelemetry-sdk "
+                  f"et opentelemetry-exporter-otlp-proto-http")
+            _otlp_tracer = False
+            return _otlp_tracer
+        provider = TracerProvider(resource=Resource.create({"service.name": settings.OTLP_SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTLP_ENDPOINT)))
+        _otlp_tracer = provider.get_tracer("rag_backend")
+    return _otlp_tracer
+
+
+def _export_otlp(trace: Trace, name: str, attributes: Dict[str, Any], duration_ms: float):
+    tracer = _get_otlp_tracer()
+    if not tracer:
+        return
+    from opentelemetry.trace import set_span_in_context
+
+    def at(offset_ms: float) -> int:
+        return trace.wall_start_ns + int(offset_ms * 1_000_000)
+
+    root = tracer.start_span(name, start_time=trace.wall_start_ns, attributes=attributes)
+    parent = set_span_in_context(root)
+    for s in trace.spans:
+        child = tracer.start_span(s.name, context=parent, start_time=at(s.start_ms), attributes=s.attributes)
+        child.end(end_time=at(s.start_ms + s.duration_ms))
+    root.end(end_time=at(duration_ms))
+
+
+# --- Logs structurés --- #
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement, avec l'identifiant de la requête en cours."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None) or current_request_id()
+        if request_id:
+            entry["request_id"] = request_id
+        if hasattr(record, "trace"):
+            entry.update(record.trace)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging():
+    """Logs JSON sur stderr pour les loggers rag_backend.* (sans effet s'ils sont déjà configurés)."""
+    if settings.TRACE_EXPORTER not in TRACE_EXPORTERS:
+        raise ValueError(f"Export de traces inconnu: {settings.TRACE_EXPORTER} (attendu: {', '.join(TRACE_EXPORTERS)})")
+    root = logging.getLogger("rag_backend")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.propagate = False
+
+
+def log_payload(target: logging.Logger, label: str, payload: Any):
+    """Journalise (INFO) une fraction des corps volumineux, tronqués : rien n'est sérialisé sinon."""
+    if settings.PAYLOAD_LOG_SAMPLE_RATE <= 0 or random.random() >= settings.PAYLOAD_LOG_SAMPLE_RATE:
+        return
+    if not target.isEnabledFor(logging.INFO):
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    if len(text) > settings.PAYLOAD_LOG_MAX_CHARS:
+        text = f"{text[:settings.PAYLOAD_LOG_MAX_CHARS]}... ({len(text)} caractères)"
+    target.info(f"{label}: {text}")
@@ -0,0 +1,1063 @@
+"""
+Abstraction du stockage vectoriel pour le moteur RAG.
+
+Deux implémentations partagent la même interface, calquée sur celle d'une
+collection ChromaDB (add / upsert / query / get / update / delete / count) :
+
+- ChromaVectorStore : client HTTP ChromaDB (comportement historique)
+- NumpyVectorStore  : index en mémoire dans le processus (matrice NumPy,
+  cosinus exact par un seul produit matriciel), persisté sur disque
+
+Le backend est choisi via `settings.VECTOR_BACKEND` ("chroma" ou "numpy").
+
+Avec `settings.VECTOR_PARTITIONING`, PartitionedVectorStore répartit les enregistrements
+en une collection par doc_type (et par parti pour les forces/faiblesses) : une recherche
+filtrée sur le type n'explore que la collection de ce type (voir migrate_partitions.py).
+"""
+
+import base64
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+from .config import settings
+from .quantization import approximate_scores, bytes_per_vector, check_mode, code_dtype, quantize_rows
+
+BASE_DIR = Path(__file__).parent.absolute()
+
+# Champs renvoyés par défaut par query()/get(), comme ChromaDB
+DEFAULT_QUERY_INCLUDE = ["documents", "metadatas", "distances"]
+DEFAULT_GET_INCLUDE = ["documents", "metadatas"]
+
+
+# --- Filtrage des métadonnées (sous-ensemble de la syntaxe `where` de ChromaDB) --- #
+
+def _match_condition(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = value == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            try:
+                if op == "$gt":
+                    ok = value > operand
+                elif op == "$gte":
+                    ok = value >= operand
+                elif op == "$lt":
+                    ok = value < operand
+                else:
+                    ok = value <= operand
+            except TypeError:
+                return False
+        else:
+            raise ValueError(f"Opérateur de filtre non supporté: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def match_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Évalue un filtre `where` au format ChromaDB sur un dictionnaire de métadonnées.
+    Supporte l'égalité simple, $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and et $or.
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, sub) for sub in condition):
+                return False
+        elif not _match_condition(metadata.get(key), condition):
+            return False
+    return True
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorStore:
+    """Interface commune des backends de stockage vectoriel."""
+
+    # Écriture sur disque après chaque mutation (backends locaux uniquement)
+    auto_persist: bool = False
+
+    def add(self, ids: List[str], embeddings: Sequence[Sequence[float]],
+            documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], embeddings: Sequence[Sequence[float]],
+               documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        raise NotImplementedError
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def update(self, ids: List[str], embeddings: Optional[Sequence[Sequence[float]]] = None,
+               documents: Optional[List[str]] = None, metadatas: Optional[List[Dict[str, Any]]] = None):
+        raise NotImplementedError
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def persist(self):
+        """Force l'écriture sur disque (sans effet pour les backends distants)."""
+
+
+@lru_cache(maxsize=1)
+def _chroma_client():
+    """Client HTTP ChromaDB, partagé par les collections (partitions) du processus."""
+    import chromadb
+    from chromadb.config import Settings as ChromaClientSettings  # Renommé pour éviter conflit avec nos Settings
+
+    # Configuration du client ChromaDB via l'objet settings
+    client_settings_chroma = ChromaClientSettings(anonymized_telemetry=False)
+    if settings.CHROMA_SSL_ENABLED:
+        client_settings_chroma.chroma_server_ssl_verify = settings.CHROMA_SSL_VERIFY
+        # Note: Le port par défaut pour HTTPS est souvent différent (ex: 443),
+        # assurez-vous que CHROMA_PORT est correct pour votre configuration SSL.
+
+    return chromadb.HttpClient(
+        host=settings.CHROMA_HOST,
+        port=settings.CHROMA_PORT,
+        ssl=settings.CHROMA_SSL_ENABLED,
+        settings=client_settings_chroma
+    )
+
+
+class ChromaVectorStore(VectorStore):
+    """Backend ChromaDB via HttpClient (serveur distant ou local)."""
+
+    def __init__(self, collection_name: str = "docs"):
+        self.client = _chroma_client()
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    @staticmethod
+    def _as_lists(embeddings):
+        if embeddings is None:
+            return None
+        return [np.asarray(e, dtype=np.float32).tolist() for e in embeddings]
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self.collection.add(ids=ids, embeddings=self._as_lists(embeddings), documents=documents, metadatas=metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        self.collection.upsert(ids=ids, embeddings=self._as_lists(embeddings), documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        return self.collection.query(
+            query_embeddings=self._as_lists(query_embeddings),
+            n_results=n_results,
+            where=where or None,
+            include=DEFAULT_QUERY_INCLUDE if include is None else include
+        )
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        return self.collection.get(ids=ids, where=where or None, include=DEFAULT_GET_INCLUDE if include is None else include, limit=limit)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        self.collection.update(ids=ids, embeddings=self._as_lists(embeddings), documents=documents, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where or None)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Index vectoriel en mémoire : une matrice (n, d) de vecteurs normalisés,
+    recherche exacte par similarité cosinus en un seul produit matriciel.
+
+    Les données sont persistées dans `persist_dir` :
+    - vectors.npy   : la matrice des embeddings
+    - records.json  : ids, documents et métadonnées (même ordre que la matrice)
+    - journal.jsonl : mutations postérieures à ces deux fichiers, rejouées au chargement
+
+    Avec `auto_persist=True`, chaque mutation est écrite immédiatement sur disque, par un
+    ajout au journal (coût proportionnel à la mutation, pas à la taille de l'index). Les
+    deux fichiers ne sont réécrits en entier (compaction) que lorsque le journal dépasse
+    `COMPACT_RATIO` de l'index. Pour une indexation en masse, désactiver `auto_persist` puis
+    appeler `persist()` à la fin.
+
+    Avec `quantization` ("float16" ou "int8"), le scan se fait sur une copie compacte
+    des vecteurs (2 à 4 fois moins de mémoire). La matrice float32 est alors ouverte en
+    mémoire mappée depuis vectors.npy : seules les pages des `rescore_candidates`
+    meilleurs candidats, rescorés en pleine précision, sont lues. Les lignes ajoutées
+    ensuite vont dans un tampon float32 séparé, réuni à la matrice par persist().
+
+    Avec `mmap=True`, la matrice float32 est toujours ouverte en mémoire mappée : plusieurs
+    workers (processus) qui ouvrent le même `persist_dir` partagent alors les mêmes pages
+    du cache disque au lieu d'avoir chacun leur copie. Avec `reload_interval > 0`, les
+    lectures vérifient (au plus une fois par intervalle) si un autre processus a réécrit
+    l'index, et le rechargent le cas échéant.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+    JOURNAL_FILE = "journal.jsonl"
+    # Compaction dès que le journal contient plus de lignes que max(COMPACT_MIN_ROWS, COMPACT_RATIO * taille)
+    COMPACT_MIN_ROWS = 1000
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, persist_dir: Optional[str] = None, auto_persist: bool = True,
+                 quantization: str = "none", rescore_candidates: int = 0,
+                 mmap: bool = False, reload_interval: float = 0.0):
+        self.persist_dir = persist_dir
+        self.auto_persist = auto_persist
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self.quantization = check_mode(quantization)
+        self.rescore_candidates = max(0, rescore_candidates)
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        # Lignes ajoutées après celles d'une matrice mappée (non extensible), jusqu'au prochain persist
+        self._tail: Optional[np.ndarray] = None
+        # Représentation compacte utilisée pour le scan (None si quantization == "none")
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        # Cache des lignes correspondant à un filtre `where`, invalidé à chaque mutation
+        self._mask_cache: Dict[str, np.ndarray] = {}
+        # Date de modification de records.json au dernier chargement/sauvegarde
+        self._records_mtime: Optional[int] = None
+        self._last_reload_check = 0.0
+        # Octets du journal déjà rejoués ou écrits, et nombre de lignes (ids) qu'il contient
+        self._journal_offset = 0
+        self._journal_rows = 0
+        # Mutations en mémoire pas encore écrites sur disque (auto_persist=False)
+        self._dirty = False
+        if persist_dir:
+            self._load()
+
+    # --- Persistance --- #
+
+    def _load(self):
+        vectors_path = os.path.join(self.persist_dir, self.VECTORS_FILE)
+        records_path = os.path.join(self.persist_dir, self.RECORDS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            return False
+        try:
+            # Date relevée avant la lecture : une réécriture concurrente sera détectée au prochain contrôle
+            records_mtime = os.stat(records_path).st_mtime_ns
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            matrix = self._open_matrix(vectors_path)
+        except (json.JSONDecodeError, ValueError, OSError) as e:
+            print(f"[NumpyVectorStore][ERROR] Chargement impossible depuis {self.persist_dir}: {e}")
+            return False
+        if matrix.shape[0] != len(records.get("ids", [])):
+            # Fichiers lus entre les deux remplacements d'une sauvegarde concurrente
+            return False
+        self._ids = list(records.get("ids", []))
+        self._documents = list(records.get("documents", []))
+        self._metadatas = list(records.get("metadatas", []))
+        self._matrix = matrix
+        self._tail = None
+        self._size = len(self._ids)
+        self._dim = self._matrix.shape[1] if self._size else None
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._codes = self._scales = None
+        if self.quantized:
+            self._codes, self._scales = quantize_rows(self._matrix[:self._size], self.quantization)
+        self._mask_cache.clear()
+        self._records_mtime = records_mtime
+        self._journal_offset = self._journal_rows = 0
+        self._replay_journal()
+        return True
+
+    def _journal_path(self) -> str:
+        return os.path.join(self.persist_dir, self.JOURNAL_FILE)
+
+    def _replay_journal(self):
+        """Applique les mutations du journal écrites après `_journal_offset` (lignes complètes seulement)."""
+        try:
+            with open(self._journal_path(), "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except OSError:
+            return
+        # Une ligne sans fin est en cours d'écriture par un autre processus : relue au prochain contrôle
+        complete = data[:data.rfind(b"\n") + 1]
+        try:
+            for line in complete.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                embeddings = entry.get("embeddings")
+                if embeddings is not None:
+                    embeddings = np.frombuffer(base64.b64decode(embeddings),
+                                               dtype=np.float32).reshape(len(entry["ids"]), -1)
+                self._apply(entry["op"], entry["ids"], embeddings, entry.get("documents"), entry.get("metadatas"))
+                self._journal_rows += len(entry["ids"])
+        except (ValueError, KeyError) as e:
+            print(f"[NumpyVectorStore][ERROR] Journal illisible dans {self.persist_dir}: {e}")
+        self._journal_offset += len(complete)
+        self._mask_cache.clear()
+
+    def _append_journal(self, op: str, ids, embeddings=None, documents=None, metadatas=None):
+        entry = {"op": op, "ids": list(ids)}
+        if embeddings is not None:
+            vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(entry["ids"]), -1))
+            entry["embeddings"] = base64.b64encode(vectors.tobytes()).decode("ascii")
+        if documents is not None:
+            entry["documents"] = list(documents)
+        if metadatas is not None:
+            entry["metadatas"] = list(metadatas)
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        # Une seule écriture en mode ajout : les lignes de processus concurrents ne s'entremêlent pas
+        with open(self._journal_path(), "ab") as f:
+            f.write(line)
+            self._journal_offset = f.tell()
+        self._journal_rows += len(entry["ids"])
+
+    def _maybe_reload(self, force: bool = False):
+        """
+        Recharge l'index si un autre processus l'a réécrit depuis le dernier chargement.
+        Les lectures ne vérifient qu'une fois par `reload_interval` ; les écritures (`force`)
+        vérifient toujours, pour ne pas écraser sur disque les ajouts d'un autre processus.
+        """
+        if not (self.persist_dir and self.reload_interval > 0) or self._dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        try:
+            mtime = os.stat(os.path.join(self.persist_dir, self.RECORDS_FILE)).st_mtime_ns
+        except OSError:
+            return
+        try:
+            journal_size = os.stat(self._journal_path()).st_size
+        except OSError:
+            journal_size = 0
+        if mtime != self._records_mtime or journal_size < self._journal_offset:
+            # Index réécrit (compaction) par un autre processus
+            self._load()
+        elif journal_size > self._journal_offset:
+            self._replay_journal()
+
+    @property
+    def quantized(self) -> bool:
+        return self.quantization != "none"
+
+    def _open_matrix(self, vectors_path: str) -> np.ndarray:
+        if self.quantized or self.mmap:
+            # Copy-on-write : les pages ne sont lues que si elles sont utilisées (rescoring),
+            # et restent partagées entre processus tant qu'elles ne sont pas modifiées
+            return np.load(vectors_path, mmap_mode="c")
+        return np.ascontiguousarray(np.load(vectors_path), dtype=np.float32)
+
+    def persist(self):
+        if not self.persist_dir:
+            return
+        with self._lock:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            vectors_path = os.path.join(self.persist_dir, self.VECTORS_FILE)
+            records_path = os.path.join(self.persist_dir, self.RECORDS_FILE)
+            # Écriture dans des fichiers temporaires pour éviter la corruption en cas d'erreur
+            temp_vectors = f"{vectors_path}.tmp"
+            temp_records = f"{records_path}.tmp"
+            try:
+                if self._tail is None:
+                    with open(temp_vectors, "wb") as f:
+                        np.save(f, self._matrix[:self._size])
+                else:
+                    # Matrice mappée puis tampon des ajouts, copiés à la suite sans les réunir en mémoire
+                    out = np.lib.format.open_memmap(temp_vectors, mode="w+", dtype=np.float32,
+                                                    shape=(self._size, self._dim))
+                    base = min(self._size, self._matrix.shape[0])
+                    out[:base] = self._matrix[:base]
+                    out[base:] = self._tail[:self._size - base]
+                    out.flush()
+                    del out
+                with open(temp_records, "w", encoding="utf-8") as f:
+                    json.dump({"ids": self._ids, "documents": self._documents, "metadatas": self._metadatas},
+                              f, ensure_ascii=False)
+                os.replace(temp_vectors, vectors_path)
+                os.replace(temp_records, records_path)
+                # Le journal est intégré aux fichiers réécrits
+                if os.path.exists(self._journal_path()):
+                    os.remove(self._journal_path())
+                self._journal_offset = self._journal_rows = 0
+                self._records_mtime = os.stat(records_path).st_mtime_ns
+                self._dirty = False
+                if (self.quantized or self.mmap) and self._size:
+                    self._matrix = self._open_matrix(vectors_path)
+                    self._tail = None
+            except Exception as e:
+                for temp_file in (temp_vectors, temp_records):
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
+                print(f"[NumpyVectorStore][ERROR] Sauvegarde impossible dans {self.persist_dir}: {e}")
+                raise
+
+    def _mutated(self, op: str, ids, embeddings=None, documents=None, metadatas=None):
+        self._mask_cache.clear()
+        if not self.auto_persist:
+            self._dirty = True
+        elif not self.persist_dir or not ids:
+            return
+        elif self._dirty or self._records_mtime is None:
+            # Mutations non journalisées (auto_persist réactivé) ou index jamais écrit
+            self.persist()
+        else:
+            self._append_journal(op, ids, embeddings, documents, metadatas)
+            if self._journal_rows > max(self.COMPACT_MIN_ROWS, self.COMPACT_RATIO * self._size):
+                self.persist()
+
+    # --- Gestion de la matrice --- #
+
+    def _prepare(self, embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+        elif vectors.shape[1] != self._dim:
+            raise ValueError(f"Dimension d'embedding {vectors.shape[1]} incompatible avec l'index ({self._dim})")
+        return _normalize_rows(vectors)
+
+    @staticmethod
+    def _grown(array: Optional[np.ndarray], needed: int, used: int, shape, dtype, fill=0) -> np.ndarray:
+        """`array` agrandi (capacité doublée) pour contenir `needed` lignes, ses `used` premières lignes copiées."""
+        capacity = array.shape[0] if array is not None else 0
+        grown = np.full((max(needed, capacity * 2, 64),) + shape, fill, dtype=dtype)
+        if used:
+            grown[:used] = array[:used]
+        return grown
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if isinstance(self._matrix, np.memmap) and self._matrix.shape[1] == self._dim:
+            # Matrice mappée depuis vectors.npy : les nouvelles lignes vont dans le tampon des
+            # ajouts plutôt que dans une copie float32 complète de l'index en mémoire
+            base = self._matrix.shape[0]
+            tail_rows = self._tail.shape[0] if self._tail is not None else 0
+            if needed - base > tail_rows:
+                self._tail = self._grown(self._tail, needed - base, max(0, min(self._size - base, tail_rows)),
+                                         (self._dim,), np.float32)
+        elif needed > self._matrix.shape[0] or self._matrix.shape[1] != self._dim:
+            self._matrix = self._grown(self._matrix if self._matrix.shape[1] == self._dim else None,
+                                       needed, self._size, (self._dim,), np.float32)
+            self._tail = None
+        if self.quantized and (self._codes is None or needed > self._codes.shape[0]
+                               or self._codes.shape[1] != self._dim):
+            self._codes = self._grown(self._codes, needed, self._size, (self._dim,), code_dtype(self.quantization))
+            if self.quantization == "int8":
+                self._scales = self._grown(self._scales, needed, self._size, (), np.float32, fill=1)
+
+    def _vectors(self, positions) -> np.ndarray:
+        """Vecteurs float32 des lignes `positions` (matrice, puis tampon des ajouts s'il existe)."""
+        if self._tail is None:
+            return self._matrix[positions]
+        positions = np.asarray(positions, dtype=np.int64)
+        base = self._matrix.shape[0]
+        in_base = positions < base
+        vectors = np.empty((len(positions), self._dim), dtype=np.float32)
+        vectors[in_base] = self._matrix[positions[in_base]]
+        vectors[~in_base] = self._tail[positions[~in_base] - base]
+        return vectors
+
+    def _store_vector(self, position: int, vector: np.ndarray):
+        base = self._matrix.shape[0]
+        if self._tail is not None and position >= base:
+            self._tail[position - base] = vector
+        else:
+            self._matrix[position] = vector
+
+    def _set_row(self, position: int, vector: np.ndarray):
+        self._store_vector(position, vector)
+        if self.quantized:
+            codes, scales = quantize_rows(vector.reshape(1, -1), self.quantization)
+            self._codes[position] = codes[0]
+            if scales is not None:
+                self._scales[position] = scales[0]
+
+    def _move_row(self, source: int, target: int):
+        self._store_vector(target, self._vectors([source])[0])
+        if self.quantized:
+            self._codes[target] = self._codes[source]
+            if self._scales is not None:
+                self._scales[target] = self._scales[source]
+
+    def _write(self, ids, embeddings, documents, metadatas, allow_existing: bool):
+        vectors = self._prepare(embeddings)
+        if len(ids) != len(vectors):
+            raise ValueError("ids et embeddings doivent avoir la même longueur")
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [{}] * len(ids)
+        new_count = sum(1 for doc_id in ids if doc_id not in self._positions)
+        self._reserve(new_count)
+        for doc_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+            position = self._positions.get(doc_id)
+            if position is not None:
+                if not allow_existing:
+                    # Même comportement que ChromaDB : les ids existants sont ignorés par add()
+                    continue
+                self._documents[position] = document
+                self._metadatas[position] = dict(metadata or {})
+            else:
+                position = self._size
+                self._positions[doc_id] = position
+                self._ids.append(doc_id)
+                self._documents.append(document)
+                self._metadatas.append(dict(metadata or {}))
+                self._size += 1
+            self._set_row(position, vector)
+
+    def _update(self, ids, embeddings, documents, metadatas):
+        vectors = self._prepare(embeddings) if embeddings is not None else None
+        for i, doc_id in enumerate(ids):
+            position = self._positions.get(doc_id)
+            if position is None:
+                continue
+            if vectors is not None:
+                self._set_row(position, vectors[i])
+            if documents is not None:
+                self._documents[position] = documents[i]
+            if metadatas is not None:
+                # Comme ChromaDB, les métadonnées fournies sont fusionnées avec les existantes
+                self._metadatas[position] = {**self._metadatas[position], **(metadatas[i] or {})}
+
+    def _apply(self, op: str, ids, embeddings=None, documents=None, metadatas=None):
+        """Applique une mutation en mémoire (appels publics et rejeu du journal)."""
+        if op in ("add", "upsert"):
+            self._write(ids, embeddings, documents, metadatas, allow_existing=op == "upsert")
+        elif op == "update":
+            self._update(ids, embeddings, documents, metadatas)
+        elif op == "delete":
+            self._remove(ids)
+        else:
+            raise ValueError(f"Opération de journal inconnue: {op}")
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        with self._lock:
+            self._maybe_reload(force=True)
+            self._apply("add", ids, embeddings, documents, metadatas)
+            self._mutated("add", ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        with self._lock:
+            self._maybe_reload(force=True)
+            self._apply("upsert", ids, embeddings, documents, metadatas)
+            self._mutated("upsert", ids, embeddings, documents, metadatas)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        with self._lock:
+            self._maybe_reload(force=True)
+            self._apply("update", ids, embeddings, documents, metadatas)
+            self._mutated("update", ids, embeddings, documents, metadatas)
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            self._maybe_reload(force=True)
+            if ids is None:
+                targets = [self._ids[i] for i in self._filter_positions(where)]
+            else:
+                targets = [doc_id for doc_id in ids if doc_id in self._positions
+                           and match_where(self._metadatas[self._positions[doc_id]], where)]
+            if targets:
+                self._apply("delete", targets)
+                self._mutated("delete", targets)
+
+    def _remove(self, ids):
+        for doc_id in ids:
+            if doc_id not in self._positions:
+                continue
+            # Suppression en O(1) : la dernière ligne prend la place de la ligne supprimée
+            position = self._positions.pop(doc_id)
+            last = self._size - 1
+            if position != last:
+                last_id = self._ids[last]
+                self._move_row(last, position)
+                self._ids[position] = last_id
+                self._documents[position] = self._documents[last]
+                self._metadatas[position] = self._metadatas[last]
+                self._positions[last_id] = position
+            self._ids.pop()
+            self._documents.pop()
+            self._metadatas.pop()
+            self._size -= 1
+
+    def count(self) -> int:
+        with self._lock:
+            self._maybe_reload()
+            return self._size
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Octets occupés par les vecteurs scannés, et par la copie float32 si elle s'y ajoute en RAM."""
+        dim = self._dim or 0
+        full_precision_bytes = 0
+        if self.quantized:
+            if not isinstance(self._matrix, np.memmap):
+                full_precision_bytes = self._size * dim * 4
+            elif self._tail is not None:
+                full_precision_bytes = self._tail.nbytes
+        return {
+            "scan_bytes": self._size * bytes_per_vector(self.quantization, dim),
+            "full_precision_bytes": full_precision_bytes,
+        }
+
+    # --- Lecture --- #
+
+    def _filter_positions(self, where) -> np.ndarray:
+        if not where:
+            return np.arange(self._size)
+        key = json.dumps(where, sort_keys=True, default=str)
+        positions = self._mask_cache.get(key)
+        metrics.vector_filter_cache_lookups.inc(result="miss" if positions is None else "hit")
+        if positions is None:
+            positions = np.fromiter(
+                (i for i in range(self._size) if match_where(self._metadatas[i], where)),
+                dtype=np.int64
+            )
+            self._mask_cache[key] = positions
+        return positions
+
+    def _scores(self, positions: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Similarités cosinus (len(positions), n_queries), approchées si l'index est quantifié."""
+        full = len(positions) == self._size
+        if not self.quantized:
+            if full and self._tail is None:
+                return self._matrix[:self._size] @ queries.T
+            return self._vectors(positions) @ queries.T
+        codes = self._codes[:self._size] if full else self._codes[positions]
+        scales = None
+        if self._scales is not None:
+            scales = self._scales[:self._size] if full else self._scales[positions]
+        return approximate_scores(codes, scales, queries)
+
+    def _top_k(self, column: np.ndarray, positions: np.ndarray, query: np.ndarray, k: int):
+        """Sélectionne les k meilleures lignes, avec rescoring pleine précision si configuré."""
+        pool = k
+        rescore = self.quantized and self.rescore_candidates > 0
+        if rescore:
+            pool = min(max(k, self.rescore_candidates), len(column))
+        top = np.argpartition(-column, pool - 1)[:pool]
+        top_positions = positions[top]
+        top_scores = column[top]
+        if rescore:
+            # Lecture des lignes dans l'ordre du fichier pour limiter les défauts de page
+            top_positions = np.sort(top_positions)
+            top_scores = np.asarray(self._vectors(top_positions) @ query, dtype=np.float32)
+        order = np.argsort(-top_scores)[:k]
+        return top_positions[order], top_scores[order]
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        include = DEFAULT_QUERY_INCLUDE if include is None else include
+        with self._lock:
+            self._maybe_reload()
+            queries = _normalize_rows(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+            result: Dict[str, Any] = {"ids": [], "documents": None, "metadatas": None,
+                                      "distances": None, "embeddings": None}
+            for field in include:
+                result[field] = []
+            positions = self._filter_positions(where) if self._size else np.zeros(0, dtype=np.int64)
+            scores = self._scores(positions, queries) if len(positions) else None
+            for q in range(len(queries)):
+                if scores is None:
+                    top = np.zeros(0, dtype=np.int64)
+                    top_scores = np.zeros(0, dtype=np.float32)
+                else:
+                    column = scores[:, q]
+                    top, top_scores = self._top_k(column, positions, queries[q], min(n_results, len(column)))
+                result["ids"].append([self._ids[i] for i in top])
+                if "documents" in include:
+                    result["documents"].append([self._documents[i] for i in top])
+                if "metadatas" in include:
+                    result["metadatas"].append([dict(self._metadatas[i]) for i in top])
+                if "distances" in include:
+                    # Distance cosinus, comme ChromaDB avec hnsw:space=cosine
+                    result["distances"].append((1.0 - top_scores).tolist())
+                if "embeddings" in include:
+                    result["embeddings"].append(self._vectors(top).tolist())
+            return result
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        include = DEFAULT_GET_INCLUDE if include is None else include
+        with self._lock:
+            self._maybe_reload()
+            if ids is not None:
+                positions = [self._positions[doc_id] for doc_id in ids
+                             if doc_id in self._positions and match_where(self._metadatas[self._positions[doc_id]], where)]
+            else:
+                positions = self._filter_positions(where).tolist()
+            if limit is not None:
+                positions = positions[:limit]
+            result: Dict[str, Any] = {"ids": [self._ids[i] for i in positions], "documents": None,
+                                      "metadatas": None, "embeddings": None}
+            if "documents" in include:
+                result["documents"] = [self._documents[i] for i in positions]
+            if "metadatas" in include:
+                result["metadatas"] = [dict(self._metadatas[i]) for i in positions]
+            if "embeddings" in include:
+                result["embeddings"] = self._vectors(positions).tolist()
+            return result
+
+
+# --- Partitionnement par type de document --- #
+
+# "none" : une seule collection ; "doc_type" : une collection par type de document ;
+# "doc_type_party" : idem, avec en plus une collection par parti pour les forces/faiblesses
+PARTITIONING_MODES = ("none", "doc_type", "doc_type_party")
+PARTITION_SEPARATOR = "__"
+_PARTITION_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def partition_key(metadata: Optional[Dict[str, Any]], by_party: bool = False) -> str:
+    """Partition d'un enregistrement : son doc_type, suivi du parti pour les forces si `by_party`."""
+    metadata = metadata or {}
+    doc_type = _PARTITION_UNSAFE_RE.sub("-", str(metadata.get("doc_type") or "standard"))
+    party_id = metadata.get("party_id")
+    if by_party and doc_type == "forces" and party_id:
+        return f"{doc_type}{PARTITION_SEPARATOR}{_PARTITION_UNSAFE_RE.sub('-', str(party_id))[:40]}"
+    return doc_type
+
+
+def _allowed_values(where: Optional[Dict[str, Any]], field: str) -> Optional[set]:
+    """
+    Valeurs de `field` auxquelles le filtre restreint les résultats (égalité, $eq, $in, éventuellement
+    sous $and), None s'il ne les restreint pas. Les valeurs renvoyées sont normalisées comme dans partition_key.
+    """
+    if not where:
+        return None
+    allowed = None
+    for key, condition in where.items():
+        if key == "$and":
+            values = [_allowed_values(sub, field) for sub in condition]
+        elif key == field:
+            if not isinstance(condition, dict):
+                values = [{condition}]
+            else:
+                values = [{condition["$eq"]} if "$eq" in condition else set(condition["$in"]) if "$in" in condition
+                          else None]
+        else:
+            continue
+        for value in values:
+            if value is not None:
+                value = {_PARTITION_UNSAFE_RE.sub("-", str(v)) for v in value}
+                allowed = value if allowed is None else allowed & value
+    return allowed
+
+
+def _implied_by_partition(condition: Any) -> bool:
+    # Égalité ou appartenance à des valeurs qui sont elles-mêmes des noms de partition valides
+    if isinstance(condition, dict):
+        if not condition or not set(condition) <= {"$eq", "$in"}:
+            return False
+        values = [condition["$eq"]] if "$eq" in condition else []
+        values += list(condition.get("$in", []))
+    else:
+        values = [condition]
+    return all(isinstance(v, str) and not _PARTITION_UNSAFE_RE.search(v) for v in values)
+
+
+def _without_field(where: Optional[Dict[str, Any]], field: str) -> Optional[Dict[str, Any]]:
+    """
+    Filtre sans les conditions d'égalité ($eq, $in) sur `field`, de premier niveau ou sous $and :
+    elles sont garanties par la partition interrogée (choisie par _allowed_values).
+    """
+    if not where:
+        return None
+    if "$and" in where and len(where) == 1:
+        conditions = [sub for sub in where["$and"]
+                      if not (len(sub) == 1 and field in sub and _implied_by_partition(sub[field]))]
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    remaining = {key: condition for key, condition in where.items()
+                 if not (key == field and _implied_by_partition(condition))}
+    return remaining or None
+
+
+class PartitionedVectorStore(VectorStore):
+    """
+    Stockage réparti en une collection par partition (voir partition_key), nommée
+    "<collection>__<partition>" (ex: docs__edls, docs__forces__<party_id>).
+
+    Les écritures vont dans la partition de chaque enregistrement. Une requête dont le filtre
+    fixe le doc_type (et le parti) n'interroge que les partitions concernées, sans la condition
+    sur le doc_type ; sans filtre, toutes les partitions sont interrogées et les résultats
+    fusionnés par distance. Les lectures et suppressions par ids sont envoyées à toutes les
+    partitions (un id ne se trouve que dans une seule) ; upsert et update cherchent d'abord
+    les partitions qui contiennent les ids, et ne modifient que celles-ci. Un enregistrement
+    dont le doc_type (ou le parti) change, par upsert ou par update, change de partition.
+
+    `open_partition(name)` ouvre ou crée la collection `name` ; `list_existing()` liste les
+    collections existantes. Avec `refresh_interval > 0`, les lectures vérifient (au plus une
+    fois par intervalle) si un autre processus (indexeur) a créé de nouvelles partitions.
+    """
+
+    def __init__(self, collection_name: str, open_partition: Callable[[str], VectorStore],
+                 list_existing: Callable[[], Sequence[str]] = list, by_party: bool = False,
+                 refresh_interval: float = 0.0):
+        self.collection_name = collection_name
+        self.by_party = by_party
+        self.refresh_interval = refresh_interval
+        self._open_partition = open_partition
+        self._list_existing = list_existing
+        self._auto_persist = True
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, VectorStore] = {}
+        self._last_refresh = 0.0
+        self._refresh(force=True)
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and (self.refresh_interval <= 0 or now - self._last_refresh < self.refresh_interval):
+            return
+        self._last_refresh = now
+        prefix = self.collection_name + PARTITION_SEPARATOR
+        for name in self._list_existing():
+            if name.startswith(prefix):
+                self._partition(name[len(prefix):])
+
+    def _all(self) -> List[VectorStore]:
+        self._refresh()
+        return list(self._partitions.values())
+
+    @property
+    def auto_persist(self) -> bool:
+        return self._auto_persist
+
+    @auto_persist.setter
+    def auto_persist(self, value: bool):
+        self._auto_persist = value
+        for store in list(self._partitions.values()):
+            store.auto_persist = value
+
+    @property
+    def partitions(self) -> Dict[str, VectorStore]:
+        return dict(self._partitions)
+
+    def _partition(self, key: str) -> VectorStore:
+        store = self._partitions.get(key)
+        if store is None:
+            with self._lock:
+                store = self._partitions.get(key)
+                if store is None:
+                    store = self._open_partition(f"{self.collection_name}{PARTITION_SEPARATOR}{key}")
+                    store.auto_persist = self._auto_persist
+                    self._partitions[key] = store
+        return store
+
+    def _route(self, where: Optional[Dict[str, Any]]) -> List[VectorStore]:
+        """Partitions pouvant contenir des enregistrements satisfaisant `where`."""
+        self._refresh()
+        doc_types = _allowed_values(where, "doc_type")
+        parties = _allowed_values(where, "party_id") if self.by_party else None
+        selected = []
+        for key, store in list(self._partitions.items()):
+            doc_type, _, party = key.partition(PARTITION_SEPARATOR)
+            if doc_types is not None and doc_type not in doc_types:
+                continue
+            if parties is not None and party and party not in {p[:40] for p in parties}:
+                continue
+            selected.append(store)
+        return selected
+
+    @staticmethod
+    def _partition_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Filtre transmis aux partitions choisies par _route : sans les conditions qu'elles garantissent."""
+        return _without_field(where, "doc_type") if _allowed_values(where, "doc_type") is not None else where
+
+    def _group(self, ids, embeddings, documents, metadatas):
+        embeddings = list(embeddings)
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas if metadatas is not None else [None] * len(ids)):
+            groups.setdefault(partition_key(metadata, self.by_party), []).append(i)
+        for key, rows in groups.items():
+            pick = lambda values: None if values is None else [values[i] for i in rows]
+            yield key, pick(ids), pick(embeddings), pick(documents), pick(metadatas)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        for key, *group in self._group(ids, embeddings, documents, metadatas):
+            self._partition(key).add(*group)
+
+    def _holders(self, ids) -> List[tuple]:
+        """(clé, partition, ids présents) pour chaque partition contenant déjà certains des `ids` (sans lire leur contenu)."""
+        self._refresh()
+        holders = []
+        for key, store in list(self._partitions.items()):
+            present = set(store.get(ids=list(ids), include=[])["ids"])
+            if present:
+                holders.append((key, store, present))
+        return holders
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        holders = self._holders(ids)
+        for key, group_ids, *group in self._group(ids, embeddings, documents, metadatas):
+            target = self._partition(key)
+            target.upsert(group_ids, *group)
+            # Un enregistrement dont le doc_type (ou le parti) a changé quitte son ancienne partition
+            for _, store, present in holders:
+                moved = [doc_id for doc_id in group_ids if doc_id in present]
+                if store is not target and moved:
+                    store.delete(ids=moved)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        embeddings = None if embeddings is None else list(embeddings)
+        for key, store, present in self._holders(ids):
+            rows = [i for i, doc_id in enumerate(ids) if doc_id in present]
+            leaving = []
+            if metadatas is not None:
+                # Les métadonnées sont fusionnées (comme ChromaDB) : si le doc_type ou le parti change,
+                # l'enregistrement est déplacé vers sa nouvelle partition, comme avec upsert
+                current = store.get(ids=[ids[i] for i in rows], include=["metadatas"])
+                stored = dict(zip(current["ids"], current["metadatas"]))
+                leaving = [i for i in rows
+                           if partition_key({**(stored[ids[i]] or {}), **(metadatas[i] or {})}, self.by_party) != key]
+                rows = [i for i in rows if i not in leaving]
+            if rows:
+                pick = lambda values: None if values is None else [values[i] for i in rows]
+                store.update([ids[i] for i in rows], pick(embeddings), pick(documents), pick(metadatas))
+            if leaving:
+                records = store.get(ids=[ids[i] for i in leaving], include=["documents", "metadatas", "embeddings"])
+                found = {doc_id: j for j, doc_id in enumerate(records["ids"])}
+                positions = [found[ids[i]] for i in leaving]
+                self.upsert(
+                    [ids[i] for i in leaving],
+                    [embeddings[i] if embeddings is not None else records["embeddings"][j] for i, j in zip(leaving, positions)],
+                    [documents[i] if documents is not None else records["documents"][j] for i, j in zip(leaving, positions)],
+                    [{**(records["metadatas"][j] or {}), **(metadatas[i] or {})} for i, j in zip(leaving, positions)],
+                )
+
+    def delete(self, ids=None, where=None):
+        for store in (self._all() if ids is not None else self._route(where)):
+            store.delete(ids=ids, where=where)
+
+    def count(self) -> int:
+        return sum(store.count() for store in self._all())
+
+    def persist(self):
+        for store in list(self._partitions.values()):
+            store.persist()
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        include = DEFAULT_QUERY_INCLUDE if include is None else include
+        n_queries = len(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        merged: List[List[tuple]] = [[] for _ in range(n_queries)]
+        fields = [field for field in ("documents", "metadatas", "embeddings") if field in include]
+        stores, partition_where = self._route(where), self._partition_where(where)
+        for store in stores:
+            # Les distances servent à fusionner les partitions, même si l'appelant ne les demande pas
+            partial = store.query(query_embeddings, n_results, partition_where,
+                                  list(dict.fromkeys([*include, "distances"])))
+            for q in range(n_queries):
+                for j, doc_id in enumerate(partial["ids"][q]):
+                    merged[q].append((partial["distances"][q][j], doc_id,
+                                      {field: partial[field][q][j] for field in fields}))
+        result: Dict[str, Any] = {"ids": [], "documents": None, "metadatas": None,
+                                  "distances": None, "embeddings": None}
+        for field in include:
+            result[field] = []
+        for rows in merged:
+            rows = sorted(rows, key=lambda row: row[0])[:n_results]
+            result["ids"].append([doc_id for _, doc_id, _ in rows])
+            if "distances" in include:
+                result["distances"].append([distance for distance, _, _ in rows])
+            for field in fields:
+                result[field].append([values[field] for _, _, values in rows])
+        return result
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        include = DEFAULT_GET_INCLUDE if include is None else include
+        stores = self._all() if ids is not None else self._route(where)
+        result: Dict[str, Any] = {"ids": [], "documents": None, "metadatas": None, "embeddings": None}
+        for field in ("documents", "metadatas", "embeddings"):
+            if field in include:
+                result[field] = []
+        for store in stores:
+            remaining = None if limit is None else limit - len(result["ids"])
+            if remaining is not None and remaining <= 0:
+                break
+            partial = store.get(ids=ids, where=where if ids is not None else self._partition_where(where),
+                                include=include, limit=remaining)
+            result["ids"].extend(partial["ids"])
+            for field in ("documents", "metadatas", "embeddings"):
+                if field in include:
+                    result[field].extend(list(partial[field]))
+        return result
+
+
+def list_collections(backend: Optional[str] = None) -> List[str]:
+    """Noms des collections existantes du backend (répertoires du backend "numpy")."""
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+    if backend == "chroma":
+        return [c if isinstance(c, str) else c.name for c in _chroma_client().list_collections()]
+    if backend == "numpy":
+        base_dir = settings.VECTOR_STORE_DIR or os.path.join(BASE_DIR, "vector_store")
+        if not os.path.isdir(base_dir):
+            return []
+        return sorted(name for name in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, name)))
+    raise ValueError(f"Backend vectoriel inconnu: {backend}")
+
+
+def create_vector_store(collection_name: str = "docs", backend: Optional[str] = None,
+                        partitioning: Optional[str] = None) -> VectorStore:
+    """Instancie le backend de stockage vectoriel configuré dans les settings."""
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+    partitioning = (partitioning or settings.VECTOR_PARTITIONING).lower()
+    if partitioning not in PARTITIONING_MODES:
+        raise ValueError(f"Partitionnement inconnu: {partitioning} (attendu: {', '.join(PARTITIONING_MODES)})")
+    if partitioning != "none":
+        return PartitionedVectorStore(
+            collection_name,
+            lambda name: create_vector_store(name, backend, partitioning="none"),
+            list_existing=lambda: list_collections(backend),
+            by_party=partitioning == "doc_type_party",
+            refresh_interval=settings.VECTOR_RELOAD_INTERVAL
+        )
+    if backend == "chroma":
+        return ChromaVectorStore(collection_name)
+    if backend == "numpy":
+        base_dir = settings.VECTOR_STORE_DIR or os.path.join(BASE_DIR, "vector_store")
+        return NumpyVectorStore(
+            persist_dir=os.path.join(base_dir, collection_name),
+            quantization=settings.VECTOR_QUANTIZATION,
+            rescore_candidates=settings.VECTOR_RESCORE_CANDIDATES,
+            mmap=settings.VECTOR_MMAP,
+            reload_interval=settings.VECTOR_RELOAD_INTERVAL
+        )
+    raise ValueError(f"Backend vectoriel inconnu: {backend}")
@@ -20,6 +20,12 @@ interface SearchResult {
   distances: number[];
 }
 
+// Réponse de /search : extraits ("snippets") par défaut, texte complet ("documents") sur demande
+interface SearchResponse extends Omit<SearchResult, 'documents'> {
+  documents?: string[];
+  snippets?: string[];
+}
+
 /**
  * Service RAG pour recherche contextuelle
  */
@@ -71,7 +77,8 @@ const ragService = {
       throw new Error(`Erreur lors de la recherche: ${response.status}`);
     }
 
-    return await response.json();
+    const data: SearchResponse = await response.json();
+    return { ...data, documents: data.snippets ?? data.documents ?? [] };
   },
 };
 
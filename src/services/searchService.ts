@@ -11,7 +11,8 @@ export interface DocumentResult {
 }
 
 export interface SearchResponse {
-  documents: string[];
+  documents?: string[];
+  snippets?: string[]; // Extraits renvoyés par défaut à la place du texte complet
   ids: string[];
   distances?: number[];
 }
@@ -61,7 +62,7 @@ const formatApiError = (error: unknown): string => {
 const formatSearchResults = (data: SearchResponse): DocumentResult[] => {
   return data.ids.map((id, index) => ({
     id,
-    document: data.documents[index],
+    document: (data.snippets ?? data.documents ?? [])[index],
     distance: data.distances ? data.distances[index] : undefined,
   }));
 };